@@ -0,0 +1,52 @@
+#!/usr/bin/python3
+"""Benchmarks decoding the timestamps written by BaseModel.to_dict().
+
+Usage: ./benchmarks/bench_datetime.py [count]
+Compares datetime.strptime with datetime.fromisoformat, which
+BaseModel.__init__ uses to decode created_at and updated_at.
+"""
+import sys
+from datetime import datetime
+from datetime import timedelta
+from time import perf_counter
+
+
+def timestamps(count):
+    """Return count distinct timestamps as emitted by to_dict().
+
+    Whole seconds are skipped: to_dict() drops their fraction, which
+    strptime cannot parse at all.
+    """
+    start = datetime(2017, 6, 14, 22, 31, 3, 285259)
+    step = timedelta(seconds=1, microseconds=7)
+    values = []
+    for i in range(count):
+        dt = start + step * i
+        if dt.microsecond == 0:
+            dt += timedelta(microseconds=1)
+        values.append(dt.isoformat())
+    return values
+
+
+def bench(name, decode, values):
+    """Time decoding every value, print and return the elapsed time."""
+    begin = perf_counter()
+    for v in values:
+        decode(v)
+    elapsed = perf_counter() - begin
+    print("{:<14} {:8.3f} s  {:6.0f} ns/timestamp".format(
+        name, elapsed, elapsed / len(values) * 1e9))
+    return elapsed
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    values = timestamps(count)
+    timeFormat = "%Y-%m-%dT%H:%M:%S.%f"
+    assert all(datetime.strptime(v, timeFormat) == datetime.fromisoformat(v)
+               for v in values[:1000])
+    print("decoding {} timestamps".format(count))
+    slow = bench("strptime", lambda v: datetime.strptime(v, timeFormat),
+                 values)
+    fast = bench("fromisoformat", datetime.fromisoformat, values)
+    print("speedup        {:8.1f}x".format(slow / fast))
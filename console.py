@@ -1,9 +1,21 @@
 #!/usr/bin/python3
-"""Defines the HBnB console."""
+"""Defines the HBnB console.
+
+Usage: ./console.py [--batch <file> [--checkpoint <count>]]
+With --batch, runs the commands of file ("-" for stdin) without a
+prompt, saving every count commands or once at the end, and reports
+the commands, errors and throughput on stderr.
+"""
 import cmd
 import re
+import sys
+from itertools import islice
 from shlex import split
+from time import perf_counter
 from models import storage
+from models.base_model import classes
+from models.engine.aggregate import Aggregate
+from models.engine.query import Query
 from models.base_model import BaseModel
 from models.user import User
 from models.state import State
@@ -13,24 +25,71 @@ from models.amenity import Amenity
 from models.review import Review
 
 
+# Words made of unquoted characters and of quoted strings, and lines
+# whose quotes are all closed.
+shell_word = re.compile(r"""(?:[^ \t\r\n"']|"[^"]*"|'[^']*')+""")
+shell_line = re.compile(r"""(?:[^"']|"[^"]*"|'[^']*')*""")
+shell_piece = re.compile(r""""([^"]*)"|'([^']*)'|([^"']+)""")
+
+
+def split_args(arg):
+    """Return shlex.split(arg), without shlex when arg has no backslash."""
+    if "\\" in arg or shell_line.fullmatch(arg) is None:
+        return split(arg)
+    words = []
+    for word in shell_word.findall(arg):
+        if '"' in word or "'" in word:
+            word = "".join(a + b + c for a, b, c in shell_piece.findall(word))
+        words.append(word)
+    return words
+
+
 def parse(arg):
     curly_braces = re.search(r"\{(.*?)\}", arg)
     brackets = re.search(r"\[(.*?)\]", arg)
     if curly_braces is None:
         if brackets is None:
-            return [i.strip(",") for i in split(arg)]
+            return [i.strip(",") for i in split_args(arg)]
         else:
-            lexer = split(arg[:brackets.span()[0]])
+            lexer = split_args(arg[:brackets.span()[0]])
             retl = [i.strip(",") for i in lexer]
             retl.append(brackets.group())
             return retl
     else:
-        lexer = split(arg[:curly_braces.span()[0]])
+        lexer = split_args(arg[:curly_braces.span()[0]])
         retl = [i.strip(",") for i in lexer]
         retl.append(curly_braces.group())
         return retl
 
 
+class BatchOutput:
+    """Represent an output stream counting the error messages written.
+
+    Attributes:
+        stream (file): The stream written to.
+        errors (int): The number of writes starting with "**".
+    """
+
+    def __init__(self, stream):
+        """Initialize a new BatchOutput.
+
+        Args:
+            stream (file): The stream to write to.
+        """
+        self.stream = stream
+        self.errors = 0
+
+    def write(self, s):
+        """Write s to the stream, counting it if it is an error."""
+        if s.startswith("**"):
+            self.errors += 1
+        return self.stream.write(s)
+
+    def flush(self):
+        """Flush the stream."""
+        self.stream.flush()
+
+
 class HBNBCommand(cmd.Cmd):
     """Defines the HolbertonBnB command interpreter.
 
@@ -39,15 +98,7 @@ class HBNBCommand(cmd.Cmd):
     """
 
     prompt = "(hbnb) "
-    __classes = {
-        "BaseModel",
-        "User",
-        "State",
-        "City",
-        "Place",
-        "Amenity",
-        "Review"
-    }
+    __classes = classes
 
     def emptyline(self):
         """Do nothing upon receiving an empty line."""
@@ -60,12 +111,16 @@ class HBNBCommand(cmd.Cmd):
             "show": self.do_show,
             "destroy": self.do_destroy,
             "count": self.do_count,
-            "update": self.do_update
+            "update": self.do_update,
+            "where": self.do_where,
+            "near": self.do_near,
+            "search": self.do_search,
+            "aggregate": self.do_aggregate
         }
         match = re.search(r"\.", arg)
         if match is not None:
             argl = [arg[:match.span()[0]], arg[match.span()[1]:]]
-            match = re.search(r"\((.*?)\)", argl[1])
+            match = re.search(r"\((.*)\)", argl[1])
             if match is not None:
                 command = [argl[1][:match.span()[0]], match.group()[1:-1]]
                 if command[0] in argdict.keys():
@@ -74,15 +129,99 @@ class HBNBCommand(cmd.Cmd):
         print("*** Unknown syntax: {}".format(arg))
         return False
 
+    def run_batch(self, lines, checkpoint=0):
+        """Run command lines without prompting, deferring saves.
+
+        Args:
+            lines (iterable): The command lines to run.
+            checkpoint (int): The number of commands between two saves;
+                0 saves only once every command has run.
+
+        A command raising an exception is reported as an error and
+        the batch goes on. A transaction left open at the end is rolled
+        back, as quit does.
+
+        Returns:
+            A dictionary of [commands, errors] counts by command name.
+        """
+        stats = {}
+        lines = iter(lines)
+        out = BatchOutput(sys.stdout)
+        stdout = sys.stdout
+        sys.stdout = out
+        try:
+            stop = False
+            while not stop:
+                ran = 0
+                with storage.deferred():
+                    for line in islice(lines, checkpoint or None):
+                        ran += 1
+                        line = line.strip()
+                        if line == "":
+                            continue
+                        match = re.match(r"\w+\.(\w+)\(", line)
+                        name = match.group(1) if match else line.split()[0]
+                        errors = out.errors
+                        try:
+                            stop = self.onecmd(self.precmd(line))
+                        except Exception as e:
+                            # One bad line must not abort the whole batch.
+                            print("** {}: {} **".format(type(e).__name__, e))
+                            stop = False
+                        count = stats.setdefault(name, [0, 0])
+                        count[0] += 1
+                        count[1] += out.errors - errors
+                        if stop:
+                            break
+                if ran == 0:
+                    break
+            if not stop:
+                self.__abandon()
+        finally:
+            sys.stdout = stdout
+        return stats
+
     def do_quit(self, arg):
         """Quit command to exit the program."""
+        self.__abandon()
         return True
 
     def do_EOF(self, arg):
         """EOF signal to exit the program."""
         print("")
+        self.__abandon()
         return True
 
+    def __abandon(self):
+        """Roll back the transaction left open, if any, and say so."""
+        if storage.in_transaction():
+            storage.rollback()
+            print("** transaction not committed **")
+
+    def do_begin(self, arg):
+        """Usage: begin
+        Keep the following changes in memory until commit or rollback."""
+        try:
+            storage.begin()
+        except RuntimeError:
+            print("** transaction already open **")
+
+    def do_commit(self, arg):
+        """Usage: commit
+        Save every change made since begin at once."""
+        try:
+            storage.commit()
+        except RuntimeError:
+            print("** no transaction open **")
+
+    def do_rollback(self, arg):
+        """Usage: rollback
+        Undo every change made since begin."""
+        try:
+            storage.rollback()
+        except RuntimeError:
+            print("** no transaction open **")
+
     def do_create(self, arg):
         """Usage: create <class>
         Create a new class instance and print its id.
@@ -93,7 +232,7 @@ class HBNBCommand(cmd.Cmd):
         elif argl[0] not in HBNBCommand.__classes:
             print("** class doesn't exist **")
         else:
-            print(eval(argl[0])().id)
+            print(HBNBCommand.__classes[argl[0]]().id)
             storage.save()
 
     def do_show(self, arg):
@@ -127,36 +266,153 @@ class HBNBCommand(cmd.Cmd):
         elif "{}.{}".format(argl[0], argl[1]) not in objdict.keys():
             print("** no instance found **")
         else:
-            del objdict["{}.{}".format(argl[0], argl[1])]
+            storage.delete(objdict["{}.{}".format(argl[0], argl[1])])
             storage.save()
 
     def do_all(self, arg):
         """Usage: all or all <class> or <class>.all()
         Display string representations of all instances of a given class.
-        If no class is specified, displays all instantiated objects."""
+        If no class is specified, displays all instantiated objects.
+        Options limit=<n> and offset=<n> page through them, and
+        format=lines prints one per line instead of a list."""
 
         argl = parse(arg)
+        options = {"limit": None, "offset": "0", "format": "list"}
+        while len(argl) > 0 and "=" in argl[-1]:
+            name, _, value = argl.pop().partition("=")
+            if name not in options:
+                print("** invalid option **")
+                return False
+            options[name] = value
+        if (options["format"] not in ("list", "lines") or
+                not options["offset"].isdigit() or
+                not (options["limit"] is None or
+                     options["limit"].isdigit())):
+            print("** invalid option **")
+            return False
         if len(argl) > 0 and argl[0] not in HBNBCommand.__classes:
             print("** class doesn't exist **")
         else:
-            objl = []
-            for obj in storage.all().values():
-                if len(argl) > 0 and argl[0] == obj.__class__.__name__:
-                    objl.append(obj.__str__())
-                elif len(argl) == 0:
-                    objl.append(obj.__str__())
-            print(objl)
+            if len(argl) > 0:
+                objs = storage.by_class(argl[0])
+            else:
+                objs = storage.all().values()
+            offset = int(options["offset"])
+            if options["limit"] is not None:
+                objs = islice(objs, offset, offset + int(options["limit"]))
+            elif offset > 0:
+                objs = islice(objs, offset, None)
+            self.__print(objs, options["format"] == "lines")
+
+    def do_where(self, arg):
+        """Usage: where <class> <condition>, ... or
+       <class>.where(<condition>, ...)
+        Display the instances of a class meeting every condition, each
+        one <attribute> <operator> <value> with an operator among
+        ==, !=, <, >, <=, >=, in and contains."""
+        argl = arg.split(None, 1)
+        if len(argl) == 0:
+            print("** class name missing **")
+            return False
+        if argl[0] not in HBNBCommand.__classes:
+            print("** class doesn't exist **")
+            return False
+        try:
+            query = Query.parse(argl[0], argl[1] if len(argl) > 1 else "")
+        except ValueError:
+            print("** invalid condition **")
+            return False
+        self.__print(query.run(storage))
+
+    def do_near(self, arg):
+        """Usage: near <class> <latitude> <longitude> <km> or
+       <class>.near(<latitude>, <longitude>, <km>)
+        Display the instances of a class located within km kilometers
+        of a point, nearest first."""
+        argl = [a for a in re.split(r"[\s,]+", arg) if a != ""]
+        if len(argl) == 0:
+            print("** class name missing **")
+            return False
+        if argl[0] not in HBNBCommand.__classes:
+            print("** class doesn't exist **")
+            return False
+        if len(argl) < 4:
+            print("** coordinates missing **")
+            return False
+        try:
+            lat, lon, km = (float(a) for a in argl[1:4])
+        except ValueError:
+            print("** invalid coordinates **")
+            return False
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180 and km >= 0):
+            print("** invalid coordinates **")
+            return False
+        self.__print(storage.near(argl[0], lat, lon, km))
+
+    def do_search(self, arg):
+        """Usage: search <class> <words> or <class>.search(<words>)
+        Display the instances of a class whose text uses any of the
+        words, best match first."""
+        argl = arg.split(None, 1)
+        if len(argl) == 0:
+            print("** class name missing **")
+            return False
+        if argl[0] not in HBNBCommand.__classes:
+            print("** class doesn't exist **")
+            return False
+        if len(argl) < 2:
+            print("** search words missing **")
+            return False
+        self.__print(storage.search(argl[0], argl[1]))
+
+    def do_aggregate(self, arg):
+        """Usage: aggregate <class> <aggregate>, ... [by <attribute>] or
+       <class>.aggregate(<aggregate>, ... [by <attribute>])
+        Display aggregates of the instances of a class, each one
+        <function> [<attribute>] with a function among count, sum, avg,
+        min and max, per value of the attribute after by if any."""
+        argl = arg.split(None, 1)
+        if len(argl) == 0:
+            print("** class name missing **")
+            return False
+        if argl[0] not in HBNBCommand.__classes:
+            print("** class doesn't exist **")
+            return False
+        if len(argl) < 2:
+            print("** aggregate missing **")
+            return False
+        try:
+            aggregate = Aggregate.parse(argl[0], argl[1])
+        except ValueError:
+            print("** invalid aggregate **")
+            return False
+        labels = aggregate.labels()
+        results = aggregate.run(storage)
+        if aggregate.by is None:
+            print(dict(zip(labels, results[None])))
+            return
+        print({group: dict(zip(labels, values)) for group, values in
+               sorted(results.items(), key=lambda item: repr(item[0]))})
+
+    def __print(self, objs, lines=False):
+        """Print objs one per line, or as a list as they are formatted."""
+        if lines:
+            for obj in objs:
+                print(obj)
+        else:
+            # Written as they are formatted, in the format of print(list).
+            sep = "["
+            for obj in objs:
+                print(sep + repr(obj.__str__()), end="")
+                sep = ", "
+            print("[]" if sep == "[" else "]")
 
     def do_count(self, arg):
         """Usage: count <class> or <class>.count()
         Retrieve the number of instances of a given class."""
 
         argl = parse(arg)
-        count = 0
-        for obj in storage.all().values():
-            if argl[0] == obj.__class__.__name__:
-                count += 1
-        print(count)
+        print(storage.count(argl[0]))
 
     def do_update(self, arg):
         """Usage: update <class> <id> <attribute_name> <attribute_value> or
@@ -185,30 +441,63 @@ class HBNBCommand(cmd.Cmd):
             return False
         if len(argl) == 3:
             try:
-                type(eval(argl[2])) != dict
+                value = eval(argl[2])
             except NameError:
                 print("** value missing **")
                 return False
+        elif len(argl) > 4:
+            value = eval(argl[2])
 
+        obj = objdict["{}.{}".format(argl[0], argl[1])]
+        # Touched first too, so that a rollback can restore old values.
+        storage.touch(obj)
+        schema = obj.__class__.schema
         if len(argl) == 4:
-            obj = objdict["{}.{}".format(argl[0], argl[1])]
-            if argl[2] in obj.__class__.__dict__.keys():
-                valtype = type(obj.__class__.__dict__[argl[2]])
-                obj.__dict__[argl[2]] = valtype(argl[3])
+            if argl[2] in schema.keys():
+                valtype = type(schema[argl[2]])
+                setattr(obj, argl[2], valtype(argl[3]))
             else:
-                obj.__dict__[argl[2]] = argl[3]
-        elif type(eval(argl[2])) == dict:
-            obj = objdict["{}.{}".format(argl[0], argl[1])]
-            for key, val in eval(argl[2]).items():
-                if (key in obj.__class__.__dict__.keys() and
-                        type(obj.__class__.__dict__[key])
-                        in {str, int, float}):
-                    valtype = type(obj.__class__.__dict__[key])
-                    obj.__dict__[key] = valtype(val)
+                setattr(obj, argl[2], argl[3])
+        elif type(value) == dict:
+            for key, val in value.items():
+                if (key in schema.keys() and
+                        type(schema[key]) in {str, int, float}):
+                    valtype = type(schema[key])
+                    setattr(obj, key, valtype(val))
                 else:
-                    obj.__dict__[key] = val
+                    setattr(obj, key, val)
+        storage.touch(obj)
         storage.save()
 
 
+def report(stats, elapsed):
+    """Print the counts returned by run_batch() and the throughput."""
+    total = sum(count[0] for count in stats.values())
+    errors = sum(count[1] for count in stats.values())
+    print("{} commands in {:.2f} s ({:.0f} commands/s), {} errors".format(
+        total, elapsed, total / elapsed if elapsed > 0 else 0, errors),
+        file=sys.stderr)
+    for name in sorted(stats):
+        print("  {:<10} {:>10} commands {:>10} errors".format(
+            name, stats[name][0], stats[name][1]), file=sys.stderr)
+
+
 if __name__ == "__main__":
-    HBNBCommand().cmdloop()
+    args = sys.argv[1:]
+    if len(args) == 0:
+        HBNBCommand().cmdloop()
+        sys.exit(0)
+    if (len(args) not in (2, 4) or args[0] != "--batch" or
+            (len(args) == 4 and (args[2] != "--checkpoint" or
+                                 not args[3].isdigit()))):
+        print("Usage: {} [--batch <file> [--checkpoint <count>]]".format(
+            sys.argv[0]), file=sys.stderr)
+        sys.exit(1)
+    checkpoint = int(args[3]) if len(args) == 4 else 0
+    begin = perf_counter()
+    if args[1] == "-":
+        stats = HBNBCommand().run_batch(sys.stdin, checkpoint)
+    else:
+        with open(args[1]) as f:
+            stats = HBNBCommand().run_batch(f, checkpoint)
+    report(stats, perf_counter() - begin)
@@ -1,7 +1,15 @@
 #!/usr/bin/python3
-"""__init__ create a unique FileStorage instance for my application"""
-from models.engine.file_storage import FileStorage
+"""__init__ create a unique storage instance for my application
 
+The engine is FileStorage, or DBStorage when HBNB_TYPE_STORAGE is "db".
+"""
+from os import getenv
 
-storage = FileStorage()
+
+if getenv("HBNB_TYPE_STORAGE") == "db":
+    from models.engine.db_storage import DBStorage
+    storage = DBStorage()
+else:
+    from models.engine.file_storage import FileStorage
+    storage = FileStorage()
 storage.reload()
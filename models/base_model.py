@@ -1,33 +1,69 @@
 #!/usr/bin/python3
 """Defines the BaseModel class."""
 import models
+from os import getenv
 from uuid import uuid4
 from datetime import datetime
+from models.compact import Compact
+from models.compact import compact
+
+
+# Every model class, registered by name when it is defined; with
+# HBNB_COMPACT_MODELS=1 its compact variant is registered instead.
+classes = {}
+compact_models = getenv("HBNB_COMPACT_MODELS") == "1"
 
 
 class BaseModel:
-    """Represents the BaseModel of the HBnB project."""
+    """Represents the BaseModel of the HBnB project.
+
+    Attributes:
+        schema (dict): The attributes declared on the class and its
+            bases, with their defaults.
+    """
+
+    schema = {}
+
+    def __init_subclass__(cls, **kwargs):
+        """Register a new model class in classes."""
+        super().__init_subclass__(**kwargs)
+        if "schema" not in cls.__dict__:
+            schema = dict(cls.schema)
+            schema.update((k, v) for k, v in cls.__dict__.items()
+                          if not k.startswith("_") and
+                          not hasattr(v, "__get__"))
+            cls.schema = schema
+        if issubclass(cls, Compact):
+            return
+        classes[cls.__name__] = compact(cls) if compact_models else cls
 
     def __init__(self, *args, **kwargs):
         """Initialize a new BaseModel.
 
         Args:
             *args (any): Unused.
-            **kwargs (dict): Key/value pairs of attributes.
+            **kwargs (dict): Key/value pairs of attributes. created_at
+                and updated_at may be datetimes or ISO format strings.
         """
-        timeFormat = "%Y-%m-%dT%H:%M:%S.%f"
-        self.id = str(uuid4())
-        self.created_at = datetime.today()
-        self.updated_at = datetime.today()
+        # Not stored yet, so there is nothing to mark as changed.
+        self.__dict__["id"] = str(uuid4())
+        self.__dict__["created_at"] = datetime.today()
+        self.__dict__["updated_at"] = datetime.today()
         if len(kwargs) != 0:
             for k, v in kwargs.items():
                 if k == "created_at" or k == "updated_at":
-                    self.__dict__[k] = datetime.strptime(v, timeFormat)
+                    if type(v) is not datetime:
+                        v = datetime.fromisoformat(v)
+                    self.__dict__[k] = v
                 else:
                     self.__dict__[k] = v
         else:
             models.storage.new(self)
 
+    def __setattr__(self, name, value):
+        """Set an attribute and mark the instance as changed in storage."""
+        models.storage.assign(self, name, value)
+
     def save(self):
         """Update updated_at with the current datetime."""
         self.updated_at = datetime.today()
@@ -49,3 +85,6 @@ class BaseModel:
         """Return the print/str representation of the BaseModel instance."""
         clname = self.__class__.__name__
         return "[{}] ({}) {}".format(clname, self.id, self.__dict__)
+
+
+classes["BaseModel"] = BaseModel
@@ -0,0 +1,228 @@
+#!/usr/bin/python3
+"""Defines the Compact class and the compact variants of model classes.
+
+With HBNB_COMPACT_MODELS=1, the class registered for each model name
+in models.base_model.classes is its compact variant, so the objects
+built by the console and by reload() are compact.
+"""
+import models
+import struct
+from datetime import datetime
+from datetime import timedelta
+from uuid import uuid4
+
+
+# The compact variant of each model class built so far, by class.
+variants = {}
+
+
+class Compact:
+    """Represent the compact variant of a model class.
+
+    The attributes declared on the model class are kept in slots, and
+    id, created_at and updated_at are packed into a single bytes value:
+    two timestamps as microseconds since EPOCH, followed by the 16 bytes
+    of the id when it is a UUID. Other ids are kept as they are. Only
+    attributes added at run time go to the instance __dict__, which is
+    never created for an object without any, so to_dict(), __str__ and
+    __getstate__() must be used instead of reading __dict__.
+
+    Attributes:
+        EPOCH (datetime): The origin of the packed timestamps.
+        fields (frozenset): The names of the attributes kept outside
+            __dict__, set on each variant by compact().
+        members (tuple): The (name, slot) pairs of the declared
+            attributes, set on each variant by compact().
+    """
+
+    __slots__ = ("__packed", "__text_id", "__extra")
+    EPOCH = datetime(1970, 1, 1)
+    __times = struct.Struct("<qq")
+    __fixed = ("id", "created_at", "updated_at", "__class__")
+
+    def __init__(self, *args, **kwargs):
+        """Initialize a new compact model instance.
+
+        Args:
+            *args (any): Unused.
+            **kwargs (dict): Key/value pairs of attributes. created_at
+                and updated_at may be datetimes or ISO format strings.
+        """
+        object.__setattr__(self, "_Compact__extra", False)
+        if len(kwargs) == 0:
+            today = datetime.today()
+            self.__pack(str(uuid4()), today, today)
+            models.storage.new(self)
+            return
+        today = None
+        times = []
+        for name in ("created_at", "updated_at"):
+            value = kwargs.get(name)
+            if value is None:
+                value = today = today or datetime.today()
+            times.append(value)
+        ident = kwargs["id"] if "id" in kwargs else str(uuid4())
+        self.__pack(ident, *times)
+        for k, v in kwargs.items():
+            if k not in Compact.__fixed:
+                self.__set(k, v)
+
+    def __setattr__(self, name, value):
+        """Set an attribute and mark the instance as changed in storage."""
+        if name not in type(self).fields:
+            object.__setattr__(self, "_Compact__extra", True)
+        models.storage.assign(self, name, value)
+
+    def __getattr__(self, name):
+        """Return the declared default of an attribute never set."""
+        schema = type(self).schema
+        if name in schema:
+            return schema[name]
+        raise AttributeError("'{}' object has no attribute '{}'".format(
+            type(self).__name__, name))
+
+    @property
+    def id(self):
+        """str: The id of the instance."""
+        packed = self.__packed
+        if len(packed) == Compact.__times.size:
+            return self.__text_id
+        h = packed[Compact.__times.size:].hex()
+        return "{}-{}-{}-{}-{}".format(h[:8], h[8:12], h[12:16], h[16:20],
+                                       h[20:])
+
+    @id.setter
+    def id(self, value):
+        self.__pack(value, self.created_at, self.updated_at)
+
+    @property
+    def created_at(self):
+        """datetime: When the instance was created."""
+        return Compact.EPOCH + timedelta(
+            microseconds=Compact.__times.unpack_from(self.__packed)[0])
+
+    @created_at.setter
+    def created_at(self, value):
+        self.__pack(self.id, value, self.updated_at)
+
+    @property
+    def updated_at(self):
+        """datetime: When the instance was last updated."""
+        return Compact.EPOCH + timedelta(
+            microseconds=Compact.__times.unpack_from(self.__packed)[1])
+
+    @updated_at.setter
+    def updated_at(self, value):
+        self.__pack(self.id, self.created_at, value)
+
+    def to_dict(self):
+        """Return the dictionary of the instance.
+
+        Includes the key/value pair __class__ representing
+        the class name of the object.
+        """
+        obj = self.__getstate__()
+        obj["created_at"] = obj["created_at"].isoformat()
+        obj["updated_at"] = obj["updated_at"].isoformat()
+        obj["__class__"] = self.__class__.__name__
+        return obj
+
+    def __str__(self):
+        """Return the print/str representation of the instance."""
+        clname = self.__class__.__name__
+        return "[{}] ({}) {}".format(clname, self.id, self.__getstate__())
+
+    def __getstate__(self):
+        """Return the attributes of the instance, as __dict__ would hold.
+
+        Declared attributes never set are left out, as they are from
+        the __dict__ of a model instance.
+        """
+        state = {"id": self.id, "created_at": self.created_at,
+                 "updated_at": self.updated_at}
+        for name, member in type(self).members:
+            try:
+                state[name] = member.__get__(self)
+            except AttributeError:
+                pass
+        if self.__extra:
+            state.update(self.__dict__)
+        return state
+
+    def __setstate__(self, state):
+        """Replace the attributes of the instance by those of state."""
+        for name, member in type(self).members:
+            try:
+                member.__delete__(self)
+            except AttributeError:
+                pass
+        # A copy is restored before __init__ ever ran.
+        if getattr(self, "_Compact__extra", False):
+            self.__dict__.clear()
+        object.__setattr__(self, "_Compact__extra", False)
+        self.__pack(state["id"], state["created_at"], state["updated_at"])
+        for k, v in state.items():
+            if k not in Compact.__fixed:
+                self.__set(k, v)
+
+    def __set(self, name, value):
+        """Set an attribute without marking the instance as changed."""
+        if name not in type(self).fields:
+            object.__setattr__(self, "_Compact__extra", True)
+        object.__setattr__(self, name, value)
+
+    def __pack(self, ident, created_at, updated_at):
+        """Pack the id and timestamps of the instance.
+
+        Timestamps may be datetimes or ISO format strings.
+        """
+        if type(created_at) is not datetime:
+            created_at = datetime.fromisoformat(created_at)
+        if type(updated_at) is not datetime:
+            updated_at = datetime.fromisoformat(updated_at)
+        micro = timedelta(microseconds=1)
+        packed = Compact.__times.pack((created_at - Compact.EPOCH) // micro,
+                                      (updated_at - Compact.EPOCH) // micro)
+        raw = _uuid_bytes(ident)
+        if raw is None:
+            object.__setattr__(self, "_Compact__text_id", ident)
+        else:
+            object.__setattr__(self, "_Compact__text_id", None)
+            packed += raw
+        object.__setattr__(self, "_Compact__packed", packed)
+
+
+def _uuid_bytes(ident):
+    """Return the 16 bytes of ident if it is a UUID string, else None."""
+    if type(ident) is not str or len(ident) != 36:
+        return None
+    try:
+        raw = bytes.fromhex(ident.replace("-", ""))
+    except ValueError:
+        return None
+    h = raw.hex()
+    if ident != "{}-{}-{}-{}-{}".format(h[:8], h[8:12], h[12:16], h[16:20],
+                                        h[20:]):
+        return None
+    return raw
+
+
+def compact(cls):
+    """Return the compact variant of the model class cls.
+
+    The variant subclasses cls under the same name, with a slot for
+    each attribute of cls.schema.
+    """
+    if cls in variants:
+        return variants[cls]
+    names = tuple(cls.schema)
+    variant = type(cls.__name__, (Compact, cls), {
+        "__slots__": names,
+        "__qualname__": cls.__qualname__,
+        "__module__": cls.__module__,
+        "schema": cls.schema
+    })
+    variant.fields = frozenset(names + ("id", "created_at", "updated_at"))
+    variant.members = tuple((name, variant.__dict__[name]) for name in names)
+    variants[cls] = variant
+    return variant
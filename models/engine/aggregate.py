@@ -0,0 +1,122 @@
+#!/usr/bin/python3
+"""Defines the Aggregate class, the aggregation of the storage engine.
+
+Attributes:
+    aggregate_functions (tuple): The names of the aggregate functions.
+"""
+import re
+
+aggregate_functions = ("count", "sum", "avg", "min", "max")
+
+
+class Aggregate:
+    """Represent aggregates of the objects of a class, maybe grouped.
+
+    Each aggregate is a function applied to an attribute: count counts
+    the objects, or with an attribute the objects where it is not None;
+    sum, avg, min and max only take the int and float values of their
+    attribute into account, as SQL skips NULL.
+
+    Attributes:
+        cls_name (str): The name of the class aggregated.
+        functions (list): The (function, attribute) pairs to compute;
+            the attribute of count may be None.
+        by (str): The attribute whose values group the objects, or None
+            for a single group.
+    """
+
+    __item = re.compile(r"(\w+)(?:\s+(\w+))?")
+    __by = re.compile(r"(.*?)\s+by\s+(\w+)", re.S)
+
+    def __init__(self, cls_name, functions, by=None):
+        """Initialize a new Aggregate.
+
+        Raises:
+            ValueError: If a function is unknown, one other than count
+                lacks an attribute, or there is no function.
+        """
+        if len(functions) == 0:
+            raise ValueError("no aggregate function")
+        for function, attr in functions:
+            if function not in aggregate_functions:
+                raise ValueError("unknown function: {}".format(function))
+            if attr is None and function != "count":
+                raise ValueError("{} needs an attribute".format(function))
+        self.cls_name = cls_name
+        self.functions = list(functions)
+        self.by = by
+
+    @classmethod
+    def parse(cls, cls_name, text):
+        """Return the Aggregate of text.
+
+        text is a comma-separated list of <function> [<attribute>],
+        optionally followed by by <attribute>, as in
+        "avg price_by_night, count by city_id"; no attribute can be
+        named by.
+
+        Raises:
+            ValueError: If text cannot be parsed.
+        """
+        by = None
+        match = Aggregate.__by.fullmatch(text.strip())
+        if match is not None:
+            text, by = match.group(1, 2)
+        items = []
+        for part in text.split(","):
+            match = Aggregate.__item.fullmatch(part.strip())
+            if match is None or match.group(2) == "by":
+                raise ValueError("invalid aggregate: {}".format(part))
+            items.append(match.group(1, 2))
+        return cls(cls_name, items, by)
+
+    def labels(self):
+        """Return the "<function> <attribute>" label of each function."""
+        return [function if attr is None else function + " " + attr
+                for function, attr in self.functions]
+
+    def run(self, storage):
+        """Return the aggregates of the stored objects.
+
+        Returns:
+            A dictionary of the list of aggregate values of each group,
+            by group value; the only group is None without by.
+        """
+        return storage.aggregate(self.cls_name, self.functions, self.by)
+
+
+def results(objs, functions):
+    """Return the value of each (function, attribute) pair over objs.
+
+    The values of each attribute are read once and reduced with sum(),
+    min() and max(), rather than folded in object by object.
+    """
+    stats = {}
+    for function, attr in functions:
+        if attr is not None and attr not in stats:
+            values = [getattr(obj, attr, None) for obj in objs]
+            numbers = [v for v in values if type(v) in (int, float) and
+                       v == v]
+            stats[attr] = [len(values) - values.count(None), len(numbers),
+                           sum(numbers), min(numbers, default=None),
+                           max(numbers, default=None)]
+    return [result(function, len(objs), stats.get(attr))
+            for function, attr in functions]
+
+
+def result(function, rows, stat):
+    """Return the value of an aggregate function.
+
+    Args:
+        function (str): The name of the function.
+        rows (int): The number of objects in the group.
+        stat (list): The [present, count, total, low, high] statistics
+            of the attribute, or None for count without an attribute.
+    """
+    if function == "count":
+        return rows if stat is None else stat[0]
+    if function == "sum":
+        return stat[2]
+    if function == "avg":
+        return stat[2] / stat[1] if stat[1] > 0 else None
+    return stat[3] if function == "min" else stat[4]
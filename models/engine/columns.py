@@ -0,0 +1,224 @@
+#!/usr/bin/python3
+"""Defines the ColumnStore class, a columnar copy of numeric attributes.
+
+Attributes:
+    column_keys (dict): The array typecode of each numeric attribute of
+        a model class that can be mirrored into a column, by attribute
+        name, by class name.
+    comparisons (dict): The comparison of each operator a column can be
+        filtered with.
+"""
+import operator
+from array import array
+from bisect import bisect_left
+from bisect import bisect_right
+from itertools import compress
+from itertools import repeat
+
+column_keys = {
+    "Place": {
+        "number_rooms": "q",
+        "number_bathrooms": "q",
+        "max_guest": "q",
+        "price_by_night": "q",
+        "latitude": "d",
+        "longitude": "d"
+    }
+}
+
+comparisons = {
+    "==": operator.eq,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge
+}
+
+
+class ColumnStore:
+    """Represent numeric attributes of objects stored as columns.
+
+    Each attribute is an array of machine ints ("q") or doubles ("d"),
+    following the type of its declared default, next to a bytearray
+    telling which rows hold a value. A row is given to each object and
+    reused once it is removed. Filters and aggregates run over whole
+    columns with map() and compress(), without reading any object.
+
+    Values that do not fit their column, such as a float in an int
+    column, are left out of it and make the column inexact: filtering
+    it would not match comparing the objects themselves.
+
+    Attributes:
+        attr (tuple): The names of the attributes in columns.
+        kind (str): "columns", the kind of lookups the store answers.
+    """
+
+    kind = "columns"
+
+    def __init__(self, attr, typecodes):
+        """Initialize a new ColumnStore.
+
+        Args:
+            attr (tuple): The names of the attributes to store.
+            typecodes (tuple): The array typecode of each attribute,
+                "q" or "d".
+        """
+        self.attr = attr
+        self.__columns = {a: array(t) for a, t in zip(attr, typecodes)}
+        self.__valid = {a: bytearray() for a in attr}
+        self.__strays = {a: set() for a in attr}
+        self.__keys = []
+        self.__rows = {}
+        self.__free = []
+
+    def add(self, key, obj):
+        """Copy the attributes of the object obj stored under key."""
+        if self.__free:
+            row = self.__free.pop()
+        else:
+            row = len(self.__keys)
+            self.__keys.append(None)
+            for a in self.attr:
+                self.__columns[a].append(0)
+                self.__valid[a].append(0)
+        self.__keys[row] = key
+        self.__rows[key] = row
+        for a in self.attr:
+            value = getattr(obj, a, None)
+            if value is None:
+                continue
+            try:
+                if isinstance(value, (int, float)):
+                    self.__columns[a][row] = value
+                    self.__valid[a][row] = 1
+                    continue
+            except (TypeError, OverflowError):
+                pass
+            self.__strays[a].add(key)
+
+    def remove(self, key):
+        """Remove the object stored under key from the columns."""
+        row = self.__rows.pop(key, None)
+        if row is None:
+            return
+        self.__keys[row] = None
+        for a in self.attr:
+            self.__valid[a][row] = 0
+            self.__strays[a].discard(key)
+        self.__free.append(row)
+
+    def exact(self, attr):
+        """Return whether every value of attr is in its column."""
+        return len(self.__strays[attr]) == 0
+
+    def select(self, conditions):
+        """Return the mask of the rows meeting every condition.
+
+        Args:
+            conditions (list): (attribute, operator, value) triples,
+                with an operator of comparisons.
+
+        Returns:
+            A bytearray holding 1 for each selected row and 0 otherwise.
+        """
+        mask = None
+        for attr, op, value in conditions:
+            hits = map(comparisons[op], self.__columns[attr], repeat(value))
+            part = bytearray(map(operator.and_, self.__valid[attr], hits))
+            if mask is not None:
+                part = bytearray(map(operator.and_, mask, part))
+            mask = part
+        if mask is None:
+            mask = bytearray(map(operator.truth, self.__keys))
+        return mask
+
+    def keys(self, mask):
+        """Return the keys of the rows selected by mask."""
+        return list(compress(self.__keys, mask))
+
+    def values(self, attr, mask=None):
+        """Return the values of attr in the rows selected by mask.
+
+        Rows without a value of attr are left out, and mask None selects
+        every row.
+        """
+        valid = self.__valid[attr]
+        if mask is not None:
+            valid = map(operator.and_, valid, mask)
+        return list(compress(self.__columns[attr], valid))
+
+    def count(self, attr, mask=None):
+        """Return the number of values of attr in the selected rows."""
+        valid = self.__valid[attr]
+        if mask is None:
+            return valid.count(1)
+        return bytes(map(operator.and_, valid, mask)).count(1)
+
+    def sum(self, attr, mask=None):
+        """Return the sum of the values of attr in the selected rows."""
+        return sum(self.values(attr, mask))
+
+    def min(self, attr, mask=None):
+        """Return the least value of attr in the selected rows, or None."""
+        return min(self.values(attr, mask), default=None)
+
+    def max(self, attr, mask=None):
+        """Return the greatest value of attr in the selected rows, or None."""
+        return max(self.values(attr, mask), default=None)
+
+    def mean(self, attr, mask=None):
+        """Return the mean of the values of attr in the selected rows.
+
+        Returns:
+            The mean as a float, or None if there is no value.
+        """
+        values = self.values(attr, mask)
+        if len(values) == 0:
+            return None
+        return sum(values) / len(values)
+
+    def histogram(self, attr, bins=10, low=None, high=None, mask=None):
+        """Return the histogram of the values of attr in the selected rows.
+
+        The values are sorted once and each bin is counted with bisect,
+        so no Python code runs per value. Bins are closed on the left,
+        and the last one on the right too; values outside of
+        [low, high] are not counted.
+
+        Args:
+            attr (str): The name of the attribute.
+            bins (int): The number of bins of equal width.
+            low (int or float): The left edge, or None for the least value.
+            high (int or float): The right edge, or None for the greatest.
+            mask (bytearray): The selected rows, or None for all.
+
+        Returns:
+            The list of bins + 1 edges and the list of bins counts.
+
+        Raises:
+            ValueError: If bins is not positive or high is below low.
+        """
+        if bins <= 0:
+            raise ValueError("bins must be positive")
+        values = sorted(self.values(attr, mask))
+        if low is None:
+            low = values[0] if values else 0
+        if high is None:
+            high = values[-1] if values else 0
+        if high < low:
+            raise ValueError("high is below low")
+        width = (high - low) / bins
+        edges = [low + i * width for i in range(bins)] + [high]
+        starts = [bisect_left(values, edge) for edge in edges]
+        starts[-1] = bisect_right(values, high)
+        return edges, [starts[i + 1] - starts[i] for i in range(bins)]
+
+    def clear(self):
+        """Remove every object from the columns."""
+        for a in self.attr:
+            del self.__columns[a][:]
+            self.__valid[a].clear()
+            self.__strays[a].clear()
+        self.__keys.clear()
+        self.__rows.clear()
+        self.__free.clear()
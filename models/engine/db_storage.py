@@ -0,0 +1,132 @@
+#!/usr/bin/python3
+"""Defines the DBStorage class."""
+import json
+import sqlite3
+from os import getenv
+from threading import Lock
+from models.base_model import classes
+from models.engine.file_storage import FileStorage
+from models.engine.index import foreign_keys
+
+
+class DBStorage(FileStorage):
+    """Represent a storage engine backed by an SQLite database.
+
+    Objects are kept in memory exactly as FileStorage keeps them, so
+    all(), count(), by_class() and lookup() behave the same, and save()
+    requests are coalesced the same way; only flush() and reload() talk
+    to the database. Every model class gets its own table holding the
+    id, the foreign-key columns (each with an index) and the JSON
+    encoding of to_dict(). flush() holds the save lock of FileStorage
+    from collecting the changes to committing them, and a failed write
+    leaves them pending for the next save.
+
+    Attributes:
+        __db_path (str): The path of the SQLite database file.
+        __conn (sqlite3.Connection): The open database connection.
+        __tables (set): Names of the tables known to exist.
+        __lock (Lock): Serializes the use of the connection, which a
+            coalesced flush may reach from a timer thread.
+    """
+    __db_path = getenv("HBNB_DB_PATH", "hbnb.db")
+    __conn = None
+    __tables = set()
+    __lock = Lock()
+
+    def flush(self):
+        """Write the objects changed since the last save in one transaction.
+
+        The changes stay pending unless the transaction commits. A
+        pending object no longer stored under its key is deleted, or
+        skipped if another object has taken the key.
+        """
+        with self.flushing() as pending, DBStorage.__lock:
+            objs = self.all()
+            byclass = {}
+            for key, obj in pending.items():
+                current = dict.get(objs, key)
+                if current is not obj and current is not None:
+                    continue
+                cls_name, _, oid = key.partition(".")
+                byclass.setdefault(cls_name, ([], []))
+                if current is None:
+                    byclass[cls_name][1].append((oid,))
+                else:
+                    row = [oid]
+                    for attr in foreign_keys.get(cls_name, ()):
+                        row.append(self.__column(getattr(obj, attr, None)))
+                    row.append(json.dumps(obj.to_dict()))
+                    byclass[cls_name][0].append(row)
+            with self.__connect() as conn:
+                for cls_name, (rows, ids) in byclass.items():
+                    self.__create(cls_name)
+                    columns = (("id",) + foreign_keys.get(cls_name, ()) +
+                               ("data",))
+                    conn.executemany(
+                        'INSERT OR REPLACE INTO "{}" ({}) VALUES ({})'.format(
+                            cls_name, ", ".join(columns),
+                            ", ".join("?" * len(columns))), rows)
+                    conn.executemany(
+                        'DELETE FROM "{}" WHERE id = ?'.format(cls_name),
+                        ids)
+
+    def reload(self):
+        """Load every object stored in the database.
+
+        Objects read from the database replace the in-memory objects
+        with the same key.
+        """
+        pending = self.changes()
+        with DBStorage.__lock:
+            conn = self.__connect()
+            names = [row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'")]
+            for cls_name in names:
+                if cls_name not in classes:
+                    continue
+                DBStorage.__tables.add(cls_name)
+                for row in conn.execute(
+                        'SELECT data FROM "{}"'.format(cls_name)):
+                    o = json.loads(row[0])
+                    del o["__class__"]
+                    self.new(classes[cls_name](**o))
+        self.changes()
+        for obj in pending.values():
+            if obj is not None:
+                self.touch(obj)
+
+    def close(self):
+        """Close the database connection, if it is open."""
+        if DBStorage.__conn is not None:
+            DBStorage.__conn.close()
+            DBStorage.__conn = None
+            DBStorage.__tables = set()
+
+    def __connect(self):
+        """Return the database connection, opening it if needed."""
+        if DBStorage.__conn is None:
+            DBStorage.__conn = sqlite3.connect(DBStorage.__db_path,
+                                               check_same_thread=False)
+        return DBStorage.__conn
+
+    def __create(self, cls_name):
+        """Create the table and indexes of a class if they are missing."""
+        if cls_name in DBStorage.__tables:
+            return
+        fks = foreign_keys.get(cls_name, ())
+        conn = self.__connect()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS "{}" (id TEXT PRIMARY KEY, {}'
+            'data TEXT NOT NULL)'.format(
+                cls_name, "".join(attr + " TEXT, " for attr in fks)))
+        for attr in fks:
+            conn.execute(
+                'CREATE INDEX IF NOT EXISTS "{0}_{1}" ON "{0}" ({1})'.format(
+                    cls_name, attr))
+        DBStorage.__tables.add(cls_name)
+
+    def __column(self, value):
+        """Return value in a form SQLite can store in a column."""
+        if value is None or type(value) in (str, int, float):
+            return value
+        return json.dumps(value)
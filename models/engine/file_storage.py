@@ -1,6 +1,30 @@
 #!/usr/bin/python3
 """Defines the FileStorage class."""
+import atexit
+import copy
 import json
+import os
+import sys
+from contextlib import contextmanager
+from os import getenv
+from threading import RLock
+from threading import Thread
+from threading import Timer
+from models.engine.aggregate import result
+from models.engine.aggregate import results
+from models.engine.columns import ColumnStore
+from models.engine.columns import column_keys
+from models.engine.formats import JSONFormat
+from models.engine.formats import get_format
+from models.engine.index import GridIndex
+from models.engine.index import SortedIndex
+from models.engine.index import build_indexes
+from models.engine.index import geo_keys
+from models.engine.index import text_keys
+from models.engine.lazy import LazyObjects
+from models.base_model import classes
+from models.compact import Compact
+# The model modules are imported so that their classes are registered.
 from models.base_model import BaseModel
 from models.user import User
 from models.state import State
@@ -13,37 +37,970 @@ from models.review import Review
 class FileStorage:
     """Represent an abstracted storage engine.
 
+    Each feature is set up from the environment variable named next
+    to the attribute holding it.
+
     Attributes:
-        __file_path (str): The name of the file to save objects to.
+        __file_path (str): The name of the file to save objects to
+            (HBNB_FILE_PATH).
+        __log_path (str): The name of the journal of changed records.
+        __old_log_path (str): The name the journal is moved to while it
+            is being compacted.
+        __new_path (str): The name a new snapshot is written to before
+            it replaces __file_path.
+        __durability (str): "none", "flush" or "fsync", how a save
+            reaches the disk (HBNB_FILE_DURABILITY).
+        __format (JSONFormat or BinaryFormat): The snapshot format, by
+            extension of __file_path or HBNB_STORAGE_FORMAT.
+        __journal (bool): Whether save() appends to the journal
+            (HBNB_STORAGE_JOURNAL=1).
+        __lazy (bool): Whether reload() defers building objects
+            (HBNB_STORAGE_LAZY=1).
+        __progress (bool): Whether reload() reports its progress
+            (HBNB_RELOAD_PROGRESS=1).
+        __reported (int): The last percentage reported.
+        __cache (bool): Whether the encodings of clean objects are kept
+            (unless HBNB_FRAGMENT_CACHE=0).
+        __buffering (int): The buffer size of snapshot file handles.
+        __compact_records (int): Journal length that triggers compaction
+            (HBNB_COMPACT_RECORDS).
+        __compact_bytes (int): Journal size that triggers compaction
+            (HBNB_COMPACT_BYTES).
+        __log_records (int): Number of records in the journal.
+        __log_bytes (int): Size of the journal in bytes.
+        __compactor (Thread): The last compaction thread started.
+        __window (float): Seconds a save request may wait for others
+            (HBNB_SAVE_WINDOW).
+        __batch (int): Number of save requests that forces a flush
+            (HBNB_SAVE_BATCH).
+        __requests (int): Number of save requests not yet flushed.
+        __timer (Timer): The timer that flushes the current window.
+        __exit_flush (bool): Whether a flush at exit is registered.
+        __save_lock (RLock): Keeps changes out of a running flush.
+        __deferred (int): Number of deferred() blocks being run.
+        __undo (dict): The state of each object before the open
+            transaction first changed it, by key, or None when no
+            transaction is open.
+        __undo_pending (dict): __pending as it was at begin().
         __objects (dict): A dictionary of instantiated objects.
+        __pending (dict): Objects changed since the last save, by key.
+            A value of None marks a deleted object.
+        __fragments (dict): (object, snapshot encoding) pairs of clean
+            objects, by key.
+        __classes (dict): The keys of the stored objects of each class,
+            in insertion order.
+        __ranges (bool): Whether sorted indexes are kept
+            (HBNB_RANGE_INDEXES=1).
+        __columns (bool): Whether column stores are kept (HBNB_COLUMNS=1).
+        __indexes (dict): The indexes of each class, by attribute name.
+        __live (dict): The indexes of each class that __refresh() keeps
+            up to date, by class name: those filled since __objects was
+            last replaced.
+        __indexed (dict): The __objects dictionary the indexes describe.
+        __stale (dict): Keys of objects changed since the last refresh,
+            in the order they first changed.
     """
-    __file_path = "file.json"
+    __file_path = getenv("HBNB_FILE_PATH", "file.json")
+    __log_path = __file_path + ".log"
+    __old_log_path = __file_path + ".log.old"
+    __new_path = __file_path + ".new"
+    __durability = getenv("HBNB_FILE_DURABILITY", "fsync")
+    if __durability not in ("none", "flush", "fsync"):
+        raise ValueError("unknown durability level: {}".format(__durability))
+    __format = get_format(__file_path, getenv("HBNB_STORAGE_FORMAT"))
+    __journal = getenv("HBNB_STORAGE_JOURNAL") == "1"
+    __lazy = getenv("HBNB_STORAGE_LAZY") == "1"
+    __progress = getenv("HBNB_RELOAD_PROGRESS") == "1"
+    __reported = None
+    __cache = getenv("HBNB_FRAGMENT_CACHE", "1") != "0"
+    __buffering = 1 << 20
+    __compact_records = int(getenv("HBNB_COMPACT_RECORDS", "10000"))
+    __compact_bytes = int(getenv("HBNB_COMPACT_BYTES", str(16 << 20)))
+    __log_records = 0
+    __log_bytes = 0
+    __compactor = None
+    __window = float(getenv("HBNB_SAVE_WINDOW", "0"))
+    __batch = int(getenv("HBNB_SAVE_BATCH", "0"))
+    __requests = 0
+    __timer = None
+    __exit_flush = False
+    __save_lock = RLock()
+    __deferred = 0
+    __undo = None
+    __undo_pending = None
     __objects = {}
+    __pending = {}
+    __fragments = {}
+    __classes = {}
+    __ranges = getenv("HBNB_RANGE_INDEXES") == "1"
+    __columns = getenv("HBNB_COLUMNS") == "1"
+    __indexes = build_indexes(__ranges, __columns)
+    __live = {}
+    __indexed = None
+    __stale = {}
 
     def all(self):
-        """Return the dictionary __objects."""
+        """Return the dictionary __objects.
+
+        It is handed out for reading: objects are stored and removed
+        through new() and delete(), which keep the partitions and
+        indexes in step, and writing to it directly is not supported.
+        """
         return FileStorage.__objects
 
     def new(self, obj):
         """Set in __objects obj with key <obj_class_name>.id"""
         ocname = obj.__class__.__name__
-        FileStorage.__objects["{}.{}".format(ocname, obj.id)] = obj
+        key = "{}.{}".format(ocname, obj.id)
+        with FileStorage.__save_lock:
+            self.__remember(key)
+            FileStorage.__objects[key] = obj
+            FileStorage.__pending[key] = obj
+            FileStorage.__fragments.pop(key, None)
+            FileStorage.__stale[key] = None
 
-    def save(self):
-        """Serialize __objects to the JSON file __file_path."""
+    def touch(self, obj):
+        """Mark a stored obj as changed so the next save() writes it.
+
+        Attribute assignments are marked by assign(); in-place changes
+        to mutable attributes need an explicit call.
+        """
+        key = "{}.{}".format(obj.__class__.__name__, getattr(obj, "id", ""))
+        if dict.get(FileStorage.__objects, key) is obj:
+            with FileStorage.__save_lock:
+                self.__remember(key)
+                FileStorage.__pending[key] = obj
+                FileStorage.__fragments.pop(key, None)
+                FileStorage.__stale[key] = None
+
+    def assign(self, obj, name, value):
+        """Set the attribute name of obj to value and touch obj.
+
+        BaseModel routes every attribute assignment here, so that a
+        flush running on another thread sees either the old value or
+        the new one with the object marked as changed.
+        """
+        with FileStorage.__save_lock:
+            self.touch(obj)
+            object.__setattr__(obj, name, value)
+
+    def delete(self, obj):
+        """Remove obj from __objects, if it is stored."""
+        key = "{}.{}".format(obj.__class__.__name__, obj.id)
+        with FileStorage.__save_lock:
+            if key in FileStorage.__objects:
+                self.__remember(key)
+                del FileStorage.__objects[key]
+                FileStorage.__pending[key] = None
+                FileStorage.__fragments.pop(key, None)
+                FileStorage.__stale[key] = None
+
+    def changes(self):
+        """Return and forget the objects changed since the last save.
+
+        The caller is expected to write them, so any coalesced save
+        requests count as flushed.
+
+        Returns:
+            A dictionary of the changed objects by key, where a value of
+            None marks a deleted object.
+        """
+        with FileStorage.__save_lock:
+            if FileStorage.__timer is not None:
+                FileStorage.__timer.cancel()
+                FileStorage.__timer = None
+            FileStorage.__requests = 0
+            pending = FileStorage.__pending
+            FileStorage.__pending = {}
+        return pending
+
+    @contextmanager
+    def flushing(self):
+        """Hold off every change while the pending ones are written.
+
+        The block runs under the save lock, so no object changes while
+        its changes are collected, encoded and written. They are only
+        forgotten, as changes() forgets them, once the block ends
+        without raising; a failed write leaves them pending.
+
+        Yields:
+            A copy of the dictionary of the changed objects by key,
+            where a value of None marks a deleted object.
+        """
+        with FileStorage.__save_lock:
+            yield dict(FileStorage.__pending)
+            self.changes()
+
+    def count(self, cls_name):
+        """Return the number of stored objects of a class.
+
+        Like by_class() and the lookups, it first brings the keys of
+        each class up to date with the objects changed since.
+        """
+        self.__refresh()
+        return len(FileStorage.__classes.get(cls_name, ()))
+
+    def by_class(self, cls_name):
+        """Return the list of stored objects of a class."""
+        self.__refresh()
+        odict = FileStorage.__objects
+        return [odict[key] for key in FileStorage.__classes.get(cls_name, ())]
+
+    def lookup(self, cls_name, attr, value):
+        """Return the objects of a class whose attribute equals value.
+
+        Indexed attributes are answered in time proportional to the
+        number of matches; any other attribute falls back to a scan.
+
+        Args:
+            cls_name (str): The name of the class to search.
+            attr (str): The name of the attribute to compare.
+            value (any): The value to look for.
+        """
+        index = self.__demand(cls_name, attr)
+        if index is None:
+            return self.scan(
+                cls_name, lambda obj: getattr(obj, attr, None) == value)
+        odict = FileStorage.__objects
+        return [odict[key] for key in index.get(value) if key in odict]
+
+    def between(self, cls_name, attr, low=None, high=None,
+                include_low=True, include_high=True):
+        """Return the objects of a class whose attribute is in a range.
+
+        An attribute with a sorted index, kept on the numeric
+        attributes of models/engine/index.py when HBNB_RANGE_INDEXES=1,
+        is answered in O(log N + k) time for k matches; any other
+        attribute falls back to a scan.
+        Only int, float and bool values are ever in range, a bool
+        comparing as 0 or 1.
+
+        Args:
+            cls_name (str): The name of the class to search.
+            attr (str): The name of the attribute to compare.
+            low (int or float): The lower bound, or None for no bound.
+            high (int or float): The upper bound, or None for no bound.
+            include_low (bool): Whether the lower bound is included.
+            include_high (bool): Whether the upper bound is included.
+
+        Returns:
+            The list of objects, in increasing order of attr.
+        """
+        index = self.__demand(cls_name, attr)
+        if index is None or index.kind != "range":
+            # Sort a scan of the class into a throwaway index instead.
+            index = SortedIndex(attr)
+            for key in FileStorage.__classes.get(cls_name, ()):
+                index.add(key, self.__view(key))
+        odict = FileStorage.__objects
+        return [odict[key] for key in index.range(low, high, include_low,
+                                                  include_high)]
+
+    def within(self, cls_name, south, west, north, east):
+        """Return the objects of a class located in a box.
+
+        Args:
+            cls_name (str): The name of the class to search.
+            south (float): The lowest latitude of the box.
+            west (float): The west longitude of the box; east of east
+                for a box crossing the 180th meridian.
+            north (float): The highest latitude of the box.
+            east (float): The east longitude of the box.
+        """
+        odict = FileStorage.__objects
+        return [odict[key] for key in
+                self.__grid(cls_name).box(south, west, north, east)]
+
+    def near(self, cls_name, lat, lon, km):
+        """Return the objects of a class within km of a point.
+
+        Args:
+            cls_name (str): The name of the class to search.
+            lat (float): The latitude of the point.
+            lon (float): The longitude of the point.
+            km (float): The greatest great-circle distance in kilometers.
+
+        Returns:
+            The list of objects, nearest first.
+        """
         odict = FileStorage.__objects
-        objdict = {obj: odict[obj].to_dict() for obj in odict.keys()}
-        with open(FileStorage.__file_path, "w") as f:
-            json.dump(objdict, f)
+        return [odict[key] for distance, key in
+                self.__grid(cls_name).near(lat, lon, km)]
+
+    def nearest(self, cls_name, lat, lon, k):
+        """Return the k objects of a class nearest a point, nearest first.
+
+        Args:
+            cls_name (str): The name of the class to search.
+            lat (float): The latitude of the point.
+            lon (float): The longitude of the point.
+            k (int): The greatest number of objects to return.
+        """
+        odict = FileStorage.__objects
+        return [odict[key] for distance, key in
+                self.__grid(cls_name).nearest(lat, lon, k)]
+
+    def search(self, cls_name, text, limit=None):
+        """Return the objects of a class whose text matches words.
+
+        The text attributes of each class are listed in
+        models/engine/index.py; a class without any has no matches.
+
+        Args:
+            cls_name (str): The name of the class to search.
+            text (str): The words to search for.
+            limit (int): The greatest number of objects, or None for all.
+
+        Returns:
+            The list of objects using any of the words, best match first.
+        """
+        index = self.__demand(cls_name, text_keys.get(cls_name))
+        if index is None:
+            return []
+        odict = FileStorage.__objects
+        return [odict[key] for score, key in index.search(text, limit)]
+
+    def columns(self, cls_name):
+        """Return the up-to-date ColumnStore of a class.
+
+        The numeric attributes of places are kept in columns when
+        HBNB_COLUMNS=1; a class whose columns are not kept gets a
+        throwaway store built by a scan.
+
+        Returns:
+            The ColumnStore, or None if the class has no numeric
+            attributes listed in models/engine/columns.py.
+        """
+        types = column_keys.get(cls_name)
+        if types is None:
+            return None
+        store = self.__demand(cls_name, tuple(types))
+        if store is None:
+            store = ColumnStore(tuple(types), tuple(types.values()))
+            for key in FileStorage.__classes.get(cls_name, ()):
+                store.add(key, self.__view(key))
+        return store
+
+    def aggregate(self, cls_name, functions, by=None):
+        """Return aggregates of the objects of a class, per group.
+
+        Counts, sums and averages are read from the counter index of
+        the grouping attribute when it counts every attribute needed,
+        and counts of objects from a hash index or count(). Anything
+        else is computed by a single pass over the class, hashing each
+        object into the list of its group, then reducing each group.
+        Objects whose grouping value is unhashable are left out.
+
+        Args:
+            cls_name (str): The name of the class to aggregate.
+            functions (list): (function, attribute) pairs, as held by
+                models.engine.aggregate.Aggregate.
+            by (str): The name of the attribute grouping the objects,
+                or None for a single group.
+
+        Returns:
+            A dictionary of the list of values of functions of each
+            group, by grouping value; without by, the only group is
+            None.
+        """
+        self.__refresh()
+        kept = self.__counted(cls_name, functions, by)
+        if kept is not None:
+            return kept
+        keys = FileStorage.__classes.get(cls_name, ())
+        if by is None:
+            return {None: results([self.__view(key) for key in keys],
+                                  functions)}
+        groups = {}
+        for key in keys:
+            obj = self.__view(key)
+            group = getattr(obj, by, None)
+            try:
+                members = groups.get(group)
+            except TypeError:
+                continue
+            if members is None:
+                groups[group] = [obj]
+            else:
+                members.append(obj)
+        return {group: results(members, functions)
+                for group, members in groups.items()}
+
+    def indexed(self, cls_name, attr):
+        """Return the kind of index kept on attr of a class.
+
+        Returns:
+            "hash" for an index lookup() answers equality from, "range"
+            for a sorted index between() also answers ranges from,
+            "geo" for the grid index of a (latitude, longitude) pair,
+            "text" for the inverted index of a tuple of text attributes,
+            "columns" for the column store of a tuple of numeric
+            attributes, "counters" for the counter index of a
+            (grouping attribute, attributes) pair, or None if the
+            attribute is not indexed.
+        """
+        index = FileStorage.__indexes.get(cls_name, {}).get(attr)
+        return None if index is None else index.kind
+
+    def scan(self, cls_name, test):
+        """Return the stored objects of a class that pass test.
+
+        In lazy mode test sees a Record of each unbuilt object, and only
+        the objects that pass are built.
+
+        Args:
+            cls_name (str): The name of the class to search.
+            test (callable): Called with each object, returns a bool.
+        """
+        self.__refresh()
+        odict = FileStorage.__objects
+        return [odict[key] for key in FileStorage.__classes.get(cls_name, ())
+                if test(self.__view(key))]
+
+    def save(self):
+        """Write the changes made so far, possibly with later ones.
+
+        Unless save requests are coalesced, this is flush(). Otherwise
+        the request is recorded and flush() runs once HBNB_SAVE_BATCH
+        requests are pending or HBNB_SAVE_WINDOW seconds after the first
+        of them, and requests still pending at exit are flushed then.
+        Inside a transaction nothing is written until commit(), and
+        inside a deferred() block until the block ends.
+        """
+        if FileStorage.__undo is not None:
+            return
+        if (FileStorage.__window <= 0 and FileStorage.__batch <= 0 and
+                FileStorage.__deferred == 0):
+            self.flush()
+            return
+        with FileStorage.__save_lock:
+            FileStorage.__requests += 1
+            if FileStorage.__deferred > 0:
+                return
+            if not FileStorage.__exit_flush:
+                atexit.register(self.__flush_pending)
+                FileStorage.__exit_flush = True
+            if (FileStorage.__batch > 0 and
+                    FileStorage.__requests >= FileStorage.__batch):
+                self.flush()
+            elif FileStorage.__window > 0 and FileStorage.__timer is None:
+                FileStorage.__timer = Timer(FileStorage.__window,
+                                            self.__flush_pending)
+                FileStorage.__timer.daemon = True
+                FileStorage.__timer.start()
+
+    def flush(self):
+        """Serialize __objects to the snapshot file __file_path now.
+
+        The snapshot is written one object at a time, reusing the
+        cached encoding of every object not changed since the last
+        save. In journal mode only the changed records are appended to
+        __log_path instead.
+        """
+        with FileStorage.__save_lock:
+            if FileStorage.__journal:
+                self.__append()
+            else:
+                self.__wait()
+                self.__write_snapshot(
+                    (key, self.__fragment(key, obj))
+                    for key, obj in dict.items(FileStorage.__objects))
+                for path in (FileStorage.__log_path,
+                             FileStorage.__old_log_path):
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                FileStorage.__log_records = FileStorage.__log_bytes = 0
+            self.changes()
+
+    def begin(self):
+        """Open a transaction.
+
+        Raises:
+            RuntimeError: If a transaction is already open.
+        """
+        with FileStorage.__save_lock:
+            if FileStorage.__undo is not None:
+                raise RuntimeError("a transaction is already open")
+            FileStorage.__undo = {}
+            FileStorage.__undo_pending = dict(FileStorage.__pending)
+
+    def in_transaction(self):
+        """Return whether a transaction is open."""
+        return FileStorage.__undo is not None
+
+    def commit(self):
+        """Close the open transaction and save its changes.
+
+        Raises:
+            RuntimeError: If no transaction is open.
+        """
+        with FileStorage.__save_lock:
+            if FileStorage.__undo is None:
+                raise RuntimeError("no transaction is open")
+            FileStorage.__undo = FileStorage.__undo_pending = None
+            if len(FileStorage.__pending) != 0:
+                self.save()
+
+    def rollback(self):
+        """Close the open transaction and undo its changes.
+
+        Changed objects get back the attributes they had when the
+        transaction first changed them, new objects are removed and
+        deleted ones are stored again.
+
+        Raises:
+            RuntimeError: If no transaction is open.
+        """
+        with FileStorage.__save_lock:
+            if FileStorage.__undo is None:
+                raise RuntimeError("no transaction is open")
+            odict = FileStorage.__objects
+            for key, (obj, state) in FileStorage.__undo.items():
+                if obj is None:
+                    dict.pop(odict, key, None)
+                else:
+                    if isinstance(obj, Compact):
+                        obj.__setstate__(state)
+                    elif state is not None:
+                        obj.__dict__.clear()
+                        obj.__dict__.update(state)
+                    dict.__setitem__(odict, key, obj)
+                FileStorage.__fragments.pop(key, None)
+                FileStorage.__stale[key] = None
+            FileStorage.__pending = FileStorage.__undo_pending
+            FileStorage.__undo = FileStorage.__undo_pending = None
+
+    @contextmanager
+    def transaction(self):
+        """Return a context manager running its block in a transaction.
+
+        The transaction is committed when the block ends and rolled
+        back if it raises.
+        """
+        self.begin()
+        try:
+            yield self
+        except BaseException:
+            self.rollback()
+            raise
+        self.commit()
+
+    @contextmanager
+    def deferred(self):
+        """Return a context manager holding back save() in its block.
+
+        The saves requested in the block are flushed together when the
+        outermost deferred() block ends.
+        """
+        with FileStorage.__save_lock:
+            FileStorage.__deferred += 1
+        try:
+            yield self
+        finally:
+            with FileStorage.__save_lock:
+                FileStorage.__deferred -= 1
+            self.__flush_pending()
 
     def reload(self):
-        """Deserialize the JSON file __file_path to __objects, if it exists."""
+        """Deserialize the snapshot __file_path to __objects, if it exists.
+
+        The snapshot is read incrementally, building each object as
+        its record is decoded, and any journal found at __old_log_path
+        or __log_path is replayed on top of it. In lazy mode only the
+        encoding of each record is kept, in a LazyObjects dictionary,
+        and the object is built the first time it is read.
+        """
+        self.__wait()
+        fmt = FileStorage.__format
+        if FileStorage.__lazy and type(FileStorage.__objects) is dict:
+            FileStorage.__objects = LazyObjects(FileStorage.__objects,
+                                                fmt.decode)
+        lazy = type(FileStorage.__objects) is LazyObjects
+        mode = "rb" if fmt.binary else "r"
+        progress = self.__report if FileStorage.__progress else None
+        FileStorage.__reported = None
         try:
-            with open(FileStorage.__file_path) as f:
-                objdict = json.load(f)
-                for o in objdict.values():
-                    cls_name = o["__class__"]
-                    del o["__class__"]
-                    self.new(eval(cls_name)(**o))
+            with open(FileStorage.__file_path, mode) as f:
+                for key, o in fmt.read(f, progress, lazy):
+                    if lazy:
+                        # Only the fragment is kept until first use.
+                        dict.__setitem__(FileStorage.__objects, key, o)
+                        FileStorage.__stale[key] = None
+                    else:
+                        self.__load(key, o)
         except FileNotFoundError:
+            pass
+        self.__replay(FileStorage.__old_log_path)
+        FileStorage.__log_records = self.__replay(FileStorage.__log_path)
+        FileStorage.__log_bytes = self.__trim(FileStorage.__log_path)
+        self.__check_log()
+
+    def compact(self):
+        """Fold the journal into a new snapshot on a background thread.
+
+        The journal is first moved to __old_log_path so that appends can
+        continue while the thread merges it into a temporary copy of the
+        snapshot, which then atomically replaces __file_path.
+
+        The save lock is held meanwhile, so the journal is never moved
+        in the middle of an append. A save starts a compaction on its
+        own once the journal passes __compact_records records or
+        __compact_bytes bytes.
+
+        Returns:
+            The compaction thread, or None if there is nothing to compact
+            or a compaction is already running.
+        """
+        with FileStorage.__save_lock:
+            if (FileStorage.__compactor is not None and
+                    FileStorage.__compactor.is_alive()):
+                return None
+            if not os.path.exists(FileStorage.__old_log_path):
+                try:
+                    os.rename(FileStorage.__log_path,
+                              FileStorage.__old_log_path)
+                except FileNotFoundError:
+                    return None
+                FileStorage.__log_records = FileStorage.__log_bytes = 0
+            FileStorage.__compactor = Thread(target=self.__fold)
+            FileStorage.__compactor.start()
+            return FileStorage.__compactor
+
+    def __flush_pending(self):
+        """Flush any save request pending outside a transaction or block."""
+        with FileStorage.__save_lock:
+            FileStorage.__timer = None
+            if (FileStorage.__requests > 0 and FileStorage.__undo is None and
+                    FileStorage.__deferred == 0):
+                self.flush()
+
+    def __remember(self, key):
+        """Keep the state of the object under key for a rollback.
+
+        Only the first change in a transaction is remembered, so
+        in-place changes to mutable values must be preceded by touch()
+        to be undone.
+        """
+        undo = FileStorage.__undo
+        if undo is None or key in undo:
+            return
+        obj = dict.get(FileStorage.__objects, key)
+        state = None
+        if obj is not None and not LazyObjects.unbuilt(obj):
+            if isinstance(obj, Compact):
+                state = copy.deepcopy(obj.__getstate__())
+            else:
+                state = copy.deepcopy(obj.__dict__)
+        undo[key] = (obj, state)
+
+    def __fragment(self, key, obj):
+        """Return the snapshot encoding of obj.to_dict(), cached by key.
+
+        obj may also be a fragment that lazy mode has not built yet,
+        which is its own encoding unless it is in another format.
+        """
+        if LazyObjects.unbuilt(obj):
+            if type(obj) is (bytes if FileStorage.__format.binary else str):
+                return obj
+            obj = FileStorage.__objects[key]
+        cached = FileStorage.__fragments.get(key)
+        if cached is None or cached[0] is not obj:
+            cached = (obj, FileStorage.__format.encode(key, obj.to_dict()))
+            if FileStorage.__cache:
+                FileStorage.__fragments[key] = cached
+        return cached[1]
+
+    def __json_fragment(self, key, obj):
+        """Return the JSON encoding of obj.to_dict() for the journal."""
+        if type(FileStorage.__format) is JSONFormat:
+            return self.__fragment(key, obj)
+        return JSONFormat().encode(key, obj.to_dict())
+
+    def __load(self, key, o):
+        """Build the object described by the dictionary o under key."""
+        cls_name = o["__class__"]
+        del o["__class__"]
+        dict.__setitem__(FileStorage.__objects, key, classes[cls_name](**o))
+        FileStorage.__stale[key] = None
+
+    def __report(self, done, total):
+        """Print the percentage of __file_path read so far to stderr."""
+        if not total:
             return
+        percent = done * 100 // total
+        if percent != FileStorage.__reported:
+            FileStorage.__reported = percent
+            sys.stderr.write("\rreload: {}% of {} bytes{}".format(
+                percent, total, "\n" if done >= total else ""))
+            sys.stderr.flush()
+
+    def __view(self, key):
+        """Return the attributes stored under key without building them.
+
+        Returns:
+            The object, a Record of its fragment in lazy mode, or None.
+        """
+        if type(FileStorage.__objects) is LazyObjects:
+            return FileStorage.__objects.view(key)
+        return dict.get(FileStorage.__objects, key)
+
+    def __refresh(self):
+        """Bring the indexes up to date with __objects."""
+        odict = FileStorage.__objects
+        if FileStorage.__indexed is not odict:
+            # __objects was replaced wholesale; rebuild the partitions
+            # from scratch, leaving every index to __demand().
+            FileStorage.__classes.clear()
+            FileStorage.__live = {}
+            FileStorage.__indexed = odict
+            FileStorage.__stale = dict.fromkeys(odict)
+        self.__update(FileStorage.__stale)
+        FileStorage.__stale = {}
+
+    def __update(self, keys):
+        """Bring the partitions and live indexes up to date with keys."""
+        odict = FileStorage.__objects
+        for key in keys:
+            cls_name = key.partition(".")[0]
+            if dict.get(odict, key) is None:
+                FileStorage.__classes.get(cls_name, {}).pop(key, None)
+            else:
+                FileStorage.__classes.setdefault(cls_name, {})[key] = None
+            live = FileStorage.__live.get(cls_name)
+            if live:
+                obj = self.__view(key)
+                for index in live:
+                    index.remove(key)
+                    if obj is not None:
+                        index.add(key, obj)
+
+    def __demand(self, cls_name, attr):
+        """Return the up-to-date index kept on attr of a class, or None.
+
+        An index __refresh() does not keep up to date yet is filled
+        from every object of the class, and kept up to date from then
+        on.
+        """
+        self.__refresh()
+        index = FileStorage.__indexes.get(cls_name, {}).get(attr)
+        live = FileStorage.__live.setdefault(cls_name, [])
+        if index is None or index in live:
+            return index
+        index.clear()
+        for key in FileStorage.__classes.get(cls_name, ()):
+            index.add(key, self.__view(key))
+        live.append(index)
+        return index
+
+    def __counted(self, cls_name, functions, by):
+        """Return the aggregates kept by the indexes of a class, or None.
+
+        Least and greatest values are never kept, as they cannot be
+        undone when an object is removed.
+        """
+        if any(function in ("min", "max") for function, attr in functions):
+            return None
+        attrs = {attr for function, attr in functions if attr is not None}
+        indexes = FileStorage.__indexes.get(cls_name, {})
+        if len(attrs) == 0 and by is None:
+            return {None: [self.count(cls_name)] * len(functions)}
+        if len(attrs) == 0 and self.indexed(cls_name, by) == "hash":
+            return {group: [n] * len(functions) for group, n in
+                    self.__demand(cls_name, by).sizes().items()}
+        for key, index in indexes.items():
+            if (index.kind != "counters" or not attrs <= set(index.attr[1])
+                    or by not in (None, index.attr[0])):
+                continue
+            groups = self.__demand(cls_name, key).groups()
+            if by is None:
+                total = [sum(column) for column in zip(*groups.values())]
+                if len(total) == 0 or total[0] != self.count(cls_name):
+                    # Objects with unhashable grouping values are missing.
+                    continue
+                groups = {None: total}
+            place = {attr: 3 * i + 1 for i, attr in enumerate(index.attr[1])}
+            return {group: [result(function, counts[0], None if attr is None
+                                   else counts[place[attr]:place[attr] + 3])
+                            for function, attr in functions]
+                    for group, counts in groups.items()}
+        return None
+
+    def __grid(self, cls_name):
+        """Return the up-to-date grid index of the locations of a class.
+
+        A class without one is indexed by a throwaway grid index.
+        """
+        attrs = geo_keys.get(cls_name, ("latitude", "longitude"))
+        grid = self.__demand(cls_name, attrs)
+        if grid is None:
+            grid = GridIndex(attrs)
+            for key in FileStorage.__classes.get(cls_name, ()):
+                grid.add(key, self.__view(key))
+        return grid
+
+    def __append(self):
+        """Append one journal line per pending record to __log_path."""
+        if len(FileStorage.__pending) == 0:
+            return
+        with open(FileStorage.__log_path, "a") as f:
+            for key, obj in FileStorage.__pending.items():
+                if obj is None:
+                    value = "null"
+                else:
+                    value = self.__json_fragment(key, obj)
+                line = '{{"key": {}, "value": {}}}\n'.format(
+                    json.dumps(key), value)
+                f.write(line)
+                FileStorage.__log_bytes += len(line)
+            if FileStorage.__durability == "fsync":
+                f.flush()
+                os.fsync(f.fileno())
+        FileStorage.__log_records += len(FileStorage.__pending)
+        self.__check_log()
+
+    def __check_log(self):
+        """Start a compaction if the journal has passed a threshold."""
+        if (FileStorage.__log_records >= FileStorage.__compact_records or
+                FileStorage.__log_bytes >= FileStorage.__compact_bytes):
+            self.compact()
+
+    def __wait(self):
+        """Block until a running compaction has finished."""
+        if FileStorage.__compactor is not None:
+            FileStorage.__compactor.join()
+
+    def __fold(self):
+        """Merge __old_log_path into a new snapshot, then remove it.
+
+        The snapshot is streamed record by record; only the changes
+        read from the journal are held in memory.
+        """
+        fmt = FileStorage.__format
+        changes = dict(self.__records(FileStorage.__old_log_path))
+        self.__write_snapshot(((key, fmt.encode(key, record))
+                               for key, record in self.__merge(changes)),
+                              True)
+        os.remove(FileStorage.__old_log_path)
+
+    def __write_snapshot(self, fragments, atomic=False):
+        """Write the (key, encoding) pairs of fragments as the snapshot.
+
+        Unless the durability level is "none", the pairs are written to
+        __new_path, which then replaces __file_path, so a crash leaves
+        either the old or the new snapshot behind; at "fsync" the new
+        file and its directory are also synced, as is each append to
+        the journal.
+
+        Args:
+            fragments (iterable): The (key, encoding) pairs to write.
+            atomic (bool): Whether to replace the file even at "none".
+        """
+        fmt = FileStorage.__format
+        level = FileStorage.__durability
+        path = FileStorage.__file_path
+        if atomic or level != "none":
+            path = FileStorage.__new_path
+        try:
+            with open(path, "wb" if fmt.binary else "w",
+                      buffering=FileStorage.__buffering) as f:
+                fmt.write(f, fragments)
+                if level == "fsync":
+                    f.flush()
+                    os.fsync(f.fileno())
+        except BaseException:
+            if path == FileStorage.__new_path:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            raise
+        if path == FileStorage.__new_path:
+            os.replace(path, FileStorage.__file_path)
+            if level == "fsync":
+                fd = os.open(os.path.dirname(os.path.abspath(path)),
+                             os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+
+    def __merge(self, changes):
+        """Yield the (key, record) pairs of the snapshot with changes.
+
+        Changed records keep their place, deleted ones are skipped and
+        new ones follow the snapshot.
+        """
+        fmt = FileStorage.__format
+        try:
+            with open(FileStorage.__file_path, "rb" if fmt.binary else "r",
+                      buffering=FileStorage.__buffering) as f:
+                for key, record in fmt.read(f):
+                    if key in changes:
+                        record = changes.pop(key)
+                    if record is not None:
+                        yield key, record
+        except FileNotFoundError:
+            pass
+        for key, record in changes.items():
+            if record is not None:
+                yield key, record
+
+    def __records(self, path):
+        """Yield the (key, value) records of the journal at path.
+
+        Only the last line can be torn by an interrupted append, and
+        it is the only one without a newline, so it alone is skipped.
+        """
+        try:
+            with open(path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        return
+                    record = json.loads(line)
+                    yield record["key"], record["value"]
+        except FileNotFoundError:
+            return
+
+    def __trim(self, path):
+        """Truncate the journal at path after its last full line.
+
+        This drops a line torn by an interrupted append, so that the
+        next append starts a line of its own.
+
+        Returns:
+            The size of the journal, 0 if there is none.
+        """
+        try:
+            with open(path, "rb+") as f:
+                end = size = f.seek(0, os.SEEK_END)
+                while end > 0:
+                    start = max(0, end - 4096)
+                    f.seek(start)
+                    block = f.read(end - start)
+                    if b"\n" in block:
+                        end = start + block.rindex(b"\n") + 1
+                        break
+                    end = start
+                if end < size:
+                    f.truncate(end)
+                return end
+        except FileNotFoundError:
+            return 0
+
+    def __replay(self, path):
+        """Apply the records of the journal at path to __objects.
+
+        Returns:
+            The number of records replayed.
+        """
+        count = 0
+        for key, value in self.__records(path):
+            if value is None:
+                FileStorage.__objects.pop(key, None)
+                FileStorage.__stale[key] = None
+            else:
+                self.__load(key, value)
+            count += 1
+        return count
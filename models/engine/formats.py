@@ -0,0 +1,282 @@
+#!/usr/bin/python3
+"""Defines the snapshot file formats of the storage engine.
+
+Usage: ./models/engine/formats.py <source> <destination>
+Converts a snapshot between formats, chosen by file extension.
+"""
+import json
+import os
+import re
+import struct
+import sys
+from datetime import datetime
+from datetime import timedelta
+
+
+class JSONFormat:
+    """Represent the JSON snapshot format, the interchange default.
+
+    A snapshot is a single JSON object mapping each key to the
+    dictionary of its object. It is read incrementally, one member at
+    a time, so the whole document is never held in memory at once.
+
+    Attributes:
+        binary (bool): Whether files must be opened in binary mode.
+        chunk_size (int): The number of characters read at a time.
+    """
+
+    binary = False
+    chunk_size = 1 << 16
+    __whitespace = re.compile(r"[ \t\n\r]*")
+
+    def encode(self, key, record):
+        """Return the encoding of the record stored under key.
+
+        Datetime values are written in ISO format.
+        """
+        return json.dumps(record, default=datetime.isoformat)
+
+    def decode(self, key, fragment):
+        """Return the record that encode() encoded to fragment."""
+        return json.loads(fragment)
+
+    def write(self, f, fragments):
+        """Write a snapshot of (key, encoded record) pairs to f."""
+        f.write("{")
+        sep = ""
+        for key, fragment in fragments:
+            f.write(sep + json.dumps(key) + ": " + fragment)
+            sep = ", "
+        f.write("}")
+
+    def read(self, f, progress=None, raw=False):
+        """Yield the (key, record) pairs of the JSON object in f.
+
+        Args:
+            f (file): A snapshot opened in text mode.
+            progress (callable): Called as progress(done, total) with the
+                number of characters read so far and the file size.
+            raw (bool): Whether to yield the JSON text of each record,
+                for decode(), instead of the record.
+
+        Raises:
+            ValueError: If f does not hold a JSON object.
+        """
+        scan = json.JSONDecoder().scan_once
+        ws = JSONFormat.__whitespace.match
+        total = _size(f)
+        done = 0
+        buf = ""
+        pos = 0
+        first = None
+        while True:
+            chunk = f.read(self.chunk_size)
+            eof = chunk == ""
+            done += len(chunk)
+            if progress is not None:
+                progress(done, total)
+            buf = buf[pos:] + chunk
+            pos = ws(buf).end()
+            if first is None:
+                if pos == len(buf) and not eof:
+                    continue
+                if buf[pos:pos + 1] != "{":
+                    raise ValueError("snapshot is not a JSON object")
+                pos = ws(buf, pos + 1).end()
+                first = True
+            while True:
+                # Members are only yielded once the separator after them
+                # is buffered; a partial one is retried after a read.
+                mark = pos
+                try:
+                    if first and buf[pos] == "}":
+                        return
+                    key, pos = scan(buf, pos)
+                    pos = ws(buf, pos).end()
+                    if buf[pos] != ":" or type(key) is not str:
+                        raise ValueError("malformed snapshot member")
+                    start = ws(buf, pos + 1).end()
+                    value, pos = scan(buf, start)
+                    if raw:
+                        value = buf[start:pos]
+                    pos = ws(buf, pos).end()
+                    sep = buf[pos]
+                except (IndexError, StopIteration, ValueError):
+                    if eof:
+                        raise ValueError("malformed snapshot at character "
+                                         "{}".format(done - len(buf) + mark))
+                    pos = mark
+                    break
+                first = False
+                yield key, value
+                if sep == "}":
+                    return
+                if sep != ",":
+                    raise ValueError("malformed snapshot at character "
+                                     "{}".format(done - len(buf) + pos))
+                pos = ws(buf, pos + 1).end()
+
+
+def _size(f):
+    """Return the size of the file f, or None if it is unknown."""
+    try:
+        return os.fstat(f.fileno()).st_size
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+class BinaryFormat:
+    """Represent the compact binary snapshot format.
+
+    A snapshot starts with MAGIC, whose last byte is the version of the
+    format, and holds one record per object: a 4-byte little-endian
+    length, then the 2-byte length and UTF-8 bytes of the key, then the
+    JSON encoding of the record, where created_at and updated_at are
+    stored as microseconds since the epoch. The key is read without
+    decoding the record.
+
+    Attributes:
+        binary (bool): Whether files must be opened in binary mode.
+        chunk_size (int): The number of bytes read between two progress
+            reports.
+        MAGIC (bytes): The bytes every binary snapshot starts with.
+        EPOCH (datetime): The origin of the stored timestamps.
+    """
+
+    binary = True
+    chunk_size = 1 << 16
+    MAGIC = b"HBNB\x02"
+    EPOCH = datetime(1970, 1, 1)
+    __length = struct.Struct("<I")
+    __key_length = struct.Struct("<H")
+    __dates = ("created_at", "updated_at")
+    __scan = json.JSONDecoder().scan_once
+
+    def encode(self, key, record):
+        """Return the length-prefixed encoding of the record under key."""
+        record = dict(record)
+        for k in BinaryFormat.__dates:
+            if k in record:
+                v = record[k]
+                if type(v) is not datetime:
+                    v = datetime.fromisoformat(v)
+                record[k] = (v - BinaryFormat.EPOCH) // timedelta(
+                    microseconds=1)
+        key = key.encode("utf-8")
+        payload = (BinaryFormat.__key_length.pack(len(key)) + key +
+                   json.dumps(record).encode("utf-8"))
+        return BinaryFormat.__length.pack(len(payload)) + payload
+
+    def decode(self, key, fragment):
+        """Return the record that encode() encoded to fragment."""
+        return self.__record(fragment[BinaryFormat.__length.size:])[1]
+
+    def write(self, f, fragments):
+        """Write a snapshot of (key, encoded record) pairs to f."""
+        f.write(BinaryFormat.MAGIC)
+        for key, fragment in fragments:
+            f.write(fragment)
+
+    def read(self, f, progress=None, raw=False):
+        """Yield the (key, record) pairs of f.
+
+        Args:
+            f (file): A snapshot opened in binary mode.
+            progress (callable): Called as progress(done, total) with the
+                number of bytes read so far and the file size.
+            raw (bool): Whether to yield the bytes of each record, for
+                decode(), instead of the record.
+
+        Raises:
+            ValueError: If f is not a binary snapshot of this version,
+                or does not end on a record boundary.
+        """
+        magic = f.read(len(BinaryFormat.MAGIC))
+        if magic != BinaryFormat.MAGIC:
+            if (len(magic) == len(BinaryFormat.MAGIC) and
+                    magic[:-1] == BinaryFormat.MAGIC[:-1]):
+                raise ValueError("unsupported binary snapshot version "
+                                 "{}".format(magic[-1]))
+            raise ValueError("not a binary snapshot")
+        total = _size(f)
+        done = reported = len(BinaryFormat.MAGIC)
+        size = BinaryFormat.__length.size
+        while True:
+            header = f.read(size)
+            if len(header) == 0:
+                break
+            if len(header) < size:
+                raise ValueError("truncated binary snapshot")
+            length = BinaryFormat.__length.unpack(header)[0]
+            payload = f.read(length)
+            if len(payload) < length:
+                raise ValueError("truncated binary snapshot")
+            done += size + length
+            if progress is not None and done - reported >= self.chunk_size:
+                progress(done, total)
+                reported = done
+            if raw:
+                yield self.__split(payload)[0], header + payload
+            else:
+                yield self.__record(payload)
+        if progress is not None:
+            progress(done, total)
+
+    @staticmethod
+    def __split(payload):
+        """Return the key stored in payload and the offset of its record."""
+        size = BinaryFormat.__key_length.size
+        end = size + BinaryFormat.__key_length.unpack_from(payload)[0]
+        return payload[size:end].decode("utf-8"), end
+
+    @staticmethod
+    def __record(payload):
+        """Return the (key, record) pair stored in payload.
+
+        The stored timestamps are turned back into datetimes.
+        """
+        key, end = BinaryFormat.__split(payload)
+        record = BinaryFormat.__scan(payload[end:].decode("utf-8"), 0)[0]
+        for k in BinaryFormat.__dates:
+            if k in record:
+                record[k] = BinaryFormat.EPOCH + timedelta(
+                    microseconds=record[k])
+        return key, record
+
+
+def get_format(path, name=None):
+    """Return the format of a snapshot file.
+
+    Args:
+        path (str): The snapshot path; a ".bin" extension selects the
+            binary format and anything else JSON.
+        name (str): "json" or "binary" to override the extension.
+
+    Raises:
+        ValueError: If name is not a known format.
+    """
+    if name is None or name == "":
+        name = "binary" if path.endswith(".bin") else "json"
+    if name == "json":
+        return JSONFormat()
+    if name == "binary":
+        return BinaryFormat()
+    raise ValueError("unknown storage format: {}".format(name))
+
+
+def convert(src, dst):
+    """Copy the snapshot at src to dst, converting between formats."""
+    src_format = get_format(src)
+    dst_format = get_format(dst)
+    with open(src, "rb" if src_format.binary else "r") as f:
+        records = list(src_format.read(f))
+    with open(dst, "wb" if dst_format.binary else "w") as f:
+        dst_format.write(f, ((key, dst_format.encode(key, record))
+                             for key, record in records))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: {} <source> <destination>".format(sys.argv[0]))
+        sys.exit(1)
+    convert(sys.argv[1], sys.argv[2])
@@ -0,0 +1,635 @@
+#!/usr/bin/python3
+"""Defines the indexes maintained by the storage engine.
+
+Attributes:
+    foreign_keys (dict): The foreign-key attribute names of each model
+        class, by class name.
+    range_keys (dict): The numeric attribute names of each model class
+        that can be kept in sorted indexes, by class name.
+    geo_keys (dict): The (latitude, longitude) attribute names of each
+        model class with a location, by class name.
+    text_keys (dict): The text attribute names of each model class that
+        are searched together, by class name.
+    counter_keys (dict): The numeric attribute names of each model class
+        whose count and sum are kept per group, by grouping attribute
+        name, by class name.
+    EARTH_RADIUS (float): The mean radius of the Earth in kilometers.
+"""
+import re
+from bisect import bisect_left
+from bisect import bisect_right
+from heapq import nsmallest
+from math import asin
+from math import cos
+from math import degrees
+from math import floor
+from math import log
+from math import pi
+from math import radians
+from math import sin
+from math import sqrt
+from models.engine.columns import ColumnStore
+from models.engine.columns import column_keys
+
+foreign_keys = {
+    "City": ("state_id",),
+    "Place": ("city_id", "user_id"),
+    "Review": ("place_id", "user_id")
+}
+
+range_keys = {
+    "Place": ("number_rooms", "max_guest", "price_by_night")
+}
+
+geo_keys = {
+    "Place": ("latitude", "longitude")
+}
+
+text_keys = {
+    "State": ("name",),
+    "City": ("name",),
+    "Amenity": ("name",),
+    "Place": ("name", "description"),
+    "Review": ("text",)
+}
+
+counter_keys = {
+    "Place": {
+        "city_id": ("number_rooms", "number_bathrooms", "max_guest",
+                    "price_by_night")
+    }
+}
+
+EARTH_RADIUS = 6371.0088
+
+
+def build_indexes(ranges=False, columns=False):
+    """Return new, empty indexes of each class, by attribute name.
+
+    The grid index of a class with a location is keyed by its
+    (latitude, longitude) pair of attribute names, the text index of a
+    class by its tuple of text attribute names, and each counter index
+    by its (grouping attribute name, attribute names) pair.
+
+    Args:
+        ranges (bool): Whether to add sorted indexes on range_keys.
+        columns (bool): Whether to add column stores on column_keys,
+            keyed by their tuple of attribute names.
+    """
+    indexes = {cls_name: {attr: HashIndex(attr) for attr in attrs}
+               for cls_name, attrs in foreign_keys.items()}
+    for cls_name, attrs in geo_keys.items():
+        indexes.setdefault(cls_name, {})[attrs] = GridIndex(attrs)
+    for cls_name, attrs in text_keys.items():
+        indexes.setdefault(cls_name, {})[attrs] = TextIndex(attrs)
+    for cls_name, groups in counter_keys.items():
+        for by, attrs in groups.items():
+            indexes.setdefault(cls_name, {})[by, attrs] = CounterIndex(
+                by, attrs)
+    if columns:
+        for cls_name, types in column_keys.items():
+            indexes.setdefault(cls_name, {})[tuple(types)] = ColumnStore(
+                tuple(types), tuple(types.values()))
+    if ranges:
+        for cls_name, attrs in range_keys.items():
+            for attr in attrs:
+                indexes.setdefault(cls_name, {})[attr] = SortedIndex(attr)
+    return indexes
+
+
+class HashIndex:
+    """Represent a hash index from an attribute value to object keys.
+
+    Attributes:
+        attr (str): The name of the indexed attribute.
+        kind (str): "hash", the kind of lookups the index answers.
+    """
+
+    kind = "hash"
+
+    def __init__(self, attr):
+        """Initialize a new HashIndex.
+
+        Args:
+            attr (str): The name of the attribute to index.
+        """
+        self.attr = attr
+        self.__keys = {}
+        self.__values = {}
+
+    def add(self, key, obj):
+        """Index the object obj stored under key.
+
+        Objects whose attribute value is unhashable are not indexed.
+        """
+        value = getattr(obj, self.attr, None)
+        try:
+            self.__keys.setdefault(value, set()).add(key)
+        except TypeError:
+            return
+        self.__values[key] = value
+
+    def remove(self, key):
+        """Remove the object stored under key from the index."""
+        if key not in self.__values:
+            return
+        value = self.__values.pop(key)
+        bucket = self.__keys[value]
+        bucket.discard(key)
+        if len(bucket) == 0:
+            del self.__keys[value]
+
+    def get(self, value):
+        """Return the list of keys whose attribute equals value."""
+        try:
+            return list(self.__keys.get(value, ()))
+        except TypeError:
+            return []
+
+    def sizes(self):
+        """Return the number of keys of each attribute value."""
+        return {value: len(keys) for value, keys in self.__keys.items()}
+
+    def clear(self):
+        """Remove every object from the index."""
+        self.__keys.clear()
+        self.__values.clear()
+
+
+class CounterIndex:
+    """Represent running counts and sums of attributes, per group.
+
+    Objects are grouped by the value of an attribute. Each group keeps
+    its number of objects and, for each counted attribute, the number
+    of its values that are not None, and the number and sum of its int
+    and float values, as aggregate() counts them. All of these can be
+    undone when an object is removed, unlike a least or greatest value.
+
+    Attributes:
+        attr (tuple): The (grouping attribute name, attribute names)
+            pair of the index.
+        kind (str): "counters", the kind of aggregates the index keeps.
+    """
+
+    kind = "counters"
+
+    def __init__(self, by, attrs):
+        """Initialize a new CounterIndex.
+
+        Args:
+            by (str): The name of the attribute grouping the objects.
+            attrs (tuple): The names of the attributes to count.
+        """
+        self.attr = (by, attrs)
+        self.__groups = {}
+        self.__entries = {}
+
+    def add(self, key, obj):
+        """Count the object obj stored under key.
+
+        Objects whose grouping value is unhashable are not counted.
+        """
+        by, attrs = self.attr
+        group = getattr(obj, by, None)
+        values = [getattr(obj, attr, None) for attr in attrs]
+        try:
+            self.__update(group, values, 1)
+        except TypeError:
+            return
+        self.__entries[key] = (group, values)
+
+    def remove(self, key):
+        """Remove the object stored under key from the counts."""
+        if key not in self.__entries:
+            return
+        group, values = self.__entries.pop(key)
+        self.__update(group, values, -1)
+
+    def groups(self):
+        """Return the counts of each group, by grouping value.
+
+        Returns:
+            A dictionary of [objects, (present, count, total) of each
+            attribute...] lists, copied from the index.
+        """
+        return {group: list(counts) for group, counts in
+                self.__groups.items()}
+
+    def clear(self):
+        """Remove every object from the counts."""
+        self.__groups.clear()
+        self.__entries.clear()
+
+    def __update(self, group, values, sign):
+        """Add sign times the object of group holding values to counts."""
+        counts = self.__groups.get(group)
+        if counts is None:
+            counts = self.__groups[group] = [0] * (1 + 3 * len(values))
+        counts[0] += sign
+        if counts[0] == 0:
+            del self.__groups[group]
+            return
+        i = 1
+        for value in values:
+            if value is not None:
+                counts[i] += sign
+                if type(value) in (int, float) and value == value:
+                    counts[i + 1] += sign
+                    if counts[i + 1] == 0:
+                        # Do not let float rounding leave a sum of nothing.
+                        counts[i + 2] = 0
+                    else:
+                        counts[i + 2] += sign * value
+            i += 3
+
+
+class SortedIndex:
+    """Represent a sorted index of the numeric values of an attribute.
+
+    The values are kept in a list sorted with bisect, next to the list
+    of the keys they belong to, ordered by (value, key) so that the
+    entry of a key is found in O(log N) time, and a range of values in
+    O(log N + k) time. Added and removed keys are buffered until the
+    next read, which moves a few in place or sorts many at once, so
+    building the index over N objects takes O(N log N) time; a key
+    removed and added back with the same value is not moved at all.
+
+    Attributes:
+        attr (str): The name of the indexed attribute.
+        kind (str): "range", the kind of lookups the index answers.
+    """
+
+    kind = "range"
+
+    def __init__(self, attr):
+        """Initialize a new SortedIndex.
+
+        Args:
+            attr (str): The name of the attribute to index.
+        """
+        self.attr = attr
+        self.__sorted = []
+        self.__keys = []
+        self.__added = []
+        self.__removed = set()
+        self.__values = {}
+
+    def add(self, key, obj):
+        """Index the object obj stored under key.
+
+        Objects whose attribute value is not an int, a float or a bool
+        are not indexed; a bool is indexed as 0 or 1, as it compares.
+        """
+        value = getattr(obj, self.attr, None)
+        if type(value) is bool:
+            value = int(value)
+        elif type(value) not in (int, float) or value != value:
+            return
+        self.__values[key] = value
+        if (value, key) in self.__removed:
+            self.__removed.discard((value, key))
+        else:
+            self.__added.append((value, key))
+
+    def remove(self, key):
+        """Remove the object stored under key from the index."""
+        if key in self.__values:
+            self.__removed.add((self.__values.pop(key), key))
+
+    def get(self, value):
+        """Return the list of keys whose attribute equals value."""
+        return self.range(value, value)
+
+    def range(self, low=None, high=None, include_low=True,
+              include_high=True):
+        """Return the keys whose attribute lies between low and high.
+
+        Args:
+            low (int or float): The lower bound, or None for no bound.
+            high (int or float): The upper bound, or None for no bound.
+            include_low (bool): Whether the lower bound is included.
+            include_high (bool): Whether the upper bound is included.
+
+        Returns:
+            The list of keys, in increasing order of their values.
+        """
+        self.__merge()
+        try:
+            if low is None:
+                start = 0
+            elif include_low:
+                start = bisect_left(self.__sorted, low)
+            else:
+                start = bisect_right(self.__sorted, low)
+            if high is None:
+                stop = len(self.__sorted)
+            elif include_high:
+                stop = bisect_right(self.__sorted, high)
+            else:
+                stop = bisect_left(self.__sorted, high)
+        except TypeError:
+            return []
+        return self.__keys[start:stop]
+
+    def clear(self):
+        """Remove every object from the index."""
+        self.__sorted.clear()
+        self.__keys.clear()
+        self.__added.clear()
+        self.__removed.clear()
+        self.__values.clear()
+
+    def __merge(self):
+        """Move the buffered keys into or out of the sorted lists."""
+        added = self.__added
+        removed = self.__removed
+        if len(added) == 0 and len(removed) == 0:
+            return
+        if (len(added) + len(removed)) * 16 < len(self.__sorted):
+            for value, key in added:
+                i = self.__find(value, key)
+                self.__sorted.insert(i, value)
+                self.__keys.insert(i, key)
+            for value, key in removed:
+                i = self.__find(value, key)
+                del self.__sorted[i]
+                del self.__keys[i]
+        else:
+            added.extend(zip(self.__sorted, self.__keys))
+            if len(removed) > 0:
+                added = [entry for entry in added if entry not in removed]
+            added.sort()
+            self.__sorted = [value for value, key in added]
+            self.__keys = [key for value, key in added]
+        self.__added = []
+        self.__removed = set()
+
+    def __find(self, value, key):
+        """Return the position of (value, key) in the sorted lists."""
+        return bisect_left(self.__keys, key,
+                           bisect_left(self.__sorted, value),
+                           bisect_right(self.__sorted, value))
+
+
+class GridIndex:
+    """Represent a grid index of the locations of objects.
+
+    The Earth is divided into cells of size by size degrees, and each
+    cell holds the keys of the objects located in it, so a box or a
+    circle is searched by visiting the cells it overlaps only. The
+    radians and cosine of each location are kept with it, so distances
+    to the candidates are computed in one pass without converting
+    their coordinates again.
+
+    Attributes:
+        attr (tuple): The (latitude, longitude) attribute names.
+        kind (str): "geo", the kind of lookups the index answers.
+        size (float): The height and width of a cell in degrees.
+    """
+
+    kind = "geo"
+
+    def __init__(self, attr, size=0.1):
+        """Initialize a new GridIndex.
+
+        Args:
+            attr (tuple): The (latitude, longitude) attribute names.
+            size (float): The height and width of a cell in degrees.
+        """
+        self.attr = attr
+        self.size = size
+        self.__columns = round(360 / size)
+        self.__cells = {}
+        self.__points = {}
+
+    def add(self, key, obj):
+        """Index the object obj stored under key.
+
+        Objects whose latitude or longitude is not an int or a float,
+        or lies out of range, are not indexed.
+        """
+        lat = getattr(obj, self.attr[0], None)
+        lon = getattr(obj, self.attr[1], None)
+        if (type(lat) not in (int, float) or type(lon) not in (int, float)
+                or not -90 <= lat <= 90 or not -180 <= lon <= 180):
+            return
+        cell = self.__cell(lat, lon)
+        rlat = radians(lat)
+        self.__cells.setdefault(cell, {})[key] = (
+            lat, lon, rlat, radians(lon), cos(rlat))
+        self.__points[key] = cell
+
+    def remove(self, key):
+        """Remove the object stored under key from the index."""
+        if key not in self.__points:
+            return
+        cell = self.__points.pop(key)
+        points = self.__cells[cell]
+        del points[key]
+        if len(points) == 0:
+            del self.__cells[cell]
+
+    def box(self, south, west, north, east):
+        """Return the keys located in a box, in no particular order.
+
+        A box whose west edge is east of its east edge crosses the
+        180th meridian.
+        """
+        if west <= east:
+            def inside(lon):
+                return west <= lon <= east
+        else:
+            def inside(lon):
+                return lon >= west or lon <= east
+        return [key for key, point in self.__candidates(south, west, north,
+                                                        east)
+                if south <= point[0] <= north and inside(point[1])]
+
+    def near(self, lat, lon, km):
+        """Return the (distance, key) pairs located within km of a point.
+
+        Distances are great-circle distances in kilometers, and pairs
+        come by increasing distance.
+        """
+        angle = km / EARTH_RADIUS
+        south = lat - degrees(angle)
+        north = lat + degrees(angle)
+        rlat = radians(lat)
+        if south <= -90 or north >= 90 or sin(angle) >= cos(rlat):
+            # The circle reaches a pole: every longitude is in range.
+            west, east = -180, 180
+        else:
+            spread = degrees(asin(sin(angle) / cos(rlat)))
+            west = (lon - spread + 180) % 360 - 180
+            east = (lon + spread + 180) % 360 - 180
+        rlon = radians(lon)
+        coslat = cos(rlat)
+        found = []
+        for key, point in self.__candidates(max(south, -90), west,
+                                            min(north, 90), east):
+            h = (sin((point[2] - rlat) / 2) ** 2 + coslat * point[4] *
+                 sin((point[3] - rlon) / 2) ** 2)
+            distance = 2 * EARTH_RADIUS * asin(sqrt(min(h, 1.0)))
+            if distance <= km:
+                found.append((distance, key))
+        found.sort()
+        return found
+
+    def nearest(self, lat, lon, k):
+        """Return the (distance, key) pairs of the k keys nearest a point.
+
+        The radius searched doubles from the size of a cell until it
+        holds k keys or covers the whole Earth.
+        """
+        if k <= 0 or len(self.__points) == 0:
+            return []
+        km = self.size * 111.0
+        while True:
+            found = self.near(lat, lon, km)
+            if len(found) >= k or km >= EARTH_RADIUS * pi:
+                return found[:k]
+            km *= 2
+
+    def clear(self):
+        """Remove every object from the index."""
+        self.__cells.clear()
+        self.__points.clear()
+
+    def __cell(self, lat, lon):
+        """Return the (row, column) of the cell a location lies in."""
+        return (floor(lat / self.size),
+                floor((lon + 180) / self.size) % self.__columns)
+
+    def __candidates(self, south, west, north, east):
+        """Yield the (key, point) pairs of the cells a box overlaps."""
+        first, last = self.__cell(south, west), self.__cell(north, east)
+        rows = range(first[0], last[0] + 1)
+        if west <= east and east - west >= 360 - self.size:
+            columns = range(self.__columns)
+        elif west <= east and last[1] >= first[1]:
+            columns = range(first[1], last[1] + 1)
+        else:
+            columns = list(range(first[1], self.__columns))
+            columns.extend(range(0, last[1] + 1))
+        cells = self.__cells
+        if len(rows) * len(columns) > len(cells):
+            # Fewer cells are occupied than overlapped: test those.
+            columns = set(columns)
+            for (row, column), points in cells.items():
+                if row in rows and column in columns:
+                    yield from points.items()
+            return
+        for row in rows:
+            for column in columns:
+                points = cells.get((row, column))
+                if points is not None:
+                    yield from points.items()
+
+
+class TextIndex:
+    """Represent an inverted index of the words of text attributes.
+
+    The str values of the attributes of an object are split into
+    case-folded words, and each word maps to the keys of the objects
+    using it with the number of times they do. Searches rank objects
+    with Okapi BM25.
+
+    Attributes:
+        attr (tuple): The names of the indexed attributes.
+        kind (str): "text", the kind of lookups the index answers.
+        k1 (float): The BM25 term frequency saturation.
+        b (float): The BM25 document length normalization.
+    """
+
+    kind = "text"
+    k1 = 1.2
+    b = 0.75
+    __word = re.compile(r"\w+")
+
+    def __init__(self, attr):
+        """Initialize a new TextIndex.
+
+        Args:
+            attr (tuple): The names of the attributes to index.
+        """
+        self.attr = attr
+        self.__postings = {}
+        self.__words = {}
+        self.__total = 0
+
+    @classmethod
+    def tokenize(cls, text):
+        """Return the list of case-folded words of text."""
+        return TextIndex.__word.findall(text.casefold())
+
+    def add(self, key, obj):
+        """Index the words of the object obj stored under key.
+
+        Attribute values that are not strings are not indexed.
+        """
+        counts = {}
+        for attr in self.attr:
+            value = getattr(obj, attr, None)
+            if type(value) is not str:
+                continue
+            for word in self.tokenize(value):
+                counts[word] = counts.get(word, 0) + 1
+        if len(counts) == 0:
+            return
+        postings = self.__postings
+        for word, count in counts.items():
+            postings.setdefault(word, {})[key] = count
+        length = sum(counts.values())
+        self.__words[key] = (tuple(counts), length)
+        self.__total += length
+
+    def remove(self, key):
+        """Remove the object stored under key from the index."""
+        if key not in self.__words:
+            return
+        words, length = self.__words.pop(key)
+        for word in words:
+            posting = self.__postings[word]
+            del posting[key]
+            if len(posting) == 0:
+                del self.__postings[word]
+        self.__total -= length
+
+    def search(self, text, limit=None):
+        """Return the (score, key) pairs of the keys matching text.
+
+        A key matches if it uses any word of text, and pairs come by
+        decreasing BM25 score, then by key.
+
+        Args:
+            text (str): The words to search for.
+            limit (int): The greatest number of pairs, or None for all.
+        """
+        count = len(self.__words)
+        if count == 0:
+            return []
+        words = self.__words
+        average = self.__total / count
+        k1, b = self.k1, self.b
+        scores = {}
+        for word in set(self.tokenize(text)):
+            posting = self.__postings.get(word)
+            if posting is None:
+                continue
+            idf = log(1 + (count - len(posting) + 0.5) / (len(posting) + 0.5))
+            for key, tf in posting.items():
+                norm = tf + k1 * (1 - b + b * words[key][1] / average)
+                scores[key] = (scores.get(key, 0.0) +
+                               idf * tf * (k1 + 1) / norm)
+        ranked = ((-score, key) for key, score in scores.items())
+        if limit is None:
+            ranked = sorted(ranked)
+        else:
+            ranked = nsmallest(limit, ranked)
+        return [(-score, key) for score, key in ranked]
+
+    def clear(self):
+        """Remove every object from the index."""
+        self.__postings.clear()
+        self.__words.clear()
+        self.__total = 0
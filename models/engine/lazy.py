@@ -0,0 +1,151 @@
+#!/usr/bin/python3
+"""Defines the LazyObjects and Record classes."""
+from models.base_model import classes
+from models.engine.formats import JSONFormat
+
+
+class LazyObjects(dict):
+    """Represent a dictionary of objects built on first access.
+
+    Values are stored either as model instances or as the fragments
+    a snapshot format encoded them to, a str or bytes far smaller than
+    the decoded record. A fragment is decoded and turned into an
+    instance when it is first read through the mapping interface,
+    including copy(), pop(), popitem(), setdefault() and dict(self).
+    The base dict methods, such as dict.get(self, key), still see the
+    fragments.
+    """
+
+    def __init__(self, objects=(), decode=None):
+        """Initialize a new LazyObjects.
+
+        Args:
+            objects (dict): The initial objects or fragments by key.
+            decode (callable): Called as decode(key, fragment) to return
+                the record a fragment encodes; JSONFormat().decode by
+                default.
+        """
+        super().__init__(objects)
+        if decode is None:
+            decode = JSONFormat().decode
+        self.__decode = decode
+
+    @staticmethod
+    def unbuilt(value):
+        """Return whether value is a fragment rather than an object."""
+        return type(value) is str or type(value) is bytes
+
+    def __iter__(self):
+        """Return an iterator over the keys.
+
+        Defining it makes dict(self) and {**self} read each value
+        through __getitem__() instead of copying the raw records.
+        """
+        return super().__iter__()
+
+    def __getitem__(self, key):
+        """Return the object under key, building it if needed."""
+        value = super().__getitem__(key)
+        if self.unbuilt(value):
+            value = self.__build(key, value)
+        return value
+
+    def get(self, key, default=None):
+        """Return the object under key, or default if there is none."""
+        if key in self:
+            return self[key]
+        return default
+
+    def values(self):
+        """Build every object and return a view of them."""
+        self.__build_all()
+        return super().values()
+
+    def items(self):
+        """Build every object and return a view of the key/object pairs."""
+        self.__build_all()
+        return super().items()
+
+    def copy(self):
+        """Build every object and return a dict of them by key."""
+        return dict(self.items())
+
+    def pop(self, key, *default):
+        """Remove the object under key and return it.
+
+        Returns default if it is given and there is no object under key.
+        """
+        if key in self:
+            value = self[key]
+            super().pop(key)
+            return value
+        return super().pop(key, *default)
+
+    def popitem(self):
+        """Remove the last key/object pair and return it."""
+        key, value = super().popitem()
+        if self.unbuilt(value):
+            value = self.__make(key, value)
+        return key, value
+
+    def setdefault(self, key, default=None):
+        """Return the object under key, storing default if there is none."""
+        if key in self:
+            return self[key]
+        return super().setdefault(key, default)
+
+    def view(self, key):
+        """Return the attributes stored under key without building them.
+
+        Returns:
+            The object, a Record of its decoded fragment, or None.
+        """
+        value = super().get(key)
+        if self.unbuilt(value):
+            return Record(self.__decode(key, value))
+        return value
+
+    def __build(self, key, fragment):
+        """Replace the fragment under key by the object it encodes."""
+        obj = self.__make(key, fragment)
+        super().__setitem__(key, obj)
+        return obj
+
+    def __make(self, key, fragment):
+        """Return the object a fragment encodes."""
+        o = self.__decode(key, fragment)
+        return classes[o.pop("__class__")](**o)
+
+    def __build_all(self):
+        """Build every object still stored as a fragment."""
+        for key, value in super().items():
+            if self.unbuilt(value):
+                self.__build(key, value)
+
+
+class Record:
+    """Represent a read-only attribute view of a decoded record.
+
+    Attributes missing from the record fall back to the defaults
+    declared on its model class, as they would on an instance.
+    """
+
+    __slots__ = ("__record",)
+
+    def __init__(self, record):
+        """Initialize a new Record.
+
+        Args:
+            record (dict): A dictionary as produced by to_dict().
+        """
+        self.__record = record
+
+    def __getattr__(self, name):
+        """Return the value of name in the record or its class."""
+        try:
+            return self.__record[name]
+        except KeyError:
+            cls = classes[self.__record["__class__"]]
+            if name in cls.schema:
+                return cls.schema[name]
+            return getattr(cls, name)
@@ -0,0 +1,269 @@
+#!/usr/bin/python3
+"""Defines the Query class, the query planner of the storage engine.
+
+Attributes:
+    operators (dict): The comparison of each operator, called with the
+        value of the attribute and the value of the condition.
+"""
+import operator
+import re
+from ast import literal_eval
+from models.base_model import classes
+from models.engine.columns import column_keys
+from models.engine.columns import comparisons
+
+operators = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "in": lambda attr_value, value: attr_value in value,
+    "contains": lambda attr_value, value: value in attr_value
+}
+
+
+class Query:
+    """Represent a query for the objects of a class meeting conditions.
+
+    An equality or "in" condition on an attribute the storage indexes,
+    or the bounds of an attribute it keeps a sorted index on, are
+    answered from the index, and the other conditions are checked on
+    its matches only. Without one, numeric comparisons only are
+    answered from the column store of the class if it is kept, and
+    otherwise the objects of the class are scanned once with a
+    predicate compiled from every condition.
+
+    Attributes:
+        cls_name (str): The name of the class queried.
+        conditions (list): The (attribute, operator, value) conditions,
+            all of which an object must meet.
+    """
+
+    __condition = re.compile(
+        r"(\w+)\s*(==|!=|<=|>=|<|>)\s*(.+)|(\w+)\s+(in|contains)\s+(.+)",
+        re.S)
+    __bounds = ("<", "<=", ">", ">=")
+    __token = re.compile(r"""(?x)
+        "(?:\\.|[^"\\])*"? | '(?:\\.|[^'\\])*'? | [][(){},] | [^][(){},"']+
+    """)
+
+    def __init__(self, cls_name, conditions):
+        """Initialize a new Query.
+
+        Values compared with a str, int or float class attribute are
+        converted to its type where possible, as update does.
+
+        Args:
+            cls_name (str): The name of the class to query.
+            conditions (list): (attribute, operator, value) triples.
+
+        Raises:
+            ValueError: If an operator is unknown or the value of an
+                "in" condition is not a collection.
+        """
+        self.cls_name = cls_name
+        self.conditions = []
+        for attr, op, value in conditions:
+            if op not in operators:
+                raise ValueError("unknown operator: {}".format(op))
+            if op == "in":
+                if type(value) not in (list, tuple, set, frozenset, str):
+                    raise ValueError("in needs a collection")
+                if type(value) is not str:
+                    value = [self.__coerce(attr, v) for v in value]
+                    try:
+                        value = frozenset(value)
+                    except TypeError:
+                        pass
+            else:
+                value = self.__coerce(attr, value)
+            self.conditions.append((attr, op, value))
+
+    @classmethod
+    def parse(cls, cls_name, text):
+        """Return the Query of the comma-separated conditions in text.
+
+        Each condition is <attribute> <operator> <value>, where value is
+        a Python literal, or else taken as a string.
+
+        Raises:
+            ValueError: If a condition cannot be parsed.
+        """
+        conditions = []
+        for part in cls.__split(text):
+            match = Query.__condition.fullmatch(part.strip())
+            if match is None:
+                raise ValueError("invalid condition: {}".format(part))
+            if match.group(1) is not None:
+                attr, op, value = match.group(1, 2, 3)
+            else:
+                attr, op, value = match.group(4, 5, 6)
+            value = value.strip()
+            try:
+                value = literal_eval(value)
+            except (ValueError, SyntaxError, MemoryError, RecursionError):
+                pass
+            conditions.append((attr, op, value))
+        return cls(cls_name, conditions)
+
+    def plan(self, storage):
+        """Return the conditions run() answers from an index.
+
+        They all bear on a single attribute: an equality is preferred
+        to an "in", and an "in" to the bounds of a sorted index, which
+        only answers equality to a number. An empty list means a scan
+        of the class.
+        """
+        kinds = {attr: storage.indexed(self.cls_name, attr)
+                 for attr, op, value in self.conditions}
+        for condition in self.conditions:
+            attr, op, value = condition
+            if op == "==" and (kinds[attr] == "hash" or
+                               kinds[attr] == "range" and
+                               type(value) in (int, float, bool)):
+                return [condition]
+        for condition in self.conditions:
+            attr, op, value = condition
+            if op == "in" and kinds[attr] == "hash" and type(value) is not str:
+                return [condition]
+        for attr, kind in kinds.items():
+            if kind != "range":
+                continue
+            bounds = [c for c in self.conditions if c[0] == attr and
+                      c[1] in Query.__bounds and type(c[2]) in (int, float)]
+            if len(bounds) > 0:
+                return bounds
+        return []
+
+    def run(self, storage):
+        """Return the stored objects meeting every condition.
+
+        Objects found through a hash index or columns come in no
+        particular order, and objects found through a sorted index in
+        increasing order of the attribute.
+        """
+        access = self.plan(storage)
+        if len(access) == 0:
+            store = self.__columns(storage)
+            if store is not None:
+                objs = storage.all()
+                return [objs[key] for key in
+                        store.keys(store.select(self.conditions))]
+            return storage.scan(self.cls_name,
+                                self.predicate(self.conditions))
+        rest = list(self.conditions)
+        for condition in access:
+            del rest[rest.index(condition)]
+        attr, op, value = access[0]
+        if op == "==" and storage.indexed(self.cls_name, attr) == "hash":
+            candidates = storage.lookup(self.cls_name, attr, value)
+        elif op == "==":
+            candidates = storage.between(self.cls_name, attr, value, value)
+        elif op == "in":
+            found = {}
+            for v in value:
+                for obj in storage.lookup(self.cls_name, attr, v):
+                    found[id(obj)] = obj
+            candidates = found.values()
+        else:
+            candidates = storage.between(self.cls_name, attr,
+                                         *self.__range(access))
+        test = self.predicate(rest)
+        return [obj for obj in candidates if test(obj)]
+
+    def predicate(self, conditions):
+        """Return a function telling whether an object meets conditions.
+
+        An attribute an object lacks reads as None, and a comparison
+        between values of different types fails instead of raising.
+        """
+        tests = [self.__compile(*condition) for condition in conditions]
+        if len(tests) == 1:
+            return tests[0]
+
+        def test(obj):
+            for t in tests:
+                if not t(obj):
+                    return False
+            return True
+        return test
+
+    def __compile(self, attr, op, value):
+        """Return the test of a single condition."""
+        compare = operators[op]
+
+        def test(obj):
+            try:
+                return compare(getattr(obj, attr, None), value)
+            except TypeError:
+                return False
+        return test
+
+    def __columns(self, storage):
+        """Return the column store answering every condition, or None."""
+        types = column_keys.get(self.cls_name)
+        if (len(self.conditions) == 0 or types is None or
+                storage.indexed(self.cls_name, tuple(types)) != "columns"):
+            return None
+        store = storage.columns(self.cls_name)
+        for attr, op, value in self.conditions:
+            if (attr not in types or op not in comparisons or
+                    type(value) not in (int, float) or
+                    not store.exact(attr)):
+                return None
+        return store
+
+    @staticmethod
+    def __range(bounds):
+        """Return the narrowest range meeting every bound condition.
+
+        Returns:
+            The (low, high, include_low, include_high) of between().
+        """
+        low = high = None
+        include_low = include_high = True
+        for attr, op, value in bounds:
+            if op[0] == ">":
+                if low is None or value > low or (value == low and
+                                                  op == ">"):
+                    low, include_low = value, op == ">="
+            elif high is None or value < high or (value == high and
+                                                  op == "<"):
+                high, include_high = value, op == "<="
+        return low, high, include_low, include_high
+
+    def __coerce(self, attr, value):
+        """Return value in the type of the class attribute attr, if any."""
+        cls = classes.get(self.cls_name)
+        valtype = type(cls.schema.get(attr)) if cls is not None else None
+        if valtype is str and type(value) in (int, float):
+            return str(value)
+        if valtype in (int, float) and type(value) is str:
+            try:
+                return valtype(value)
+            except ValueError:
+                pass
+        return value
+
+    @classmethod
+    def __split(cls, text):
+        """Return the conditions of text, split on top-level commas."""
+        parts = []
+        part = ""
+        depth = 0
+        for token in Query.__token.findall(text):
+            if token in ("(", "[", "{"):
+                depth += 1
+            elif token in (")", "]", "}"):
+                depth -= 1
+            elif token == "," and depth == 0:
+                parts.append(part)
+                part = ""
+                continue
+            part += token
+        if len(parts) == 0 and part.strip() == "":
+            return []
+        parts.append(part)
+        return parts
@@ -10,14 +10,25 @@ Unittest classes:
     TestHBNBCommand_all
     TestHBNBCommand_destroy
     TestHBNBCommand_update
+    TestHBNBCommand_count
+    TestHBNBCommand_transactions
+    TestHBNBCommand_batch
+    TestHBNBCommand_where
+    TestHBNBCommand_near
+    TestHBNBCommand_search
+    TestHBNBCommand_aggregate
 """
 import os
+import subprocess
 import sys
+import tempfile
 import unittest
 from models import storage
 from models.engine.file_storage import FileStorage
 from console import HBNBCommand
+from console import split_args
 from io import StringIO
+from shlex import split
 from unittest.mock import patch
 
 
@@ -49,6 +60,13 @@ class TestHBNBCommand_help(unittest.TestCase):
             self.assertFalse(HBNBCommand().onecmd("help create"))
             self.assertEqual(h, output.getvalue().strip())
 
+    def test_help_begin(self):
+        h = ("Usage: begin\n        "
+             "Keep the following changes in memory until commit or rollback.")
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("help begin"))
+            self.assertEqual(h, output.getvalue().strip())
+
     def test_help_EOF(self):
         h = "EOF signal to exit the program."
         with patch("sys.stdout", new=StringIO()) as output:
@@ -74,7 +92,9 @@ class TestHBNBCommand_help(unittest.TestCase):
         h = ("Usage: all or all <class> or <class>.all()\n        "
              "Display string representations of all instances of a given class"
              ".\n        If no class is specified, displays all instantiated "
-             "objects.")
+             "objects.\n        Options limit=<n> and offset=<n> page through "
+             "them, and\n        format=lines prints one per line instead of "
+             "a list.")
         with patch("sys.stdout", new=StringIO()) as output:
             self.assertFalse(HBNBCommand().onecmd("help all"))
             self.assertEqual(h, output.getvalue().strip())
@@ -99,7 +119,10 @@ class TestHBNBCommand_help(unittest.TestCase):
     def test_help(self):
         h = ("Documented commands (type help <topic>):\n"
              "========================================\n"
-             "EOF  all  count  create  destroy  help  quit  show  update")
+             "EOF        all    commit  create   help  quit      search  "
+             "update\n"
+             "aggregate  begin  count   destroy  near  rollback  show    "
+             "where")
         with patch("sys.stdout", new=StringIO()) as output:
             self.assertFalse(HBNBCommand().onecmd("help"))
             self.assertEqual(h, output.getvalue().strip())
@@ -851,6 +874,60 @@ class TestHBNBCommand_all(unittest.TestCase):
             self.assertIn("Review", output.getvalue().strip())
             self.assertNotIn("BaseModel", output.getvalue().strip())
 
+    def test_all_matches_list_format(self):
+        FileStorage._FileStorage__objects = {}
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("all"))
+            self.assertEqual("[]\n", output.getvalue())
+        with patch("sys.stdout", new=StringIO()):
+            HBNBCommand().onecmd("create User")
+            HBNBCommand().onecmd("create Place")
+        expected = str([obj.__str__() for obj in storage.all().values()])
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("all"))
+            self.assertEqual(expected + "\n", output.getvalue())
+
+    def test_all_limit_offset(self):
+        FileStorage._FileStorage__objects = {}
+        with patch("sys.stdout", new=StringIO()) as output:
+            for i in range(5):
+                HBNBCommand().onecmd("create City")
+            ids = output.getvalue().split()
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("all City limit=2"))
+            out = output.getvalue()
+            self.assertIn(ids[0], out)
+            self.assertIn(ids[1], out)
+            self.assertNotIn(ids[2], out)
+        with patch("sys.stdout", new=StringIO()) as output:
+            command = "City.all(limit=2, offset=3)"
+            self.assertFalse(HBNBCommand().onecmd(command))
+            out = output.getvalue()
+            self.assertEqual(2, out.count("[City]"))
+            self.assertIn(ids[4], out)
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("all offset=4"))
+            self.assertEqual(1, output.getvalue().count("[City]"))
+
+    def test_all_lines_format(self):
+        FileStorage._FileStorage__objects = {}
+        with patch("sys.stdout", new=StringIO()):
+            HBNBCommand().onecmd("create State")
+            HBNBCommand().onecmd("create State")
+        expected = "".join(str(obj) + "\n" for obj in storage.all().values())
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("all State format=lines"))
+            self.assertEqual(expected, output.getvalue())
+
+    def test_all_invalid_option(self):
+        for command in ["all size=2", "all limit=two", "all User offset=-1",
+                        "all format=xml", "all Place limit=",
+                        "all offset="]:
+            with patch("sys.stdout", new=StringIO()) as output:
+                self.assertFalse(HBNBCommand().onecmd(command))
+                self.assertEqual("** invalid option **",
+                                 output.getvalue().strip())
+
 
 class TestHBNBCommand_update(unittest.TestCase):
     """Unittests for testing update from the HBNB command interpreter."""
@@ -1566,5 +1643,451 @@ class TestHBNBCommand_count(unittest.TestCase):
             self.assertEqual("1", output.getvalue().strip())
 
 
+class TestHBNBCommand_transactions(unittest.TestCase):
+    """Unittests for testing transactions of the HBNB command interpreter."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def tearDown(self):
+        FileStorage._FileStorage__undo = None
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+
+    def run_cmd(self, line):
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd(line))
+        return output.getvalue().strip()
+
+    def test_commit_saves_once(self):
+        self.run_cmd("begin")
+        with patch.object(FileStorage, "flush") as flush:
+            oid = self.run_cmd("create User")
+            self.run_cmd("update User {} first_name Betty".format(oid))
+            self.run_cmd("create State")
+            flush.assert_not_called()
+            self.assertEqual("", self.run_cmd("commit"))
+            flush.assert_called_once_with()
+
+    def test_commit_writes_file(self):
+        self.run_cmd("begin")
+        oid = self.run_cmd("create Place")
+        self.assertFalse(os.path.exists("file.json"))
+        self.run_cmd("commit")
+        with open("file.json", "r") as f:
+            self.assertIn("Place." + oid, f.read())
+
+    def test_rollback_discards_changes(self):
+        oid = self.run_cmd("create City")
+        self.run_cmd("update City {} name Cairo".format(oid))
+        self.run_cmd("begin")
+        self.run_cmd("update City {} name Giza".format(oid))
+        self.run_cmd("destroy City {}".format(oid))
+        new_id = self.run_cmd("create Amenity")
+        self.assertEqual("", self.run_cmd("rollback"))
+        self.assertIn("Cairo", self.run_cmd("show City {}".format(oid)))
+        self.assertEqual("** no instance found **",
+                         self.run_cmd("show Amenity {}".format(new_id)))
+
+    def test_rollback_dict_update(self):
+        oid = self.run_cmd("create Place")
+        self.run_cmd("begin")
+        self.run_cmd('Place.update({}, {{"max_guest": 4}})'.format(oid))
+        self.run_cmd("rollback")
+        self.assertEqual(0, storage.all()["Place." + oid].max_guest)
+
+    def test_begin_twice(self):
+        self.run_cmd("begin")
+        self.assertEqual("** transaction already open **",
+                         self.run_cmd("begin"))
+
+    def test_commit_without_begin(self):
+        self.assertEqual("** no transaction open **", self.run_cmd("commit"))
+
+    def test_rollback_without_begin(self):
+        self.assertEqual("** no transaction open **",
+                         self.run_cmd("rollback"))
+
+    def test_quit_with_open_transaction(self):
+        for command, newline in (("quit", ""), ("EOF", "\n")):
+            self.run_cmd("begin")
+            self.run_cmd("create User")
+            with patch("sys.stdout", new=StringIO()) as output:
+                self.assertTrue(HBNBCommand().onecmd(command))
+            self.assertEqual(newline + "** transaction not committed **\n",
+                             output.getvalue())
+            self.assertFalse(storage.in_transaction())
+            self.assertEqual(0, storage.count("User"))
+
+    def test_quit_without_transaction(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertTrue(HBNBCommand().onecmd("quit"))
+        self.assertEqual("", output.getvalue())
+
+    def test_batch_ends_with_open_transaction(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            HBNBCommand().run_batch(["begin", "create State"])
+        self.assertIn("** transaction not committed **", output.getvalue())
+        self.assertEqual(0, storage.count("State"))
+
+
+class TestHBNBCommand_batch(unittest.TestCase):
+    """Unittests for testing batch mode of the HBNB command interpreter."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def tearDown(self):
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+
+    def run_batch(self, lines, checkpoint=0):
+        with patch("sys.stdout", new=StringIO()) as output:
+            stats = HBNBCommand().run_batch(lines, checkpoint)
+        return stats, output.getvalue()
+
+    def test_saves_once(self):
+        with patch.object(FileStorage, "flush",
+                          side_effect=storage.changes) as flush:
+            self.run_batch(["create User\n"] * 5)
+            flush.assert_called_once_with()
+
+    def test_checkpoints(self):
+        with patch.object(FileStorage, "flush",
+                          side_effect=storage.changes) as flush:
+            self.run_batch(["create Place\n"] * 5, 2)
+            self.assertEqual(3, flush.call_count)
+
+    def test_counts_errors_by_command(self):
+        lines = ["create User", "create MyModel", "", "show User",
+                 "User.count()", "User.show(123)", "bogus"]
+        stats, out = self.run_batch(lines)
+        self.assertEqual({"create": [2, 1], "show": [2, 2], "count": [1, 0],
+                          "bogus": [1, 1]}, stats)
+        self.assertIn("** class doesn't exist **", out)
+
+    def test_exceptions_counted_as_errors(self):
+        with patch.object(HBNBCommand, "do_count", side_effect=IndexError):
+            stats, out = self.run_batch(["count", "create User",
+                                         "User.count()"])
+        self.assertEqual({"count": [2, 2], "create": [1, 0]}, stats)
+        self.assertEqual(1, storage.count("User"))
+        self.assertIn("** IndexError:", out)
+
+    def test_output_is_restored(self):
+        stdout = sys.stdout
+        self.run_batch(["create City"])
+        self.assertIs(stdout, sys.stdout)
+
+    def test_quit_stops(self):
+        stats, out = self.run_batch(["create State", "quit", "create State"])
+        self.assertEqual(1, storage.count("State"))
+        self.assertNotIn("create", [k for k, v in stats.items() if v[0] > 1])
+
+    def test_command_line(self):
+        script = os.path.abspath("console.py")
+        with tempfile.TemporaryDirectory() as tmp:
+            proc = subprocess.run(
+                [sys.executable, script, "--batch", "-"], cwd=tmp,
+                input="create Amenity\ncreate Nope\n",
+                capture_output=True, text=True)
+            self.assertTrue(os.path.exists(os.path.join(tmp, "file.json")))
+        self.assertEqual(36, len(proc.stdout.split("\n")[0]))
+        self.assertIn("2 commands in", proc.stderr)
+        self.assertIn("1 errors", proc.stderr)
+
+    def test_command_line_usage(self):
+        proc = subprocess.run(
+            [sys.executable, "console.py", "--batch"],
+            capture_output=True, text=True)
+        self.assertEqual(1, proc.returncode)
+        self.assertIn("Usage:", proc.stderr)
+
+    def test_split_args_matches_shlex(self):
+        for arg in ['User 1 name "Betty Holberton"', "a'b c'd \"\" e",
+                    'x "unclosed', "back\\slash 'q'", "  spaced\tout  "]:
+            try:
+                expected = split(arg)
+            except ValueError:
+                with self.assertRaises(ValueError):
+                    split_args(arg)
+                continue
+            self.assertEqual(expected, split_args(arg))
+
+
+class TestHBNBCommand_where(unittest.TestCase):
+    """Unittests for testing where of the HBNB command interpreter."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        self.ids = []
+        for i in range(4):
+            with patch("sys.stdout", new=StringIO()) as output:
+                HBNBCommand().onecmd("create Place")
+            oid = output.getvalue().strip()
+            with patch("sys.stdout", new=StringIO()):
+                HBNBCommand().onecmd(
+                    'Place.update({}, {{"price_by_night": {}, '
+                    '"max_guest": {}}})'.format(oid, i * 50, i))
+            self.ids.append(oid)
+
+    def tearDown(self):
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+
+    def run_cmd(self, line):
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd(line))
+        return output.getvalue()
+
+    def test_where_dot_notation(self):
+        out = self.run_cmd("Place.where(price_by_night < 100, max_guest >= 1)")
+        self.assertEqual(1, out.count("[Place]"))
+        self.assertIn(self.ids[1], out)
+
+    def test_where_space_notation(self):
+        out = self.run_cmd("where Place max_guest != 0")
+        self.assertEqual(3, out.count("[Place]"))
+        self.assertNotIn(self.ids[0], out)
+
+    def test_where_in(self):
+        out = self.run_cmd("Place.where(max_guest in (0, 3))")
+        self.assertIn(self.ids[0], out)
+        self.assertIn(self.ids[3], out)
+        self.assertEqual(2, out.count("[Place]"))
+
+    def test_where_list_format(self):
+        obj = storage.all()["Place." + self.ids[2]]
+        self.assertEqual(str([obj.__str__()]) + "\n",
+                         self.run_cmd("Place.where(max_guest == 2)"))
+        self.assertEqual("[]\n", self.run_cmd("Place.where(max_guest > 9)"))
+
+    def test_where_errors(self):
+        self.assertEqual("** class name missing **\n", self.run_cmd("where"))
+        self.assertEqual("** class doesn't exist **\n",
+                         self.run_cmd("MyModel.where(a == 1)"))
+        self.assertEqual("** invalid condition **\n",
+                         self.run_cmd("Place.where(max_guest)"))
+
+
+class TestHBNBCommand_near(unittest.TestCase):
+    """Unittests for testing near of the HBNB command interpreter."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        self.places = []
+        for lat, lon in ((30.0444, 31.2357), (30.0131, 31.2089),
+                         (31.2001, 29.9187)):
+            with patch("sys.stdout", new=StringIO()) as output:
+                HBNBCommand().onecmd("create Place")
+            oid = output.getvalue().strip()
+            with patch("sys.stdout", new=StringIO()):
+                HBNBCommand().onecmd(
+                    'Place.update({}, {{"latitude": {}, "longitude": {}}})'
+                    .format(oid, lat, lon))
+            self.places.append(storage.all()["Place." + oid])
+
+    def tearDown(self):
+        FileStorage._FileStorage__objects = {}
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+
+    def run_cmd(self, line):
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd(line))
+        return output.getvalue()
+
+    def test_near_dot_notation(self):
+        self.assertEqual(str([self.places[1].__str__(),
+                              self.places[0].__str__()]) + "\n",
+                         self.run_cmd("Place.near(30.01, 31.2, 10)"))
+
+    def test_near_space_notation(self):
+        out = self.run_cmd("near Place 30.0444 31.2357 200")
+        self.assertEqual(3, out.count("[Place]"))
+        self.assertLess(out.index(self.places[0].id),
+                        out.index(self.places[2].id))
+
+    def test_near_none(self):
+        self.assertEqual("[]\n", self.run_cmd("Place.near(0, 0, 1)"))
+
+    def test_near_commas_only(self):
+        self.assertEqual(self.run_cmd("Place.near(30.01, 31.2, 10)"),
+                         self.run_cmd("Place.near(30.01,31.2,10)"))
+        self.assertEqual("[]\n", self.run_cmd("Place.near(1,2,5)"))
+
+    def test_near_errors(self):
+        self.assertEqual("** class name missing **\n", self.run_cmd("near"))
+        self.assertEqual("** class doesn't exist **\n",
+                         self.run_cmd("MyModel.near(0, 0, 1)"))
+        self.assertEqual("** coordinates missing **\n",
+                         self.run_cmd("Place.near(0, 0)"))
+        for args in ("a, 0, 1", "91, 0, 1", "0, 181, 1", "0, 0, -1"):
+            self.assertEqual("** invalid coordinates **\n",
+                             self.run_cmd("Place.near({})".format(args)))
+
+
+class TestHBNBCommand_search(unittest.TestCase):
+    """Unittests for testing search of the HBNB command interpreter."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        self.ids = []
+        for text in ("Great view, great host", "Noisy street",
+                     "The view was fine"):
+            with patch("sys.stdout", new=StringIO()) as output:
+                HBNBCommand().onecmd("create Review")
+            oid = output.getvalue().strip()
+            with patch("sys.stdout", new=StringIO()):
+                HBNBCommand().onecmd(
+                    'update Review {} text "{}"'.format(oid, text))
+            self.ids.append(oid)
+
+    def tearDown(self):
+        FileStorage._FileStorage__objects = {}
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+
+    def run_cmd(self, line):
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd(line))
+        return output.getvalue()
+
+    def test_search_dot_notation(self):
+        out = self.run_cmd("Review.search(great view)")
+        self.assertEqual(2, out.count("[Review]"))
+        self.assertLess(out.index(self.ids[0]), out.index(self.ids[2]))
+
+    def test_search_space_notation(self):
+        out = self.run_cmd("search Review NOISY")
+        self.assertEqual(1, out.count("[Review]"))
+        self.assertIn(self.ids[1], out)
+
+    def test_search_follows_destroy(self):
+        self.run_cmd("destroy Review {}".format(self.ids[1]))
+        self.assertEqual("[]\n", self.run_cmd("search Review noisy"))
+
+    def test_search_errors(self):
+        self.assertEqual("** class name missing **\n", self.run_cmd("search"))
+        self.assertEqual("** class doesn't exist **\n",
+                         self.run_cmd("MyModel.search(view)"))
+        self.assertEqual("** search words missing **\n",
+                         self.run_cmd("Review.search()"))
+
+
+class TestHBNBCommand_aggregate(unittest.TestCase):
+    """Unittests for testing aggregate of the HBNB command interpreter."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        for city_id, price in (("c1", 100), ("c1", 150), ("c2", 80)):
+            with patch("sys.stdout", new=StringIO()) as output:
+                HBNBCommand().onecmd("create Place")
+            oid = output.getvalue().strip()
+            with patch("sys.stdout", new=StringIO()):
+                HBNBCommand().onecmd(
+                    'Place.update({}, {{"city_id": "{}", '
+                    '"price_by_night": {}}})'.format(oid, city_id, price))
+
+    def tearDown(self):
+        FileStorage._FileStorage__objects = {}
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+
+    def run_cmd(self, line):
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd(line))
+        return output.getvalue()
+
+    def test_aggregate_dot_notation(self):
+        self.assertEqual("{'c1': {'avg price_by_night': 125.0}, "
+                         "'c2': {'avg price_by_night': 80.0}}\n",
+                         self.run_cmd(
+                             "Place.aggregate(avg price_by_night by city_id)"))
+
+    def test_aggregate_space_notation(self):
+        self.assertEqual("{'count': 3, 'max price_by_night': 150}\n",
+                         self.run_cmd(
+                             "aggregate Place count, max price_by_night"))
+
+    def test_aggregate_follows_destroy(self):
+        for obj in storage.all().values():
+            if obj.city_id == "c2":
+                self.run_cmd("destroy Place {}".format(obj.id))
+                break
+        self.assertEqual("{'c1': {'count': 2}}\n",
+                         self.run_cmd("aggregate Place count by city_id"))
+
+    def test_aggregate_errors(self):
+        self.assertEqual("** class name missing **\n",
+                         self.run_cmd("aggregate"))
+        self.assertEqual("** class doesn't exist **\n",
+                         self.run_cmd("MyModel.aggregate(count)"))
+        self.assertEqual("** aggregate missing **\n",
+                         self.run_cmd("Place.aggregate()"))
+        self.assertEqual("** invalid aggregate **\n",
+                         self.run_cmd("aggregate Place median price_by_night"))
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -5,6 +5,7 @@ Unittest classes:
     TestBaseModel_instantiation
     TestBaseModel_save
     TestBaseModel_to_dict
+    TestBaseModel_registry
 """
 import os
 import models
@@ -12,6 +13,8 @@ import unittest
 from datetime import datetime
 from time import sleep
 from models.base_model import BaseModel
+from models.base_model import classes
+from models.user import User
 
 
 class TestBaseModel_instantiation(unittest.TestCase):
@@ -73,6 +76,21 @@ class TestBaseModel_instantiation(unittest.TestCase):
         self.assertEqual(bModel.created_at, dt)
         self.assertEqual(bModel.updated_at, dt)
 
+    def test_instantiation_with_whole_second_kwargs(self):
+        dt = datetime(2017, 6, 14, 22, 31, 3)
+        bModel = BaseModel(id="345", created_at=dt.isoformat(),
+                           updated_at=dt.isoformat())
+        self.assertEqual(bModel.created_at, dt)
+        self.assertEqual(bModel.updated_at, dt)
+
+    def test_instantiation_with_to_dict_output(self):
+        bModel = BaseModel()
+        bm_dict = bModel.to_dict()
+        del bm_dict["__class__"]
+        copy = BaseModel(**bm_dict)
+        self.assertEqual(bModel.created_at, copy.created_at)
+        self.assertEqual(bModel.updated_at, copy.updated_at)
+
     def test_instantiation_with_None_kwargs(self):
         with self.assertRaises(TypeError):
             BaseModel(id=None, created_at=None, updated_at=None)
@@ -188,5 +206,46 @@ class TestBaseModel_to_dict(unittest.TestCase):
             bModel.to_dict(None)
 
 
+class TestBaseModel_registry(unittest.TestCase):
+    """Unittests for testing the model class registry."""
+
+    def test_models_registered(self):
+        self.assertIs(BaseModel, classes["BaseModel"])
+        self.assertIs(User, classes["User"])
+        self.assertLessEqual({"BaseModel", "User", "State", "City",
+                              "Place", "Amenity", "Review"}, set(classes))
+
+    def test_subclass_registered_automatically(self):
+        class Host(User):
+            pass
+        try:
+            self.assertIs(Host, classes["Host"])
+        finally:
+            del classes["Host"]
+
+    def test_reload_dispatches_registered_subclass(self):
+        class Guest(BaseModel):
+            pass
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        try:
+            gst = Guest()
+            models.storage.save()
+            models.storage.delete(gst)
+            models.storage.reload()
+            reloaded = models.storage.all()["Guest." + gst.id]
+            self.assertIs(Guest, type(reloaded))
+            models.storage.delete(reloaded)
+        finally:
+            del classes["Guest"]
+            os.remove("file.json")
+            try:
+                os.rename("tmp", "file.json")
+            except IOError:
+                pass
+
+
 if __name__ == "__main__":
     unittest.main()
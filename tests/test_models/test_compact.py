@@ -0,0 +1,194 @@
+#!/usr/bin/python3
+"""Defines unittests for models/compact.py.
+
+Unittest classes:
+    TestCompact_attributes
+    TestCompact_dict
+    TestCompact_storage
+"""
+import copy
+import os
+import models
+import unittest
+from datetime import datetime
+from io import StringIO
+from unittest.mock import patch
+from console import HBNBCommand
+from models.base_model import classes
+from models.compact import Compact
+from models.compact import compact
+from models.engine.file_storage import FileStorage
+from models.place import Place
+from models.user import User
+
+CompactPlace = compact(Place)
+CompactUser = compact(User)
+
+
+class TestCompact_attributes(unittest.TestCase):
+    """Unittests for testing the attributes of compact instances."""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+
+    def tearDown(self):
+        FileStorage._FileStorage__objects = {}
+
+    def test_variant(self):
+        self.assertIs(CompactPlace, compact(Place))
+        self.assertTrue(issubclass(CompactPlace, Place))
+        self.assertEqual("Place", CompactPlace.__name__)
+        self.assertIs(Place, classes["Place"])
+
+    def test_declared_attributes_in_slots(self):
+        plc = CompactPlace()
+        plc.name = "Loft"
+        plc.max_guest = 4
+        self.assertEqual({}, plc.__dict__)
+
+    def test_defaults(self):
+        plc = CompactPlace()
+        self.assertEqual("", plc.name)
+        self.assertEqual(0.0, plc.latitude)
+        self.assertEqual([], plc.amenity_ids)
+        with self.assertRaises(AttributeError):
+            plc.pool
+
+    def test_id_packed(self):
+        plc = CompactPlace()
+        self.assertEqual(str, type(plc.id))
+        self.assertEqual(36, len(plc.id))
+        self.assertIn("Place." + plc.id, models.storage.all())
+
+    def test_other_ids_kept(self):
+        for ident in ("345", "A1B2C3D4-0000-0000-0000-000000000000", 7):
+            self.assertEqual(ident, CompactUser(id=ident).id)
+
+    def test_timestamps(self):
+        dt = datetime(2017, 9, 28, 21, 5, 54, 119427)
+        usr = CompactUser(id="1", created_at=dt,
+                          updated_at="2017-09-28T21:05:54.119572")
+        self.assertEqual(dt, usr.created_at)
+        self.assertEqual(datetime(2017, 9, 28, 21, 5, 54, 119572),
+                         usr.updated_at)
+        usr.updated_at = dt
+        self.assertEqual(dt, usr.updated_at)
+        self.assertEqual("1", usr.id)
+
+    def test_dynamic_attribute(self):
+        usr = CompactUser()
+        usr.nickname = "betty"
+        self.assertEqual("betty", usr.nickname)
+        self.assertEqual({"nickname": "betty"}, usr.__dict__)
+
+    def test_save(self):
+        usr = CompactUser()
+        first = usr.updated_at
+        with patch.object(FileStorage, "save"):
+            usr.save()
+        self.assertLess(first, usr.updated_at)
+
+
+class TestCompact_dict(unittest.TestCase):
+    """Unittests for testing to_dict and __str__ of compact instances."""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        self.record = {
+            "id": "56d43177-cc5f-4d6c-a0c1-e167f8c27337",
+            "created_at": "2017-09-28T21:03:54.052298",
+            "updated_at": "2017-09-28T21:05:54.119572",
+            "email": "betty@hbnb.io",
+            "nickname": "betty"
+        }
+
+    def tearDown(self):
+        FileStorage._FileStorage__objects = {}
+
+    def test_to_dict_matches_model(self):
+        self.assertEqual(User(**self.record).to_dict(),
+                         CompactUser(**self.record).to_dict())
+
+    def test_str_matches_model(self):
+        self.assertEqual(str(User(**self.record)),
+                         str(CompactUser(**self.record)))
+
+    def test_round_trip(self):
+        usr = CompactUser(**self.record)
+        self.assertEqual(usr.to_dict(),
+                         CompactUser(**usr.to_dict()).to_dict())
+
+    def test_copy(self):
+        usr = CompactUser(**self.record)
+        other = copy.deepcopy(usr)
+        self.assertIsNot(usr, other)
+        self.assertEqual(usr.to_dict(), other.to_dict())
+
+
+class TestCompact_storage(unittest.TestCase):
+    """Unittests for testing compact instances in FileStorage."""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        self.classes = dict(classes)
+        classes["Place"] = CompactPlace
+
+    def tearDown(self):
+        classes.clear()
+        classes.update(self.classes)
+        FileStorage._FileStorage__objects = {}
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+
+    def test_reload_builds_compact(self):
+        plc = CompactPlace()
+        plc.name = "Loft"
+        plc.rating = 5
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        other = models.storage.all()["Place." + plc.id]
+        self.assertIsInstance(other, Compact)
+        self.assertEqual(plc.to_dict(), other.to_dict())
+
+    def test_rollback(self):
+        plc = CompactPlace()
+        plc.name = "Loft"
+        with patch.object(FileStorage, "flush"):
+            models.storage.begin()
+            plc.name = "House"
+            plc.max_guest = 3
+            plc.rating = 5
+            models.storage.rollback()
+        self.assertEqual("Loft", plc.name)
+        self.assertEqual(0, plc.max_guest)
+        self.assertFalse(hasattr(plc, "rating"))
+
+    def test_console_update(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            HBNBCommand().onecmd("create Place")
+            oid = output.getvalue().strip()
+            HBNBCommand().onecmd("update Place {} max_guest 5".format(oid))
+            HBNBCommand().onecmd(
+                'Place.update({}, {{"pool": True, "name": "Loft"}})'.format(
+                    oid))
+        plc = models.storage.all()["Place." + oid]
+        self.assertIsInstance(plc, Compact)
+        self.assertEqual(5, plc.max_guest)
+        self.assertEqual({"pool": True}, plc.__dict__)
+        self.assertIn("'pool': True", str(plc))
+        self.assertEqual("Loft", plc.to_dict()["name"])
+
+    def test_indexes(self):
+        plc = CompactPlace()
+        plc.city_id = "c1"
+        plc.name = "Sunny loft"
+        self.assertEqual([plc], models.storage.lookup("Place", "city_id",
+                                                      "c1"))
+        self.assertEqual([plc], models.storage.search("Place", "loft"))
+
+
+if __name__ == "__main__":
+    unittest.main()
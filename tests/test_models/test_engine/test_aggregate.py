@@ -0,0 +1,74 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/aggregate.py.
+
+Unittest classes:
+    TestAggregate_parse
+    TestAggregate_results
+"""
+import unittest
+from models.engine.aggregate import Aggregate
+from models.engine.aggregate import results
+from models.engine.file_storage import FileStorage
+from models.place import Place
+
+
+class TestAggregate_parse(unittest.TestCase):
+    """Unittests for testing how the Aggregate class parses functions."""
+
+    def test_grouped(self):
+        aggregate = Aggregate.parse("Place", "avg price_by_night by city_id")
+        self.assertEqual([("avg", "price_by_night")], aggregate.functions)
+        self.assertEqual("city_id", aggregate.by)
+
+    def test_several_functions(self):
+        aggregate = Aggregate.parse("Place", "count, max max_guest ")
+        self.assertEqual([("count", None), ("max", "max_guest")],
+                         aggregate.functions)
+        self.assertIsNone(aggregate.by)
+        self.assertEqual(["count", "max max_guest"], aggregate.labels())
+
+    def test_count_of_attribute(self):
+        aggregate = Aggregate.parse("Review", "count text by place_id")
+        self.assertEqual([("count", "text")], aggregate.functions)
+
+    def test_invalid(self):
+        for text in ("", "median price_by_night", "sum", "avg a b",
+                     "count by", "count,"):
+            with self.assertRaises(ValueError):
+                Aggregate.parse("Place", text)
+
+
+class TestAggregate_results(unittest.TestCase):
+    """Unittests for testing how aggregates are reduced from objects."""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        self.places = []
+        for price in (100, 50.5, None, "high", float("nan"), True):
+            plc = Place()
+            plc.price_by_night = price
+            self.places.append(plc)
+
+    def tearDown(self):
+        FileStorage._FileStorage__objects = {}
+
+    def test_numeric_values_only(self):
+        functions = [("count", None), ("count", "price_by_night"),
+                     ("sum", "price_by_night"), ("avg", "price_by_night"),
+                     ("min", "price_by_night"), ("max", "price_by_night")]
+        self.assertEqual([6, 5, 150.5, 75.25, 50.5, 100],
+                         results(self.places, functions))
+
+    def test_no_numeric_value(self):
+        functions = [("count", "name"), ("sum", "name"), ("avg", "name"),
+                     ("min", "name"), ("max", "name")]
+        self.assertEqual([6, 0, None, None, None],
+                         results(self.places, functions))
+
+    def test_no_object(self):
+        self.assertEqual([0, 0, None], results([], [
+            ("count", None), ("sum", "max_guest"), ("avg", "max_guest")]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/columns.py.
+
+Unittest classes:
+    TestColumnStore
+"""
+import unittest
+from models.engine.columns import ColumnStore
+from models.place import Place
+
+
+class TestColumnStore(unittest.TestCase):
+    """Unittests for testing the ColumnStore class."""
+
+    def setUp(self):
+        self.store = ColumnStore(("max_guest", "latitude"), ("q", "d"))
+        for i, guests in enumerate([4, 1, 6, 2, 4]):
+            self.add("Place.{}".format(i), guests, 30.0 + i)
+
+    def add(self, key, guests, latitude):
+        plc = Place()
+        plc.max_guest = guests
+        plc.latitude = latitude
+        self.store.add(key, plc)
+
+    def test_select(self):
+        mask = self.store.select([("max_guest", ">=", 2),
+                                  ("latitude", "<", 33.5)])
+        self.assertEqual(["Place.0", "Place.2", "Place.3"],
+                         self.store.keys(mask))
+        self.assertEqual(["Place.0", "Place.4"], self.store.keys(
+            self.store.select([("max_guest", "==", 4)])))
+
+    def test_select_everything(self):
+        self.store.remove("Place.1")
+        self.assertEqual(4, len(self.store.keys(self.store.select([]))))
+
+    def test_aggregates(self):
+        self.assertEqual(5, self.store.count("max_guest"))
+        self.assertEqual(17, self.store.sum("max_guest"))
+        self.assertEqual(1, self.store.min("max_guest"))
+        self.assertEqual(6, self.store.max("max_guest"))
+        self.assertEqual(17 / 5, self.store.mean("max_guest"))
+        self.assertEqual(int, type(self.store.sum("max_guest")))
+
+    def test_aggregates_of_selection(self):
+        mask = self.store.select([("latitude", ">", 31.5)])
+        self.assertEqual(3, self.store.count("max_guest", mask))
+        self.assertEqual([6, 2, 4], self.store.values("max_guest", mask))
+        self.assertEqual(4, self.store.mean("max_guest", mask))
+        self.assertEqual(32.0 + 33.0 + 34.0, self.store.sum("latitude", mask))
+
+    def test_empty(self):
+        mask = self.store.select([("max_guest", ">", 10)])
+        self.assertEqual([], self.store.keys(mask))
+        self.assertEqual(0, self.store.sum("max_guest", mask))
+        self.assertIsNone(self.store.min("max_guest", mask))
+        self.assertIsNone(self.store.mean("max_guest", mask))
+
+    def test_histogram(self):
+        edges, counts = self.store.histogram("max_guest", 5)
+        self.assertEqual([1, 2, 3, 4, 5, 6], edges)
+        self.assertEqual([1, 1, 0, 2, 1], counts)
+        edges, counts = self.store.histogram("max_guest", 2, 2, 4)
+        self.assertEqual([2, 3, 4], edges)
+        self.assertEqual([1, 2], counts)
+        with self.assertRaises(ValueError):
+            self.store.histogram("max_guest", 0)
+
+    def test_remove_and_reuse_row(self):
+        self.store.remove("Place.2")
+        self.store.remove("Place.2")
+        self.assertEqual([30.0, 31.0, 33.0, 34.0],
+                         sorted(self.store.values("latitude")))
+        self.add("Place.5", 9, 40.0)
+        self.assertEqual(["Place.5"], self.store.keys(
+            self.store.select([("max_guest", ">", 6)])))
+        self.assertEqual(20, self.store.sum("max_guest"))
+
+    def test_values_out_of_column(self):
+        self.assertTrue(self.store.exact("max_guest"))
+        self.add("Place.5", 2.5, None)
+        self.add("Place.6", "many", 1)
+        self.assertFalse(self.store.exact("max_guest"))
+        self.assertTrue(self.store.exact("latitude"))
+        self.assertEqual(5, self.store.count("max_guest"))
+        self.assertEqual(6, self.store.count("latitude"))
+        self.store.remove("Place.5")
+        self.store.remove("Place.6")
+        self.assertTrue(self.store.exact("max_guest"))
+
+    def test_clear(self):
+        self.store.clear()
+        self.assertEqual([], self.store.keys(self.store.select([])))
+        self.assertEqual(0, self.store.count("latitude"))
+
+
+if __name__ == "__main__":
+    unittest.main()
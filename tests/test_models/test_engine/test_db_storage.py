@@ -0,0 +1,229 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/db_storage.py.
+
+Unittest classes:
+    TestDBStorage_methods
+    TestDBStorage_console
+"""
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import unittest
+from io import StringIO
+from threading import Thread
+from unittest.mock import patch
+import console
+from console import HBNBCommand
+from models.engine.db_storage import DBStorage
+from models.engine.file_storage import FileStorage
+from models.city import City
+from models.place import Place
+from models.state import State
+from models.user import User
+
+
+class TestDBStorage_methods(unittest.TestCase):
+    """Unittests for testing methods of the DBStorage class."""
+
+    def setUp(self):
+        DBStorage._DBStorage__db_path = "test_hbnb.db"
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__pending = {}
+        self.storage = DBStorage()
+        self.patcher = patch("models.storage", self.storage)
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.storage.close()
+        try:
+            os.remove("test_hbnb.db")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__pending = {}
+
+    def rows(self, table):
+        with sqlite3.connect("test_hbnb.db") as conn:
+            return conn.execute('SELECT * FROM "{}"'.format(table)).fetchall()
+
+    def test_selected_by_environment(self):
+        env = dict(os.environ, HBNB_TYPE_STORAGE="db",
+                   HBNB_DB_PATH="test_hbnb.db")
+        out = subprocess.run(
+            [sys.executable, "-c",
+             "import models; print(type(models.storage).__name__)"],
+            env=env, capture_output=True, text=True).stdout
+        self.assertEqual("DBStorage", out.strip())
+
+    def test_is_file_storage_api(self):
+        self.assertIsInstance(self.storage, FileStorage)
+        self.assertEqual(dict, type(self.storage.all()))
+
+    def test_save_writes_rows(self):
+        st = State()
+        cty = City()
+        cty.state_id = st.id
+        self.storage.save()
+        self.assertEqual(1, len(self.rows("State")))
+        row = self.rows("City")[0]
+        self.assertEqual((cty.id, st.id), row[:2])
+        self.assertEqual(cty.to_dict(), json.loads(row[2]))
+
+    def test_save_only_writes_changes(self):
+        usr = User()
+        self.storage.save()
+        with patch.object(User, "to_dict", autospec=True,
+                          side_effect=User.to_dict) as to_dict:
+            self.storage.save()
+            self.assertEqual(0, to_dict.call_count)
+            usr.first_name = "Betty"
+            self.storage.save()
+            self.assertEqual(1, to_dict.call_count)
+
+    def test_delete(self):
+        plc = Place()
+        self.storage.save()
+        self.storage.delete(plc)
+        self.storage.save()
+        self.assertEqual([], self.rows("Place"))
+
+    def test_reload(self):
+        plc = Place()
+        plc.city_id = "c1"
+        plc.max_guest = 4
+        self.storage.save()
+        FileStorage._FileStorage__objects = {}
+        self.storage.reload()
+        reloaded = self.storage.all()["Place." + plc.id]
+        self.assertEqual(plc.to_dict(), reloaded.to_dict())
+        self.assertEqual([reloaded], self.storage.lookup("Place", "city_id",
+                                                         "c1"))
+        self.assertEqual({}, self.storage.changes())
+
+    def test_reload_keeps_unsaved_objects_pending(self):
+        User().save()
+        st = State()
+        self.storage.reload()
+        self.assertIn("State." + st.id, self.storage.changes())
+
+    def test_save_skips_objects_no_longer_stored(self):
+        st = State()
+        User()
+        FileStorage._FileStorage__objects = {
+            key: obj for key, obj in self.storage.all().items()
+            if key != "State." + st.id}
+        self.storage.save()
+        self.assertEqual([], self.rows("State"))
+        self.assertEqual(1, len(self.rows("User")))
+
+    def test_foreign_key_indexes(self):
+        Place().save()
+        with sqlite3.connect("test_hbnb.db") as conn:
+            names = {row[1] for row in
+                     conn.execute("PRAGMA index_list('Place')")}
+        self.assertLessEqual({"Place_city_id", "Place_user_id"}, names)
+
+    def test_unstorable_column_value(self):
+        cty = City()
+        cty.state_id = ["s1"]
+        self.storage.save()
+        self.assertEqual('["s1"]', self.rows("City")[0][1])
+
+    def test_coalesced_flush_from_timer(self):
+        FileStorage._FileStorage__window = 0.01
+        try:
+            st = State()
+            st.save()
+            FileStorage._FileStorage__timer.join()
+        finally:
+            FileStorage._FileStorage__window = 0
+        self.assertEqual(st.id, self.rows("State")[0][0])
+
+    def test_failed_save_keeps_changes(self):
+        os.mkdir("test_hbnb_dir.db")
+        DBStorage._DBStorage__db_path = "test_hbnb_dir.db"
+        try:
+            usr = User()
+            with self.assertRaises(sqlite3.Error):
+                self.storage.save()
+        finally:
+            self.storage.close()
+            os.rmdir("test_hbnb_dir.db")
+            DBStorage._DBStorage__db_path = "test_hbnb.db"
+        self.assertIn("User." + usr.id, self.storage.changes())
+
+    def test_failed_write_keeps_changes(self):
+        st = State()
+        with patch.object(DBStorage, "_DBStorage__create",
+                          side_effect=sqlite3.OperationalError):
+            with self.assertRaises(sqlite3.OperationalError):
+                self.storage.save()
+        self.storage.save()
+        self.assertEqual(st.id, self.rows("State")[0][0])
+        self.assertEqual({}, self.storage.changes())
+
+    def test_save_lock_held_while_encoding(self):
+        State()
+        held = []
+
+        def probe():
+            lock = FileStorage._FileStorage__save_lock
+            if lock.acquire(blocking=False):
+                lock.release()
+                held.append(False)
+            else:
+                held.append(True)
+
+        def to_dict(obj):
+            thread = Thread(target=probe)
+            thread.start()
+            thread.join()
+            return {"__class__": "State"}
+        with patch.object(State, "to_dict", to_dict):
+            self.storage.save()
+        self.assertEqual([True], held)
+
+
+class TestDBStorage_console(unittest.TestCase):
+    """Unittests for testing the console on top of DBStorage."""
+
+    def setUp(self):
+        DBStorage._DBStorage__db_path = "test_hbnb.db"
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__pending = {}
+        self.storage = DBStorage()
+        self.patchers = [patch("models.storage", self.storage),
+                         patch.object(console, "storage", self.storage)]
+        for patcher in self.patchers:
+            patcher.start()
+
+    def tearDown(self):
+        for patcher in self.patchers:
+            patcher.stop()
+        self.storage.close()
+        try:
+            os.remove("test_hbnb.db")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__pending = {}
+
+    def test_create_update_destroy(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            HBNBCommand().onecmd("create Place")
+            pid = output.getvalue().strip()
+        HBNBCommand().onecmd('update Place {} max_guest "4"'.format(pid))
+        FileStorage._FileStorage__objects = {}
+        self.storage.reload()
+        self.assertEqual(4, self.storage.all()["Place." + pid].max_guest)
+        HBNBCommand().onecmd("destroy Place {}".format(pid))
+        FileStorage._FileStorage__objects = {}
+        self.storage.reload()
+        self.assertEqual(0, self.storage.count("Place"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,14 +4,41 @@
 Unittest classes:
     TestFileStorage_instantiation
     TestFileStorage_methods
+    TestFileStorage_journal
+    TestFileStorage_compaction
+    TestFileStorage_dirty_tracking
+    TestFileStorage_lookup
+    TestFileStorage_ranges
+    TestFileStorage_geo
+    TestFileStorage_search
+    TestFileStorage_columns
+    TestFileStorage_aggregate
+    TestFileStorage_partitions
+    TestFileStorage_lazy
+    TestFileStorage_binary
+    TestFileStorage_progress
+    TestFileStorage_streaming
+    TestFileStorage_durability
+    TestFileStorage_coalescing
+    TestFileStorage_transactions
 """
 import os
 import json
 import models
 import unittest
 from datetime import datetime
+from io import StringIO
+from threading import Thread
+from unittest.mock import patch
 from models.base_model import BaseModel
 from models.engine.file_storage import FileStorage
+from models.engine.formats import BinaryFormat
+from models.engine.formats import JSONFormat
+from models.engine.index import CounterIndex
+from models.engine.index import GridIndex
+from models.engine.index import TextIndex
+from models.engine.index import build_indexes
+from models.engine.lazy import LazyObjects
 from models.user import User
 from models.state import State
 from models.place import Place
@@ -165,5 +192,1252 @@ class TestFileStorage_methods(unittest.TestCase):
             models.storage.reload(None)
 
 
+class TestFileStorage_journal(unittest.TestCase):
+    """Unittests for testing journal mode of the FileStorage class."""
+
+    def setUp(self):
+        for name in ("file.json", "file.json.log"):
+            try:
+                os.rename(name, name + ".tmp")
+            except IOError:
+                pass
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__pending = {}
+        FileStorage._FileStorage__journal = True
+
+    def tearDown(self):
+        FileStorage._FileStorage__journal = False
+        for name in ("file.json", "file.json.log"):
+            try:
+                os.remove(name)
+            except IOError:
+                pass
+            try:
+                os.rename(name + ".tmp", name)
+            except IOError:
+                pass
+        FileStorage._FileStorage__objects = {}
+
+    def read_log(self):
+        with open("file.json.log", "r") as f:
+            return [json.loads(line) for line in f]
+
+    def test_save_appends_only_changed_records(self):
+        bModel = BaseModel()
+        usr = User()
+        models.storage.save()
+        self.assertFalse(os.path.exists("file.json"))
+        self.assertEqual(2, len(self.read_log()))
+        usr.save()
+        log = self.read_log()
+        self.assertEqual(3, len(log))
+        self.assertEqual("User." + usr.id, log[-1]["key"])
+        self.assertEqual(usr.to_dict(), log[-1]["value"])
+
+    def test_save_without_changes_appends_nothing(self):
+        BaseModel()
+        models.storage.save()
+        models.storage.save()
+        self.assertEqual(1, len(self.read_log()))
+
+    def test_delete_appends_tombstone(self):
+        st = State()
+        models.storage.save()
+        models.storage.delete(st)
+        models.storage.save()
+        self.assertNotIn("State." + st.id, models.storage.all())
+        self.assertEqual({"key": "State." + st.id, "value": None},
+                         self.read_log()[-1])
+
+    def test_reload_replays_log(self):
+        plc = Place()
+        cty = City()
+        models.storage.save()
+        plc.name = "Loft"
+        plc.save()
+        models.storage.delete(cty)
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        objs = FileStorage._FileStorage__objects
+        self.assertEqual("Loft", objs["Place." + plc.id].name)
+        self.assertNotIn("City." + cty.id, objs)
+
+    def test_reload_ignores_torn_last_line(self):
+        am = Amenity()
+        models.storage.save()
+        with open("file.json.log", "a") as f:
+            f.write('{"key": "Amenity.x", "val')
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertEqual(["Amenity." + am.id],
+                         list(FileStorage._FileStorage__objects))
+
+    def test_append_after_torn_last_line(self):
+        first = State()
+        first.name = "first"
+        models.storage.save()
+        with open("file.json.log", "a") as f:
+            f.write('{"key": "State.x", "val')
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        second = State()
+        second.name = "second"
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        objs = FileStorage._FileStorage__objects
+        self.assertEqual("first", objs["State." + first.id].name)
+        self.assertEqual("second", objs["State." + second.id].name)
+        self.assertEqual(2, len(self.read_log()))
+
+    def test_full_save_folds_log(self):
+        rev = Review()
+        models.storage.save()
+        FileStorage._FileStorage__journal = False
+        models.storage.save()
+        self.assertFalse(os.path.exists("file.json.log"))
+        with open("file.json", "r") as f:
+            self.assertIn("Review." + rev.id, f.read())
+
+
+class TestFileStorage_compaction(unittest.TestCase):
+    """Unittests for testing journal compaction of the FileStorage class."""
+
+    paths = ("file.json", "file.json.log", "file.json.log.old")
+
+    def setUp(self):
+        for name in self.paths:
+            try:
+                os.rename(name, name + ".tmp")
+            except IOError:
+                pass
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__pending = {}
+        FileStorage._FileStorage__journal = True
+        FileStorage._FileStorage__log_records = 0
+
+    def tearDown(self):
+        FileStorage._FileStorage__journal = False
+        FileStorage._FileStorage__compact_records = 10000
+        for name in self.paths:
+            try:
+                os.remove(name)
+            except IOError:
+                pass
+            try:
+                os.rename(name + ".tmp", name)
+            except IOError:
+                pass
+        FileStorage._FileStorage__objects = {}
+
+    def test_compact_folds_log_into_snapshot(self):
+        usr = User()
+        st = State()
+        models.storage.save()
+        usr.first_name = "Betty"
+        usr.save()
+        models.storage.delete(st)
+        models.storage.save()
+        models.storage.compact().join()
+        self.assertFalse(os.path.exists("file.json.log"))
+        self.assertFalse(os.path.exists("file.json.log.old"))
+        with open("file.json", "r") as f:
+            objdict = json.load(f)
+        self.assertEqual({"User." + usr.id: usr.to_dict()}, objdict)
+
+    def test_compact_keeps_snapshot_order(self):
+        cty = City()
+        plc = Place()
+        rev = Review()
+        models.storage.save()
+        models.storage.compact().join()
+        plc.name = "Loft"
+        models.storage.delete(cty)
+        usr = User()
+        models.storage.save()
+        models.storage.compact().join()
+        with open("file.json", "r") as f:
+            objdict = json.load(f)
+        self.assertEqual(["Place." + plc.id, "Review." + rev.id,
+                          "User." + usr.id], list(objdict))
+        self.assertEqual("Loft", objdict["Place." + plc.id]["name"])
+
+    def test_compact_without_log(self):
+        self.assertIsNone(models.storage.compact())
+
+    def test_compact_waits_for_flush(self):
+        BaseModel().save()
+        lock = FileStorage._FileStorage__save_lock
+        lock.acquire()
+        try:
+            starter = Thread(target=models.storage.compact)
+            starter.start()
+            starter.join(0.1)
+            self.assertTrue(starter.is_alive())
+            self.assertTrue(os.path.exists("file.json.log"))
+        finally:
+            lock.release()
+        starter.join()
+        FileStorage._FileStorage__compactor.join()
+        self.assertFalse(os.path.exists("file.json.log"))
+
+    def test_threshold_triggers_compaction(self):
+        FileStorage._FileStorage__compact_records = 3
+        for i in range(3):
+            BaseModel().save()
+        FileStorage._FileStorage__compactor.join()
+        with open("file.json", "r") as f:
+            self.assertEqual(3, len(json.load(f)))
+        self.assertFalse(os.path.exists("file.json.log.old"))
+
+    def test_appends_continue_during_compaction(self):
+        cty = City()
+        models.storage.save()
+        thread = models.storage.compact()
+        plc = Place()
+        models.storage.save()
+        thread.join()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertIn("City." + cty.id, models.storage.all())
+        self.assertIn("Place." + plc.id, models.storage.all())
+
+    def test_reload_after_interrupted_compaction(self):
+        am = Amenity()
+        models.storage.save()
+        os.rename("file.json.log", "file.json.log.old")
+        rev = Review()
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertIn("Amenity." + am.id, models.storage.all())
+        self.assertIn("Review." + rev.id, models.storage.all())
+
+
+class TestFileStorage_dirty_tracking(unittest.TestCase):
+    """Unittests for testing that save() only re-encodes changed objects."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def tearDown(self):
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def test_save_matches_json_dump(self):
+        plc = Place()
+        plc.name = "Loft \u00e9"
+        usr = User()
+        models.storage.save()
+        models.storage.save()
+        objdict = {k: v.to_dict() for k, v in models.storage.all().items()}
+        with open("file.json", "r") as f:
+            self.assertEqual(json.dumps(objdict), f.read())
+
+    def test_clean_objects_are_not_reencoded(self):
+        BaseModel()
+        usr = User()
+        models.storage.save()
+        usr.email = "betty@hbnb.io"
+        with patch.object(BaseModel, "to_dict",
+                          autospec=True,
+                          side_effect=BaseModel.to_dict) as to_dict:
+            models.storage.save()
+        self.assertEqual([unittest.mock.call(usr)], to_dict.call_args_list)
+        with open("file.json", "r") as f:
+            self.assertIn("betty@hbnb.io", f.read())
+
+    def test_setattr_marks_object_dirty(self):
+        cty = City()
+        models.storage.save()
+        FileStorage._FileStorage__pending = {}
+        cty.name = "Cairo"
+        self.assertIs(cty, FileStorage._FileStorage__pending["City." + cty.id])
+
+    def test_assign_sets_and_marks_dirty(self):
+        cty = City()
+        models.storage.save()
+        models.storage.assign(cty, "name", "Giza")
+        self.assertEqual("Giza", cty.name)
+        self.assertIs(cty, models.storage.changes()["City." + cty.id])
+
+    def test_touch_after_in_place_change(self):
+        plc = Place()
+        plc.amenity_ids = []
+        models.storage.save()
+        plc.amenity_ids.append("wifi")
+        models.storage.touch(plc)
+        models.storage.save()
+        with open("file.json", "r") as f:
+            self.assertIn("wifi", f.read())
+
+    def test_deleted_object_is_not_saved(self):
+        st = State()
+        models.storage.save()
+        models.storage.delete(st)
+        models.storage.save()
+        with open("file.json", "r") as f:
+            self.assertNotIn("State." + st.id, f.read())
+
+
+class TestFileStorage_lookup(unittest.TestCase):
+    """Unittests for testing the foreign-key indexes of FileStorage."""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+
+    def tearDown(self):
+        FileStorage._FileStorage__objects = {}
+
+    def test_lookup_new_objects(self):
+        st = State()
+        cty1 = City()
+        cty1.state_id = st.id
+        cty2 = City()
+        cty2.state_id = st.id
+        City().state_id = "other"
+        found = models.storage.lookup("City", "state_id", st.id)
+        self.assertCountEqual([cty1, cty2], found)
+
+    def test_lookup_follows_updates(self):
+        rev = Review()
+        rev.place_id = "p1"
+        self.assertEqual([rev], models.storage.lookup("Review",
+                                                      "place_id", "p1"))
+        rev.place_id = "p2"
+        self.assertEqual([], models.storage.lookup("Review", "place_id", "p1"))
+        self.assertEqual([rev], models.storage.lookup("Review",
+                                                      "place_id", "p2"))
+
+    def test_lookup_follows_delete(self):
+        plc = Place()
+        plc.city_id = "c1"
+        models.storage.lookup("Place", "city_id", "c1")
+        models.storage.delete(plc)
+        self.assertEqual([], models.storage.lookup("Place", "city_id", "c1"))
+
+    def test_lookup_other_class_not_returned(self):
+        plc = Place()
+        plc.user_id = "u1"
+        rev = Review()
+        rev.user_id = "u1"
+        self.assertEqual([plc], models.storage.lookup("Place", "user_id",
+                                                      "u1"))
+
+    def test_lookup_unindexed_attribute(self):
+        usr = User()
+        usr.email = "betty@hbnb.io"
+        User()
+        self.assertEqual([usr], models.storage.lookup("User", "email",
+                                                      "betty@hbnb.io"))
+
+    def test_lookup_after_objects_replaced(self):
+        cty = City()
+        cty.state_id = "s1"
+        models.storage.lookup("City", "state_id", "s1")
+        FileStorage._FileStorage__objects = {}
+        self.assertEqual([], models.storage.lookup("City", "state_id", "s1"))
+
+
+class TestFileStorage_ranges(unittest.TestCase):
+    """Unittests for testing the sorted indexes of FileStorage."""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__indexes = build_indexes(True)
+        FileStorage._FileStorage__indexed = None
+        self.places = []
+        for price in (300, 100, 200, 100):
+            plc = Place()
+            plc.price_by_night = price
+            self.places.append(plc)
+
+    def tearDown(self):
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__indexes = build_indexes()
+        FileStorage._FileStorage__indexed = None
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+
+    def test_indexed_kinds(self):
+        self.assertEqual("range",
+                         models.storage.indexed("Place", "price_by_night"))
+        self.assertEqual("hash", models.storage.indexed("Place", "city_id"))
+        self.assertIsNone(models.storage.indexed("Place", "name"))
+
+    def test_between(self):
+        plcs = self.places
+        self.assertEqual([plcs[2], plcs[0]],
+                         models.storage.between("Place", "price_by_night",
+                                                150))
+        self.assertCountEqual([plcs[1], plcs[3]],
+                              models.storage.between("Place", "price_by_night",
+                                                     high=200,
+                                                     include_high=False))
+
+    def test_between_follows_changes(self):
+        plcs = self.places
+        models.storage.between("Place", "price_by_night")
+        plcs[1].price_by_night = 250
+        models.storage.delete(plcs[0])
+        plc = Place()
+        plc.price_by_night = 50
+        self.assertEqual([plc, plcs[3], plcs[2], plcs[1]],
+                         models.storage.between("Place", "price_by_night"))
+
+    def test_between_after_reload(self):
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        found = models.storage.between("Place", "price_by_night", 200)
+        self.assertEqual([self.places[2].id, self.places[0].id],
+                         [plc.id for plc in found])
+
+    def test_between_without_index(self):
+        self.places[0].number_bathrooms = 2
+        self.places[1].number_bathrooms = 1
+        self.assertEqual([self.places[1], self.places[0]],
+                         models.storage.between("Place", "number_bathrooms",
+                                                1))
+        FileStorage._FileStorage__indexes = build_indexes()
+        self.assertEqual([self.places[2], self.places[0]],
+                         models.storage.between("Place", "price_by_night",
+                                                200))
+
+
+class TestFileStorage_geo(unittest.TestCase):
+    """Unittests for testing the location queries of FileStorage."""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        self.places = []
+        for lat, lon in ((30.0444, 31.2357), (30.0131, 31.2089),
+                         (31.2001, 29.9187)):
+            plc = Place()
+            plc.latitude = lat
+            plc.longitude = lon
+            self.places.append(plc)
+
+    def tearDown(self):
+        FileStorage._FileStorage__objects = {}
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+
+    def test_indexed(self):
+        self.assertEqual("geo", models.storage.indexed(
+            "Place", ("latitude", "longitude")))
+
+    def test_within(self):
+        self.assertCountEqual(self.places[:2],
+                              models.storage.within("Place", 30, 31, 31, 32))
+
+    def test_near(self):
+        self.assertEqual([self.places[1], self.places[0]],
+                         models.storage.near("Place", 30, 31.2, 10))
+
+    def test_nearest(self):
+        self.assertEqual([self.places[2]],
+                         models.storage.nearest("Place", 31, 30, 1))
+
+    def test_near_follows_changes(self):
+        models.storage.near("Place", 30, 31.2, 10)
+        self.places[0].latitude = 31.2
+        self.places[0].longitude = 29.9
+        models.storage.delete(self.places[1])
+        self.assertEqual([], models.storage.near("Place", 30, 31.2, 10))
+        self.assertEqual([self.places[0], self.places[2]],
+                         models.storage.near("Place", 31.2, 29.9, 10))
+
+    def test_near_after_reload(self):
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertEqual([self.places[2].id],
+                         [plc.id for plc in
+                          models.storage.near("Place", 31.2, 29.9, 10)])
+
+    def test_class_without_location(self):
+        User()
+        self.assertEqual([], models.storage.near("User", 0, 0, 20000))
+
+
+class TestFileStorage_search(unittest.TestCase):
+    """Unittests for testing the full-text search of FileStorage."""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+
+    def tearDown(self):
+        FileStorage._FileStorage__objects = {}
+
+    def test_search_follows_changes(self):
+        st = State()
+        st.name = "California"
+        self.assertEqual([st], models.storage.search("State", "california"))
+        st.name = "Nevada"
+        self.assertEqual([], models.storage.search("State", "california"))
+        self.assertEqual([st], models.storage.search("State", "nevada"))
+        models.storage.delete(st)
+        self.assertEqual([], models.storage.search("State", "nevada"))
+
+    def test_search_limit(self):
+        for i in range(3):
+            Amenity().name = "Wifi {}".format(i)
+        self.assertEqual(3, len(models.storage.search("Amenity", "wifi")))
+        self.assertEqual(2, len(models.storage.search("Amenity", "wifi", 2)))
+
+    def test_search_class_without_text(self):
+        User().first_name = "Betty"
+        self.assertEqual([], models.storage.search("User", "betty"))
+
+    def test_indexed(self):
+        self.assertEqual("text",
+                         models.storage.indexed("Place",
+                                                ("name", "description")))
+
+    def test_index_filled_on_first_search(self):
+        Review().text = "Great view"
+        Place().description = "Great loft"
+        FileStorage._FileStorage__indexed = None
+        with patch.object(TextIndex, "add", side_effect=AssertionError):
+            self.assertEqual(1, models.storage.count("Review"))
+            models.storage.by_class("City")
+        self.assertEqual(1, len(models.storage.search("Review", "great")))
+        Review().text = "Great host"
+        self.assertEqual(2, len(models.storage.search("Review", "great")))
+
+    def test_other_indexes_filled_on_first_use(self):
+        plc = Place()
+        plc.city_id = "c1"
+        FileStorage._FileStorage__indexed = None
+        with patch.object(GridIndex, "add", side_effect=AssertionError), \
+                patch.object(CounterIndex, "add",
+                             side_effect=AssertionError):
+            self.assertEqual(1, models.storage.count("Place"))
+            self.assertEqual([plc], models.storage.lookup("Place",
+                                                          "city_id", "c1"))
+        self.assertEqual([plc], models.storage.near("Place", 0, 0, 1))
+        self.assertEqual({"c1": [1]}, models.storage.aggregate(
+            "Place", [("count", "max_guest")], "city_id"))
+
+
+class TestFileStorage_columns(unittest.TestCase):
+    """Unittests for testing the column stores of FileStorage."""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__indexes = build_indexes(columns=True)
+        FileStorage._FileStorage__indexed = None
+        self.places = []
+        for price in (300, 100, 200):
+            plc = Place()
+            plc.price_by_night = price
+            self.places.append(plc)
+
+    def tearDown(self):
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__indexes = build_indexes()
+        FileStorage._FileStorage__indexed = None
+
+    def test_indexed(self):
+        attrs = models.storage.columns("Place").attr
+        self.assertEqual("columns", models.storage.indexed("Place", attrs))
+        self.assertIn("latitude", attrs)
+
+    def test_columns_follow_changes(self):
+        store = models.storage.columns("Place")
+        self.assertEqual(600, store.sum("price_by_night"))
+        self.places[0].price_by_night = 50
+        models.storage.delete(self.places[1])
+        Place().price_by_night = 10
+        store = models.storage.columns("Place")
+        self.assertEqual(260, store.sum("price_by_night"))
+        self.assertEqual(10, store.min("price_by_night"))
+
+    def test_columns_without_store(self):
+        FileStorage._FileStorage__indexes = build_indexes()
+        self.assertIsNone(models.storage.indexed(
+            "Place", models.storage.columns("Place").attr))
+        self.assertEqual(200, models.storage.columns("Place").mean(
+            "price_by_night"))
+
+    def test_class_without_columns(self):
+        self.assertIsNone(models.storage.columns("User"))
+
+
+class TestFileStorage_aggregate(unittest.TestCase):
+    """Unittests for testing aggregate() of the FileStorage class."""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__indexed = None
+        self.places = []
+        for city_id, price, guests in (("c1", 100, 2), ("c1", 150, 4),
+                                       ("c2", 80, 1)):
+            plc = Place()
+            plc.city_id = city_id
+            plc.price_by_night = price
+            plc.max_guest = guests
+            self.places.append(plc)
+
+    def tearDown(self):
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__indexes = build_indexes()
+        FileStorage._FileStorage__indexed = None
+
+    def aggregate(self, functions, by=None):
+        return models.storage.aggregate("Place", functions, by)
+
+    def test_counters_without_pass(self):
+        functions = [("avg", "price_by_night"), ("count", None),
+                     ("sum", "max_guest")]
+        with patch("models.engine.file_storage.results",
+                   side_effect=AssertionError):
+            self.assertEqual({"c1": [125, 2, 6], "c2": [80, 1, 1]},
+                             self.aggregate(functions, "city_id"))
+            self.assertEqual({None: [110, 3, 7]}, self.aggregate(functions))
+            self.assertEqual({"c1": [2], "c2": [1]},
+                             self.aggregate([("count", None)], "city_id"))
+
+    def test_counters_match_single_pass(self):
+        functions = [("avg", "price_by_night"), ("count", "max_guest"),
+                     ("sum", "number_rooms"), ("count", None)]
+        kept = self.aggregate(functions, "city_id")
+        FileStorage._FileStorage__indexes = {}
+        self.assertEqual(kept, self.aggregate(functions, "city_id"))
+
+    def test_counters_follow_changes(self):
+        self.places[0].price_by_night = 50
+        self.places[2].city_id = "c1"
+        models.storage.delete(self.places[1])
+        self.assertEqual({"c1": [65, 2]}, self.aggregate(
+            [("avg", "price_by_night"), ("count", None)], "city_id"))
+
+    def test_single_pass(self):
+        functions = [("min", "price_by_night"), ("max", "max_guest"),
+                     ("avg", "latitude")]
+        self.assertEqual({"c1": [100, 4, 0.0], "c2": [80, 1, 0.0]},
+                         self.aggregate(functions, "city_id"))
+        self.assertEqual({None: [80, 4, 0.0]}, self.aggregate(functions))
+        self.assertEqual({"": [3]},
+                         self.aggregate([("count", None)], "name"))
+
+    def test_unhashable_groups_left_out(self):
+        self.places[2].city_id = ["c2"]
+        self.assertEqual({"c1": [2]}, self.aggregate([("count", None)],
+                                                     "city_id"))
+        self.assertEqual({None: [330]},
+                         self.aggregate([("sum", "price_by_night")]))
+
+    def test_empty_class(self):
+        self.assertEqual({None: [0, None]}, models.storage.aggregate(
+            "User", [("count", None), ("max", "email")]))
+        self.assertEqual({}, models.storage.aggregate(
+            "User", [("count", None)], "email"))
+
+
+class TestFileStorage_partitions(unittest.TestCase):
+    """Unittests for testing the per-class partitions of FileStorage."""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+
+    def tearDown(self):
+        FileStorage._FileStorage__objects = {}
+
+    def test_count(self):
+        City()
+        City()
+        State()
+        self.assertEqual(2, models.storage.count("City"))
+        self.assertEqual(1, models.storage.count("State"))
+        self.assertEqual(0, models.storage.count("Place"))
+        self.assertEqual(0, models.storage.count("MyModel"))
+
+    def test_count_follows_delete(self):
+        am = Amenity()
+        self.assertEqual(1, models.storage.count("Amenity"))
+        models.storage.delete(am)
+        self.assertEqual(0, models.storage.count("Amenity"))
+
+    def test_by_class_keeps_insertion_order(self):
+        usr1 = User()
+        Place()
+        usr2 = User()
+        usr1.first_name = "Betty"
+        self.assertEqual([usr1, usr2], models.storage.by_class("User"))
+        self.assertEqual([], models.storage.by_class("MyModel"))
+
+    def test_by_class_after_reload(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        try:
+            rev = Review()
+            models.storage.save()
+            FileStorage._FileStorage__objects = {}
+            models.storage.reload()
+            found = models.storage.by_class("Review")
+            self.assertEqual(["Review." + rev.id],
+                             ["Review." + r.id for r in found])
+        finally:
+            os.remove("file.json")
+            try:
+                os.rename("tmp", "file.json")
+            except IOError:
+                pass
+
+    def test_all_keeps_key_contract(self):
+        plc = Place()
+        models.storage.count("Place")
+        self.assertIs(plc, models.storage.all()["Place." + plc.id])
+
+
+class TestFileStorage_lazy(unittest.TestCase):
+    """Unittests for testing lazy reload in the FileStorage class."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        self.cty = City()
+        self.cty.state_id = "s1"
+        self.plc = Place()
+        self.plc.city_id = self.cty.id
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__lazy = True
+        models.storage.reload()
+
+    def tearDown(self):
+        FileStorage._FileStorage__lazy = False
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def built(self):
+        odict = models.storage.all()
+        return [key for key in odict
+                if not LazyObjects.unbuilt(dict.get(odict, key))]
+
+    def test_reload_builds_nothing(self):
+        self.assertEqual(LazyObjects, type(models.storage.all()))
+        self.assertEqual([], self.built())
+        self.assertEqual(1, models.storage.count("Place"))
+        self.assertEqual([], self.built())
+
+    def test_reload_keeps_fragments(self):
+        fragment = dict.get(models.storage.all(), "City." + self.cty.id)
+        self.assertEqual(str, type(fragment))
+        self.assertEqual("s1", json.loads(fragment)["state_id"])
+
+    def test_binary_snapshot(self):
+        FileStorage._FileStorage__format = BinaryFormat()
+        try:
+            models.storage.save()
+            FileStorage._FileStorage__objects = {}
+            models.storage.reload()
+            self.assertEqual([], self.built())
+            self.assertEqual(["Place." + self.plc.id],
+                             [key for key in models.storage.all() if
+                              type(dict.get(models.storage.all(), key)) is
+                              bytes and key.startswith("Place.")])
+            self.assertEqual(
+                [self.plc.id],
+                [p.id for p in models.storage.lookup("Place", "city_id",
+                                                     self.cty.id)])
+        finally:
+            FileStorage._FileStorage__format = JSONFormat()
+
+    def test_lookup_builds_only_matches(self):
+        found = models.storage.lookup("Place", "city_id", self.cty.id)
+        self.assertEqual(["Place." + self.plc.id], self.built())
+        self.assertEqual(Place, type(found[0]))
+        self.assertEqual([], models.storage.lookup("City", "name", "Cairo"))
+        self.assertEqual(["Place." + self.plc.id], self.built())
+
+    def test_by_class_builds_one_class(self):
+        models.storage.by_class("City")
+        self.assertEqual(["City." + self.cty.id], self.built())
+
+    def test_save_does_not_build(self):
+        models.storage.save()
+        self.assertEqual([], self.built())
+        with open("file.json", "r") as f:
+            objdict = json.load(f)
+        self.assertEqual(self.cty.id, objdict["City." + self.cty.id]["id"])
+
+    def test_built_object_changes_are_saved(self):
+        cty = models.storage.all()["City." + self.cty.id]
+        cty.name = "Cairo"
+        models.storage.save()
+        with open("file.json", "r") as f:
+            self.assertIn("Cairo", f.read())
+
+
+class TestFileStorage_binary(unittest.TestCase):
+    """Unittests for testing FileStorage with the binary format."""
+
+    paths = ("file.json", "file.json.log", "file.json.log.old")
+
+    def setUp(self):
+        for name in self.paths:
+            try:
+                os.rename(name, name + ".tmp")
+            except IOError:
+                pass
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__pending = {}
+        FileStorage._FileStorage__format = BinaryFormat()
+
+    def tearDown(self):
+        FileStorage._FileStorage__format = JSONFormat()
+        FileStorage._FileStorage__fragments = {}
+        FileStorage._FileStorage__journal = False
+        FileStorage._FileStorage__lazy = False
+        for name in self.paths:
+            try:
+                os.remove(name)
+            except IOError:
+                pass
+            try:
+                os.rename(name + ".tmp", name)
+            except IOError:
+                pass
+        FileStorage._FileStorage__objects = {}
+
+    def test_save_and_reload(self):
+        plc = Place()
+        plc.name = "Loft"
+        plc.max_guest = 4
+        models.storage.save()
+        with open("file.json", "rb") as f:
+            self.assertTrue(f.read().startswith(BinaryFormat.MAGIC))
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        reloaded = models.storage.all()["Place." + plc.id]
+        self.assertEqual(plc.to_dict(), reloaded.to_dict())
+
+    def test_lazy_reload(self):
+        usr = User()
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__lazy = True
+        models.storage.reload()
+        models.storage.save()
+        reloaded = models.storage.all()["User." + usr.id]
+        self.assertEqual(usr.created_at, reloaded.created_at)
+
+    def test_journal_stays_json(self):
+        st = State()
+        models.storage.save()
+        FileStorage._FileStorage__journal = True
+        st.name = "Giza"
+        st.save()
+        with open("file.json.log", "r") as f:
+            self.assertEqual("Giza", json.loads(f.read())["value"]["name"])
+        models.storage.compact().join()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertEqual("Giza", models.storage.all()["State." + st.id].name)
+
+
+class TestFileStorage_progress(unittest.TestCase):
+    """Unittests for testing reload progress reports of FileStorage."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def tearDown(self):
+        FileStorage._FileStorage__progress = False
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def test_reload_reports_progress(self):
+        for i in range(50):
+            Place()
+        models.storage.save()
+        FileStorage._FileStorage__progress = True
+        with patch("sys.stderr", new=StringIO()) as output:
+            models.storage.reload()
+        self.assertTrue(output.getvalue().endswith(
+            "reload: 100% of {} bytes\n".format(os.path.getsize("file.json"))))
+
+    def test_reload_silent_by_default(self):
+        Place()
+        models.storage.save()
+        with patch("sys.stderr", new=StringIO()) as output:
+            models.storage.reload()
+        self.assertEqual("", output.getvalue())
+
+
 if __name__ == "__main__":
     unittest.main()
+
+
+class TestFileStorage_streaming(unittest.TestCase):
+    """Unittests for testing that save() streams objects to the file."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__fragments = {}
+        FileStorage._FileStorage__cache = False
+
+    def tearDown(self):
+        FileStorage._FileStorage__cache = True
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def test_save_without_cache_matches_json_dump(self):
+        plc = Place()
+        plc.name = "Loft \u00e9"
+        plc.amenity_ids = ["wifi"]
+        User()
+        models.storage.save()
+        objdict = {k: v.to_dict() for k, v in models.storage.all().items()}
+        with open("file.json", "r") as f:
+            self.assertEqual(json.dumps(objdict), f.read())
+
+    def test_save_without_cache_keeps_no_encodings(self):
+        BaseModel()
+        models.storage.save()
+        self.assertEqual({}, FileStorage._FileStorage__fragments)
+
+    def test_save_empty_storage(self):
+        models.storage.save()
+        with open("file.json", "r") as f:
+            self.assertEqual("{}", f.read())
+
+
+class TestFileStorage_durability(unittest.TestCase):
+    """Unittests for testing that save() replaces file.json atomically."""
+
+    paths = ("file.json", "file.json.log", "file.json.new")
+
+    def setUp(self):
+        for name in self.paths:
+            try:
+                os.rename(name, name + ".tmp")
+            except IOError:
+                pass
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__pending = {}
+
+    def tearDown(self):
+        FileStorage._FileStorage__durability = "fsync"
+        FileStorage._FileStorage__journal = False
+        for name in self.paths:
+            try:
+                os.remove(name)
+            except IOError:
+                pass
+            try:
+                os.rename(name + ".tmp", name)
+            except IOError:
+                pass
+        FileStorage._FileStorage__objects = {}
+
+    def test_failed_save_keeps_previous_snapshot(self):
+        State()
+        models.storage.save()
+        with open("file.json", "r") as f:
+            before = f.read()
+        plc = Place()
+        plc.amenity_ids = [object()]
+        with self.assertRaises(TypeError):
+            models.storage.save()
+        with open("file.json", "r") as f:
+            self.assertEqual(before, f.read())
+        self.assertFalse(os.path.exists("file.json.new"))
+
+    def test_save_replaces_file(self):
+        User()
+        models.storage.save()
+        inode = os.stat("file.json").st_ino
+        models.storage.save()
+        self.assertNotEqual(inode, os.stat("file.json").st_ino)
+        self.assertFalse(os.path.exists("file.json.new"))
+
+    def test_none_rewrites_in_place(self):
+        FileStorage._FileStorage__durability = "none"
+        User()
+        models.storage.save()
+        inode = os.stat("file.json").st_ino
+        models.storage.save()
+        self.assertEqual(inode, os.stat("file.json").st_ino)
+
+    def test_fsync_syncs_file_and_directory(self):
+        City()
+        with patch("os.fsync") as fsync:
+            models.storage.save()
+        self.assertEqual(2, fsync.call_count)
+
+    def test_flush_does_not_sync(self):
+        FileStorage._FileStorage__durability = "flush"
+        City()
+        with patch("os.fsync") as fsync:
+            models.storage.save()
+        fsync.assert_not_called()
+        self.assertTrue(os.path.exists("file.json"))
+
+    def test_fsync_syncs_journal_appends(self):
+        FileStorage._FileStorage__journal = True
+        Review()
+        with patch("os.fsync") as fsync:
+            models.storage.save()
+        self.assertEqual(1, fsync.call_count)
+
+
+class TestFileStorage_coalescing(unittest.TestCase):
+    """Unittests for testing that bursts of save() share one write."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__pending = {}
+
+    def tearDown(self):
+        FileStorage._FileStorage__window = 0
+        FileStorage._FileStorage__batch = 0
+        models.storage.changes()
+        for name in ("file.json", "file.json.new"):
+            try:
+                os.remove(name)
+            except IOError:
+                pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def test_batch_writes_once(self):
+        FileStorage._FileStorage__batch = 3
+        BaseModel().save()
+        User().save()
+        self.assertFalse(os.path.exists("file.json"))
+        State().save()
+        with open("file.json", "r") as f:
+            self.assertEqual(3, len(json.load(f)))
+
+    def test_window_writes_after_delay(self):
+        FileStorage._FileStorage__window = 0.01
+        cty = City()
+        cty.save()
+        self.assertFalse(os.path.exists("file.json"))
+        FileStorage._FileStorage__timer.join()
+        with open("file.json", "r") as f:
+            self.assertIn("City." + cty.id, json.load(f))
+
+    def test_window_shares_one_write(self):
+        FileStorage._FileStorage__window = 60
+        plc = Place()
+        with patch("os.replace") as replace:
+            for i in range(10):
+                plc.name = str(i)
+                plc.save()
+            self.assertEqual(0, replace.call_count)
+            models.storage.flush()
+            self.assertEqual(1, replace.call_count)
+
+    def test_flush_cancels_window(self):
+        FileStorage._FileStorage__window = 60
+        Review().save()
+        timer = FileStorage._FileStorage__timer
+        models.storage.flush()
+        self.assertTrue(os.path.exists("file.json"))
+        self.assertIsNone(FileStorage._FileStorage__timer)
+        timer.join()
+
+    def test_deferred_writes_once_at_end(self):
+        with patch.object(FileStorage, "flush",
+                          side_effect=models.storage.changes) as flush:
+            with models.storage.deferred():
+                BaseModel().save()
+                User().save()
+                flush.assert_not_called()
+            flush.assert_called_once_with()
+
+    def test_deferred_without_save_writes_nothing(self):
+        with models.storage.deferred():
+            BaseModel()
+        self.assertFalse(os.path.exists("file.json"))
+
+    def test_nested_deferred_writes_at_outer_end(self):
+        with models.storage.deferred():
+            with models.storage.deferred():
+                State().save()
+            self.assertFalse(os.path.exists("file.json"))
+        self.assertTrue(os.path.exists("file.json"))
+
+    def test_flush_with_arg(self):
+        with self.assertRaises(TypeError):
+            models.storage.flush(None)
+
+
+class TestFileStorage_transactions(unittest.TestCase):
+    """Unittests for testing transactions of the FileStorage class."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__pending = {}
+
+    def tearDown(self):
+        FileStorage._FileStorage__undo = None
+        FileStorage._FileStorage__undo_pending = None
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def test_commit_saves_once(self):
+        with patch("os.replace") as replace:
+            with models.storage.transaction():
+                for i in range(5):
+                    BaseModel().save()
+                self.assertEqual(0, replace.call_count)
+            self.assertEqual(1, replace.call_count)
+        self.assertEqual(5, len(models.storage.all()))
+
+    def test_commit_writes_changes(self):
+        models.storage.begin()
+        usr = User()
+        usr.first_name = "Betty"
+        models.storage.commit()
+        with open("file.json", "r") as f:
+            objdict = json.load(f)
+        self.assertEqual("Betty", objdict["User." + usr.id]["first_name"])
+
+    def test_rollback_removes_new_objects(self):
+        models.storage.begin()
+        st = State()
+        st.save()
+        models.storage.rollback()
+        self.assertNotIn("State." + st.id, models.storage.all())
+        self.assertEqual(0, models.storage.count("State"))
+        self.assertFalse(os.path.exists("file.json"))
+
+    def test_rollback_restores_attributes(self):
+        plc = Place()
+        plc.name = "Loft"
+        plc.amenity_ids = ["wifi"]
+        models.storage.save()
+        updated_at = plc.updated_at
+        models.storage.begin()
+        plc.name = "Barn"
+        plc.max_guest = 4
+        models.storage.touch(plc)
+        plc.amenity_ids.append("pool")
+        plc.save()
+        models.storage.rollback()
+        self.assertEqual("Loft", plc.name)
+        self.assertEqual(["wifi"], plc.amenity_ids)
+        self.assertEqual(updated_at, plc.updated_at)
+        self.assertNotIn("max_guest", plc.__dict__)
+
+    def test_rollback_restores_deleted_objects(self):
+        cty = City()
+        cty.state_id = "s1"
+        models.storage.save()
+        models.storage.begin()
+        models.storage.delete(cty)
+        self.assertEqual([], models.storage.lookup("City", "state_id", "s1"))
+        models.storage.rollback()
+        self.assertIs(cty, models.storage.all()["City." + cty.id])
+        self.assertEqual([cty], models.storage.lookup("City", "state_id",
+                                                      "s1"))
+
+    def test_rollback_keeps_earlier_pending_changes(self):
+        rev = Review()
+        models.storage.begin()
+        Amenity()
+        models.storage.rollback()
+        self.assertEqual(["Review." + rev.id],
+                         list(models.storage.changes()))
+
+    def test_exception_rolls_back(self):
+        with self.assertRaises(ValueError):
+            with models.storage.transaction():
+                usr = User()
+                raise ValueError
+        self.assertNotIn("User." + usr.id, models.storage.all())
+        self.assertIsNone(FileStorage._FileStorage__undo)
+
+    def test_nested_begin(self):
+        models.storage.begin()
+        with self.assertRaises(RuntimeError):
+            models.storage.begin()
+
+    def test_commit_without_begin(self):
+        with self.assertRaises(RuntimeError):
+            models.storage.commit()
+
+    def test_rollback_without_begin(self):
+        with self.assertRaises(RuntimeError):
+            models.storage.rollback()
+
+    def test_in_transaction(self):
+        self.assertFalse(models.storage.in_transaction())
+        models.storage.begin()
+        self.assertTrue(models.storage.in_transaction())
+        models.storage.rollback()
+        self.assertFalse(models.storage.in_transaction())
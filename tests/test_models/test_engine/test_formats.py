@@ -0,0 +1,193 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/formats.py.
+
+Unittest classes:
+    TestJSONFormat
+    TestBinaryFormat
+    TestFormats_convert
+"""
+import io
+import json
+import os
+import struct
+import unittest
+from datetime import datetime
+from models.engine.formats import BinaryFormat
+from models.engine.formats import JSONFormat
+from models.engine.formats import convert
+from models.engine.formats import get_format
+
+dt = datetime(2017, 6, 14, 22, 31, 3, 285259)
+records = {
+    "Place.1": {"id": "1", "created_at": dt.isoformat(),
+                "updated_at": dt.isoformat(), "__class__": "Place",
+                "name": "Loft", "max_guest": 4, "latitude": 30.1,
+                "amenity_ids": ["a", "b"]},
+    "User.2": {"id": "2", "created_at": dt.isoformat(),
+               "updated_at": dt.isoformat(), "__class__": "User"}
+}
+
+
+def snapshot(fmt, recs):
+    """Return the bytes or text of a snapshot of recs in fmt."""
+    f = io.BytesIO() if fmt.binary else io.StringIO()
+    fmt.write(f, ((k, fmt.encode(k, r)) for k, r in recs.items()))
+    return f.getvalue()
+
+
+class TestJSONFormat(unittest.TestCase):
+    """Unittests for testing the JSONFormat class."""
+
+    def test_write_matches_json_dump(self):
+        self.assertEqual(json.dumps(records), snapshot(JSONFormat(), records))
+
+    def test_write_empty(self):
+        self.assertEqual("{}", snapshot(JSONFormat(), {}))
+
+    def test_encode_datetime(self):
+        self.assertEqual(json.dumps({"created_at": dt.isoformat()}),
+                         JSONFormat().encode("k", {"created_at": dt}))
+
+    def test_read(self):
+        f = io.StringIO(json.dumps(records))
+        self.assertEqual(records, dict(JSONFormat().read(f)))
+
+    def test_read_every_chunk_size(self):
+        text = json.dumps({"a": 12345, "b": [1.5, "x y"], "c": {"d": None}},
+                          indent=2)
+        fmt = JSONFormat()
+        for size in range(1, len(text) + 2):
+            fmt.chunk_size = size
+            read = list(fmt.read(io.StringIO(text)))
+            self.assertEqual(json.loads(text), dict(read))
+
+    def test_read_is_incremental(self):
+        fmt = JSONFormat()
+        fmt.chunk_size = 16
+        f = io.StringIO(json.dumps(records))
+        next(fmt.read(f))
+        self.assertLess(f.tell(), len(json.dumps(records)))
+
+    def test_read_empty(self):
+        self.assertEqual([], list(JSONFormat().read(io.StringIO(" { } "))))
+
+    def test_read_malformed(self):
+        for text in ("", "[]", '{"a" 1}', '{"a": 1', '{"a": 1,}'):
+            with self.assertRaises(ValueError):
+                list(JSONFormat().read(io.StringIO(text)))
+
+    def test_read_progress(self):
+        calls = []
+        fmt = JSONFormat()
+        fmt.chunk_size = 64
+        text = json.dumps(records)
+        list(fmt.read(io.StringIO(text),
+                      lambda done, total: calls.append(done)))
+        self.assertEqual(len(text), calls[-1])
+        self.assertEqual(sorted(calls), calls)
+
+
+class TestBinaryFormat(unittest.TestCase):
+    """Unittests for testing the BinaryFormat class."""
+
+    def test_round_trip(self):
+        data = snapshot(BinaryFormat(), records)
+        self.assertTrue(data.startswith(BinaryFormat.MAGIC))
+        read = dict(BinaryFormat().read(io.BytesIO(data)))
+        self.assertEqual(dt, read["Place.1"]["created_at"])
+        self.assertEqual(["a", "b"], read["Place.1"]["amenity_ids"])
+        read["Place.1"]["created_at"] = dt.isoformat()
+        read["Place.1"]["updated_at"] = dt.isoformat()
+        self.assertEqual(records["Place.1"], read["Place.1"])
+
+    def test_records_are_length_prefixed(self):
+        fragment = BinaryFormat().encode("User.2", records["User.2"])
+        length = struct.unpack("<I", fragment[:4])[0]
+        self.assertEqual(len(fragment) - 4, length)
+
+    def test_datetimes_stored_as_integers(self):
+        whole = datetime(1970, 1, 1, 0, 0, 1)
+        fragment = BinaryFormat().encode("k", {"created_at": whole})
+        data = BinaryFormat.MAGIC + fragment
+        self.assertIn(b'"created_at": 1000000', fragment)
+        self.assertEqual(whole, dict(BinaryFormat().read(
+            io.BytesIO(data)))["k"]["created_at"])
+
+    def test_record_layout(self):
+        fragment = BinaryFormat().encode("User.2", records["User.2"])
+        self.assertEqual(b"\x06\x00User.2", fragment[4:12])
+        self.assertEqual("2", json.loads(fragment[12:])["id"])
+
+    def test_raw_read(self):
+        data = snapshot(BinaryFormat(), records)
+        raw = dict(BinaryFormat().read(io.BytesIO(data), raw=True))
+        self.assertEqual(BinaryFormat().encode("User.2", records["User.2"]),
+                         raw["User.2"])
+        self.assertEqual(dt, BinaryFormat().decode(
+            "Place.1", raw["Place.1"])["created_at"])
+
+    def test_read_rejects_other_versions(self):
+        data = snapshot(BinaryFormat(), records)
+        with self.assertRaisesRegex(ValueError, "version 1"):
+            list(BinaryFormat().read(io.BytesIO(b"HBNB\x01" + data[5:])))
+
+    def test_smaller_than_json(self):
+        self.assertLess(len(snapshot(BinaryFormat(), records)),
+                        len(snapshot(JSONFormat(), records)))
+
+    def test_read_rejects_truncated_snapshot(self):
+        data = snapshot(BinaryFormat(), records)
+        for end in (-3, len(BinaryFormat.MAGIC) + 2):
+            with self.assertRaises(ValueError):
+                list(BinaryFormat().read(io.BytesIO(data[:end])))
+
+    def test_read_empty_snapshot(self):
+        self.assertEqual([], list(BinaryFormat().read(
+            io.BytesIO(BinaryFormat.MAGIC))))
+
+    def test_read_progress(self):
+        calls = []
+        data = snapshot(BinaryFormat(), records)
+        list(BinaryFormat().read(io.BytesIO(data),
+                                 lambda done, total: calls.append(done)))
+        self.assertEqual(len(data), calls[-1])
+
+    def test_read_rejects_other_files(self):
+        with self.assertRaises(ValueError):
+            list(BinaryFormat().read(io.BytesIO(b"{}")))
+
+
+class TestFormats_convert(unittest.TestCase):
+    """Unittests for testing get_format and convert."""
+
+    paths = ("convert_test.json", "convert_test.bin", "convert_back.json")
+
+    def tearDown(self):
+        for path in self.paths:
+            try:
+                os.remove(path)
+            except IOError:
+                pass
+
+    def test_get_format(self):
+        self.assertEqual(JSONFormat, type(get_format("file.json")))
+        self.assertEqual(BinaryFormat, type(get_format("file.bin")))
+        self.assertEqual(BinaryFormat, type(get_format("file.json",
+                                                       "binary")))
+        self.assertEqual(JSONFormat, type(get_format("file.bin", "json")))
+        with self.assertRaises(ValueError):
+            get_format("file.json", "xml")
+
+    def test_convert_round_trip(self):
+        with open("convert_test.json", "w") as f:
+            json.dump(records, f)
+        convert("convert_test.json", "convert_test.bin")
+        with open("convert_test.bin", "rb") as f:
+            self.assertTrue(f.read().startswith(BinaryFormat.MAGIC))
+        convert("convert_test.bin", "convert_back.json")
+        with open("convert_back.json", "r") as f:
+            self.assertEqual(json.dumps(records), f.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
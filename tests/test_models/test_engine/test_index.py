@@ -0,0 +1,405 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/index.py.
+
+Unittest classes:
+    TestHashIndex
+    TestSortedIndex
+    TestGridIndex
+    TestTextIndex
+    TestCounterIndex
+"""
+import random
+import unittest
+from math import asin
+from math import cos
+from math import log
+from math import radians
+from math import sin
+from math import sqrt
+from models.engine.index import EARTH_RADIUS
+from models.engine.index import CounterIndex
+from models.engine.index import GridIndex
+from models.engine.index import HashIndex
+from models.engine.index import SortedIndex
+from models.engine.index import TextIndex
+from models.engine.index import build_indexes
+from models.city import City
+from models.place import Place
+from models.review import Review
+
+
+class TestHashIndex(unittest.TestCase):
+    """Unittests for testing the HashIndex class."""
+
+    def setUp(self):
+        self.index = HashIndex("state_id")
+        self.cty = City()
+        self.cty.state_id = "s1"
+
+    def test_add_and_get(self):
+        self.index.add("City.1", self.cty)
+        self.assertEqual(["City.1"], self.index.get("s1"))
+        self.assertEqual([], self.index.get("s2"))
+
+    def test_remove(self):
+        self.index.add("City.1", self.cty)
+        self.index.remove("City.1")
+        self.assertEqual([], self.index.get("s1"))
+
+    def test_remove_missing_key(self):
+        self.index.remove("City.1")
+        self.assertEqual([], self.index.get("s1"))
+
+    def test_missing_attribute_indexed_as_None(self):
+        self.index.add("City.2", object())
+        self.assertEqual(["City.2"], self.index.get(None))
+
+    def test_unhashable_value_not_indexed(self):
+        self.cty.state_id = ["s1"]
+        self.index.add("City.1", self.cty)
+        self.assertEqual([], self.index.get(["s1"]))
+        self.index.remove("City.1")
+
+    def test_sizes(self):
+        self.index.add("City.1", self.cty)
+        self.index.add("City.2", self.cty)
+        self.index.add("City.3", object())
+        self.assertEqual({"s1": 2, None: 1}, self.index.sizes())
+
+    def test_clear(self):
+        self.index.add("City.1", self.cty)
+        self.index.clear()
+        self.assertEqual([], self.index.get("s1"))
+
+
+class TestSortedIndex(unittest.TestCase):
+    """Unittests for testing the SortedIndex class."""
+
+    def setUp(self):
+        self.index = SortedIndex("price_by_night")
+        for i, price in enumerate([30, 10, 20, 10, 40]):
+            plc = Place()
+            plc.price_by_night = price
+            self.index.add("Place.{}".format(i), plc)
+
+    def test_range(self):
+        self.assertEqual(["Place.2", "Place.0"], self.index.range(15, 30))
+        self.assertEqual(["Place.2"], self.index.range(10, 30, False, False))
+
+    def test_open_bounds(self):
+        self.assertEqual(["Place.0", "Place.4"], self.index.range(low=30))
+        self.assertCountEqual(["Place.1", "Place.3"],
+                              self.index.range(high=10))
+        self.assertEqual(5, len(self.index.range()))
+
+    def test_get(self):
+        self.assertCountEqual(["Place.1", "Place.3"], self.index.get(10))
+        self.assertEqual([], self.index.get(15))
+
+    def test_remove_duplicate_value(self):
+        self.index.remove("Place.3")
+        self.assertEqual(["Place.1"], self.index.get(10))
+        self.index.remove("Place.3")
+        self.assertEqual(4, len(self.index.range()))
+
+    def test_equal_values_ordered_by_key(self):
+        self.assertEqual(["Place.1", "Place.3"], self.index.get(10))
+
+    def test_readd_after_read(self):
+        self.index.range()
+        plc = Place()
+        plc.price_by_night = 20
+        self.index.remove("Place.2")
+        self.index.add("Place.2", plc)
+        self.assertEqual(["Place.2", "Place.0"], self.index.range(15, 30))
+        plc.price_by_night = 35
+        self.index.remove("Place.2")
+        self.index.add("Place.2", plc)
+        self.assertEqual(["Place.0", "Place.2"], self.index.range(15, 35))
+        self.assertEqual(5, len(self.index.range()))
+
+    def test_remove_many_equal_values(self):
+        plc = Place()
+        plc.price_by_night = 0
+        for i in range(100):
+            self.index.add("Other.{:02}".format(i), plc)
+        self.index.range()
+        for i in range(0, 100, 2):
+            self.index.remove("Other.{:02}".format(i))
+        self.index.add("Other.00", plc)
+        self.index.remove("Other.01")
+        self.assertEqual(["Other.00"] + ["Other.{:02}".format(i)
+                                         for i in range(3, 100, 2)],
+                         self.index.get(0))
+        self.index.remove("Other.03")
+        self.index.add("Other.03", plc)
+        self.index.remove("Other.05")
+        self.index.add("Other.02", plc)
+        self.assertEqual(["Other.00", "Other.02", "Other.03", "Other.07"],
+                         self.index.get(0)[:4])
+        self.assertEqual(50, len(self.index.get(0)))
+
+    def test_add_after_read(self):
+        self.index.range()
+        plc = Place()
+        plc.price_by_night = 25
+        self.index.add("Place.5", plc)
+        self.assertEqual(["Place.2", "Place.5", "Place.0"],
+                         self.index.range(20, 30))
+
+    def test_non_numbers_not_indexed(self):
+        for i, price in enumerate(["50", None, float("nan")]):
+            plc = Place()
+            plc.price_by_night = price
+            self.index.add("Other.{}".format(i), plc)
+        self.assertEqual(5, len(self.index.range()))
+        self.index.remove("Other.0")
+
+    def test_bools_indexed_as_ints(self):
+        for i, price in enumerate([True, False]):
+            plc = Place()
+            plc.price_by_night = price
+            self.index.add("Other.{}".format(i), plc)
+        self.assertEqual(["Other.1", "Other.0"], self.index.range(0, 9))
+        self.index.remove("Other.0")
+        self.assertEqual(["Other.1"], self.index.range(high=1))
+
+    def test_incomparable_bound(self):
+        self.assertEqual([], self.index.range("a", "z"))
+
+    def test_clear(self):
+        self.index.clear()
+        self.assertEqual([], self.index.range())
+
+    def test_build_indexes(self):
+        self.assertEqual("hash", build_indexes()["Place"]["city_id"].kind)
+        self.assertNotIn("max_guest", build_indexes()["Place"])
+        self.assertEqual("range",
+                         build_indexes(True)["Place"]["max_guest"].kind)
+
+
+def distance(lat1, lon1, lat2, lon2):
+    """Return the great-circle distance between two points in km."""
+    lat1, lon1, lat2, lon2 = map(radians, (lat1, lon1, lat2, lon2))
+    h = (sin((lat2 - lat1) / 2) ** 2 +
+         cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS * asin(sqrt(h))
+
+
+class TestGridIndex(unittest.TestCase):
+    """Unittests for testing the GridIndex class."""
+
+    def setUp(self):
+        self.index = GridIndex(("latitude", "longitude"))
+        self.add("Place.cairo", 30.0444, 31.2357)
+        self.add("Place.giza", 30.0131, 31.2089)
+        self.add("Place.alex", 31.2001, 29.9187)
+        self.add("Place.fiji", -17.7134, 179.9)
+        self.add("Place.samoa", -13.759, -172.1046)
+
+    def add(self, key, lat, lon):
+        plc = Place()
+        plc.latitude = lat
+        plc.longitude = lon
+        self.index.add(key, plc)
+
+    def test_box(self):
+        self.assertCountEqual(["Place.cairo", "Place.giza"],
+                              self.index.box(30, 31, 30.5, 31.5))
+        self.assertEqual([], self.index.box(0, 0, 1, 1))
+
+    def test_box_across_180th_meridian(self):
+        self.assertCountEqual(["Place.fiji", "Place.samoa"],
+                              self.index.box(-20, 170, -10, -170))
+
+    def test_box_whole_earth(self):
+        self.assertEqual(5, len(self.index.box(-90, -180, 90, 180)))
+
+    def test_near(self):
+        found = self.index.near(30.0444, 31.2357, 200)
+        self.assertEqual(["Place.cairo", "Place.giza", "Place.alex"],
+                         [key for d, key in found])
+        self.assertAlmostEqual(0.0, found[0][0])
+        self.assertAlmostEqual(distance(30.0444, 31.2357, 31.2001, 29.9187),
+                               found[2][0])
+        self.assertEqual(2, len(self.index.near(30.0444, 31.2357, 100)))
+
+    def test_near_across_180th_meridian(self):
+        found = self.index.near(-17.7, -179.9, 100)
+        self.assertEqual(["Place.fiji"], [key for d, key in found])
+
+    def test_near_pole(self):
+        self.add("Place.north", 89.9, 0)
+        self.add("Place.across", 89.9, 180)
+        self.assertCountEqual(["Place.north", "Place.across"],
+                              [key for d, key in
+                               self.index.near(89.95, 90, 50)])
+
+    def test_nearest(self):
+        self.assertEqual(["Place.giza", "Place.cairo"],
+                         [key for d, key in
+                          self.index.nearest(30, 31.2, 2)])
+        self.assertEqual(5, len(self.index.nearest(0, 0, 10)))
+        self.assertEqual([], self.index.nearest(0, 0, 0))
+
+    def test_matches_brute_force(self):
+        rand = random.Random(4)
+        points = {}
+        self.index.clear()
+        for i in range(300):
+            lat, lon = rand.uniform(-60, 60), rand.uniform(-180, 180)
+            points["Place.{}".format(i)] = (lat, lon)
+            self.add("Place.{}".format(i), lat, lon)
+        for lat, lon, km in ((0, 0, 2000), (50, 179, 1500), (-40, -20, 50)):
+            expected = sorted(key for key, p in points.items()
+                              if distance(lat, lon, *p) <= km)
+            found = self.index.near(lat, lon, km)
+            self.assertEqual(expected, sorted(key for d, key in found))
+        near = sorted(points, key=lambda key: distance(10, 10, *points[key]))
+        self.assertEqual(near[:7],
+                         [key for d, key in self.index.nearest(10, 10, 7)])
+
+    def test_remove(self):
+        self.index.remove("Place.cairo")
+        self.index.remove("Place.cairo")
+        self.assertEqual(["Place.giza"], self.index.box(30, 31, 30.5, 31.5))
+
+    def test_invalid_locations_not_indexed(self):
+        self.index.clear()
+        for i, (lat, lon) in enumerate((("30", 31), (None, 0), (91, 0),
+                                        (0, 181))):
+            self.add("Place.{}".format(i), lat, lon)
+        self.assertEqual([], self.index.box(-90, -180, 90, 180))
+        self.index.remove("Place.0")
+
+    def test_clear(self):
+        self.index.clear()
+        self.assertEqual([], self.index.nearest(0, 0, 1))
+
+    def test_build_indexes(self):
+        grid = build_indexes()["Place"][("latitude", "longitude")]
+        self.assertEqual("geo", grid.kind)
+
+
+class TestTextIndex(unittest.TestCase):
+    """Unittests for testing the TextIndex class."""
+
+    def setUp(self):
+        self.index = TextIndex(("name", "description"))
+        self.add("Place.1", "Sunny loft", "A loft by the Nile, sunny all day")
+        self.add("Place.2", "Garden house", "Quiet garden")
+        self.add("Place.3", "Loft", "")
+
+    def add(self, key, name, description):
+        plc = Place()
+        plc.name = name
+        plc.description = description
+        self.index.add(key, plc)
+
+    def keys(self, text, limit=None):
+        return [key for score, key in self.index.search(text, limit)]
+
+    def test_tokenize(self):
+        self.assertEqual(["café", "c", "est", "ça", "42"],
+                         TextIndex.tokenize("CAFÉ: c'est ça, 42!"))
+
+    def test_search_every_attribute(self):
+        self.assertEqual(["Place.2"], self.keys("quiet"))
+        self.assertEqual(["Place.2"], self.keys("HOUSE"))
+
+    def test_ranked(self):
+        self.assertEqual(["Place.1", "Place.3"], self.keys("nile loft"))
+        found = self.index.search("loft")
+        self.assertEqual(["Place.3", "Place.1"], [key for s, key in found])
+        self.assertGreater(found[0][0], found[1][0])
+
+    def test_bm25_score(self):
+        index = TextIndex(("text",))
+        for i, text in enumerate(("a b", "a c c", "d")):
+            rev = Review()
+            rev.text = text
+            index.add(str(i), rev)
+        idf = log(1 + (3 - 2 + 0.5) / (2 + 0.5))
+        norm = 1 + 1.2 * (1 - 0.75 + 0.75 * 2 / (6 / 3))
+        self.assertAlmostEqual(idf * 2.2 / norm, index.search("a")[0][0])
+
+    def test_limit(self):
+        self.assertEqual(["Place.3"], self.keys("loft", 1))
+
+    def test_no_match(self):
+        self.assertEqual([], self.keys("pool"))
+        self.assertEqual([], self.keys(""))
+
+    def test_remove(self):
+        self.index.remove("Place.1")
+        self.index.remove("Place.1")
+        self.assertEqual(["Place.3"], self.keys("loft sunny"))
+
+    def test_non_strings_not_indexed(self):
+        self.add("Place.4", ["loft"], None)
+        self.assertEqual(["Place.3", "Place.1"], self.keys("loft"))
+
+    def test_clear(self):
+        self.index.clear()
+        self.assertEqual([], self.keys("loft"))
+
+
+class TestCounterIndex(unittest.TestCase):
+    """Unittests for testing the CounterIndex class."""
+
+    def setUp(self):
+        self.index = CounterIndex("city_id", ("price_by_night", "name"))
+        self.add("Place.1", "c1", 100)
+        self.add("Place.2", "c1", 0.5)
+        self.add("Place.3", "c2", None)
+
+    def add(self, key, city_id, price):
+        plc = Place()
+        plc.city_id = city_id
+        plc.price_by_night = price
+        self.index.add(key, plc)
+
+    def test_groups(self):
+        self.assertEqual({"c1": [2, 2, 2, 100.5, 2, 0, 0],
+                          "c2": [1, 0, 0, 0, 1, 0, 0]}, self.index.groups())
+        self.assertEqual("counters", self.index.kind)
+        self.assertEqual(("city_id", ("price_by_night", "name")),
+                         self.index.attr)
+
+    def test_remove(self):
+        self.index.remove("Place.2")
+        self.index.remove("Place.3")
+        self.index.remove("Place.4")
+        self.assertEqual({"c1": [1, 1, 1, 100, 1, 0, 0]}, self.index.groups())
+
+    def test_float_sum_reset(self):
+        self.add("Place.4", "c3", 0.1)
+        self.add("Place.5", "c3", 0.2)
+        self.add("Place.6", "c3", "free")
+        self.index.remove("Place.4")
+        self.index.remove("Place.5")
+        self.assertEqual([1, 1, 0, 0, 1, 0, 0], self.index.groups()["c3"])
+
+    def test_unhashable_group(self):
+        self.add("Place.4", ["c1"], 10)
+        self.index.remove("Place.4")
+        self.assertEqual(2, self.index.groups()["c1"][0])
+
+    def test_groups_copied(self):
+        self.index.groups()["c1"][0] = 7
+        self.assertEqual(2, self.index.groups()["c1"][0])
+
+    def test_clear(self):
+        self.index.clear()
+        self.assertEqual({}, self.index.groups())
+
+    def test_build_indexes(self):
+        indexes = build_indexes()
+        attrs = ("number_rooms", "number_bathrooms", "max_guest",
+                 "price_by_night")
+        index = indexes["Place"]["city_id", attrs]
+        self.assertEqual("counters", index.kind)
+
+
+if __name__ == "__main__":
+    unittest.main()
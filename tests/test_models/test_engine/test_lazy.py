@@ -0,0 +1,122 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/lazy.py.
+
+Unittest classes:
+    TestLazyObjects
+    TestRecord
+"""
+import json
+import unittest
+from datetime import datetime
+from models.engine.lazy import LazyObjects
+from models.engine.lazy import Record
+from models.place import Place
+
+
+def record(id):
+    """Return the raw record of a Place with the given id."""
+    dt = datetime(2017, 6, 14, 22, 31, 3, 285259).isoformat()
+    return {"id": id, "created_at": dt, "updated_at": dt,
+            "__class__": "Place", "name": "Loft"}
+
+
+def fragment(id):
+    """Return the JSON fragment of a Place with the given id."""
+    return json.dumps(record(id))
+
+
+class TestLazyObjects(unittest.TestCase):
+    """Unittests for testing the LazyObjects class."""
+
+    def setUp(self):
+        self.objs = LazyObjects()
+        dict.__setitem__(self.objs, "Place.1", fragment("1"))
+        dict.__setitem__(self.objs, "Place.2", fragment("2"))
+
+    def test_is_dict(self):
+        self.assertIsInstance(self.objs, dict)
+
+    def test_getitem_builds_one_object(self):
+        plc = self.objs["Place.1"]
+        self.assertEqual(Place, type(plc))
+        self.assertEqual("Loft", plc.name)
+        self.assertIs(plc, dict.get(self.objs, "Place.1"))
+        self.assertEqual(str, type(dict.get(self.objs, "Place.2")))
+
+    def test_getitem_returns_same_object(self):
+        self.assertIs(self.objs["Place.1"], self.objs["Place.1"])
+
+    def test_get(self):
+        self.assertEqual(Place, type(self.objs.get("Place.2")))
+        self.assertIsNone(self.objs.get("Place.3"))
+
+    def test_keys_and_contains_do_not_build(self):
+        self.assertEqual(["Place.1", "Place.2"], list(self.objs))
+        self.assertIn("Place.2", self.objs)
+        self.assertEqual(str, type(dict.get(self.objs, "Place.1")))
+
+    def test_values_and_items_build_all(self):
+        self.assertEqual([Place, Place],
+                         [type(v) for v in self.objs.values()])
+        self.assertEqual(["1", "2"],
+                         [v.id for k, v in self.objs.items()])
+
+    def test_copies_build_all(self):
+        for copy in (dict(self.objs), {**self.objs}, self.objs.copy()):
+            self.assertEqual(dict, type(copy))
+            self.assertEqual([Place, Place], [type(v) for v in copy.values()])
+
+    def test_pop(self):
+        plc = self.objs.pop("Place.1")
+        self.assertEqual(Place, type(plc))
+        self.assertNotIn("Place.1", self.objs)
+        self.assertIsNone(self.objs.pop("Place.1", None))
+        with self.assertRaises(KeyError):
+            self.objs.pop("Place.1")
+
+    def test_popitem(self):
+        key, plc = self.objs.popitem()
+        self.assertEqual(("Place.2", Place), (key, type(plc)))
+        self.assertEqual(["Place.1"], list(self.objs))
+
+    def test_setdefault(self):
+        self.assertEqual(Place, type(self.objs.setdefault("Place.1")))
+        self.assertEqual(3, self.objs.setdefault("Place.3", 3))
+        self.assertEqual(3, self.objs["Place.3"])
+
+    def test_view_does_not_build(self):
+        view = self.objs.view("Place.1")
+        self.assertEqual(Record, type(view))
+        self.assertEqual("Loft", view.name)
+        self.assertEqual(str, type(dict.get(self.objs, "Place.1")))
+        self.assertIs(self.objs["Place.2"], self.objs.view("Place.2"))
+        self.assertIsNone(self.objs.view("Place.3"))
+
+    def test_decode(self):
+        keys = []
+
+        def decode(key, fragment):
+            keys.append(key)
+            return record(fragment.decode())
+
+        objs = LazyObjects({"Place.1": b"1"}, decode)
+        self.assertEqual("1", objs["Place.1"].id)
+        self.assertEqual(["Place.1"], keys)
+
+
+class TestRecord(unittest.TestCase):
+    """Unittests for testing the Record class."""
+
+    def test_attribute_from_record(self):
+        self.assertEqual("Loft", Record(record("1")).name)
+
+    def test_attribute_from_class_default(self):
+        self.assertEqual(0, Record(record("1")).max_guest)
+
+    def test_missing_attribute(self):
+        with self.assertRaises(AttributeError):
+            Record(record("1")).colour
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,269 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/query.py.
+
+Unittest classes:
+    TestQuery_parse
+    TestQuery_run
+    TestQuery_ranges
+    TestQuery_columns
+"""
+import random
+import unittest
+from unittest.mock import patch
+import models
+from models.engine.file_storage import FileStorage
+from models.engine.index import build_indexes
+from models.engine.query import Query
+from models.city import City
+from models.place import Place
+
+
+class TestQuery_parse(unittest.TestCase):
+    """Unittests for testing how the Query class parses conditions."""
+
+    def test_comparisons(self):
+        query = Query.parse("Place", "price_by_night < 100, max_guest >= 4")
+        self.assertEqual([("price_by_night", "<", 100),
+                          ("max_guest", ">=", 4)], query.conditions)
+
+    def test_every_operator(self):
+        for op in ("==", "!=", "<", ">", "<=", ">="):
+            query = Query.parse("Place", "max_guest {} 2".format(op))
+            self.assertEqual([("max_guest", op, 2)], query.conditions)
+
+    def test_quoted_comma(self):
+        query = Query.parse("Place", 'name == "Loft, Cairo"')
+        self.assertEqual([("name", "==", "Loft, Cairo")], query.conditions)
+
+    def test_in_list(self):
+        query = Query.parse("Place", 'city_id in ["c1", "c2"], max_guest > 1')
+        self.assertEqual([("city_id", "in", frozenset({"c1", "c2"})),
+                          ("max_guest", ">", 1)], query.conditions)
+
+    def test_contains(self):
+        query = Query.parse("Place", "amenity_ids contains wifi")
+        self.assertEqual([("amenity_ids", "contains", "wifi")],
+                         query.conditions)
+
+    def test_bare_string(self):
+        query = Query.parse("Place", "city_id == 0001")
+        self.assertEqual([("city_id", "==", "0001")], query.conditions)
+
+    def test_values_take_attribute_type(self):
+        query = Query.parse("Place", 'max_guest == "4", name == 5')
+        self.assertEqual([("max_guest", "==", 4), ("name", "==", "5")],
+                         query.conditions)
+
+    def test_no_conditions(self):
+        self.assertEqual([], Query.parse("Place", " ").conditions)
+
+    def test_invalid(self):
+        for text in ("max_guest", "max_guest ==", "max_guest ~ 3",
+                     "max_guest in 3", "a == 1,, b == 2"):
+            with self.assertRaises(ValueError):
+                Query.parse("Place", text)
+
+
+class TestQuery_run(unittest.TestCase):
+    """Unittests for testing how the Query class finds objects."""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        self.places = []
+        for i in range(6):
+            plc = Place()
+            plc.city_id = "c{}".format(i % 2)
+            plc.price_by_night = i * 50
+            plc.max_guest = i
+            plc.name = "Place {}".format(i)
+            self.places.append(plc)
+        self.places[0].amenity_ids = ["wifi"]
+
+    def tearDown(self):
+        FileStorage._FileStorage__objects = {}
+
+    def run_query(self, text):
+        return Query.parse("Place", text).run(models.storage)
+
+    def test_scan(self):
+        self.assertEqual(self.places[2:4], self.run_query(
+            "price_by_night < 200, max_guest >= 2"))
+
+    def test_contains(self):
+        self.assertEqual([self.places[0]],
+                         self.run_query("amenity_ids contains wifi"))
+        self.assertEqual([self.places[5]],
+                         self.run_query("name contains 5"))
+
+    def test_mismatched_types_do_not_match(self):
+        self.assertEqual([], self.run_query('max_guest < "two"'))
+
+    def test_missing_attribute_is_None(self):
+        self.assertEqual(self.places,
+                         self.run_query("number_bathrooms == 0"))
+        self.assertEqual([], self.run_query("pool == True"))
+
+    def test_index_used_for_equality(self):
+        query = Query.parse("Place", "max_guest > 2, city_id == c1")
+        self.assertEqual([("city_id", "==", "c1")],
+                         query.plan(models.storage))
+        with patch.object(FileStorage, "scan") as scan:
+            result = query.run(models.storage)
+            scan.assert_not_called()
+        self.assertCountEqual([self.places[3], self.places[5]], result)
+
+    def test_index_used_for_in(self):
+        cty = City()
+        cty.state_id = "s1"
+        query = Query.parse("City", 'state_id in ["s1", "s2"]')
+        self.assertEqual("state_id", query.plan(models.storage)[0][0])
+        self.assertEqual([cty], query.run(models.storage))
+
+    def test_scan_planned_without_index(self):
+        query = Query.parse("Place", "max_guest == 3")
+        self.assertEqual([], query.plan(models.storage))
+
+    def test_follows_updates(self):
+        self.places[1].price_by_night = 1000
+        self.assertEqual([self.places[1]],
+                         self.run_query("price_by_night > 500"))
+        self.places[1].city_id = "c9"
+        self.assertEqual([self.places[1]], self.run_query("city_id == c9"))
+
+
+class TestQuery_ranges(unittest.TestCase):
+    """Unittests for testing queries answered from sorted indexes."""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__indexes = build_indexes(True)
+        FileStorage._FileStorage__indexed = None
+        self.places = []
+        for i in range(6):
+            plc = Place()
+            plc.city_id = "c{}".format(i % 2)
+            plc.price_by_night = (5 - i) * 50
+            plc.max_guest = i
+            self.places.append(plc)
+
+    def tearDown(self):
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__indexes = build_indexes()
+        FileStorage._FileStorage__indexed = None
+
+    def run_query(self, text):
+        return Query.parse("Place", text).run(models.storage)
+
+    def test_bounds_planned_together(self):
+        query = Query.parse(
+            "Place", "price_by_night >= 50, name != x, price_by_night < 200")
+        self.assertEqual([("price_by_night", ">=", 50),
+                          ("price_by_night", "<", 200)],
+                         query.plan(models.storage))
+
+    def test_matches_scan(self):
+        rng = random.Random(7)
+        for plc in self.places:
+            plc.max_guest = rng.choice([True, False, 0, 1, 2, 2.5, None,
+                                        "2", float("nan")])
+        for text in ("max_guest <= 2", "max_guest > 0", "max_guest == 1",
+                     "max_guest >= 0, max_guest < 1", "max_guest == 0"):
+            query = Query.parse("Place", text)
+            expected = [plc for plc in self.places
+                        if query.predicate(query.conditions)(plc)]
+            self.assertNotEqual([], query.plan(models.storage))
+            self.assertCountEqual(expected, query.run(models.storage), text)
+
+    def test_equality_preferred(self):
+        query = Query.parse("Place", "max_guest > 2, city_id == c1")
+        self.assertEqual([("city_id", "==", "c1")],
+                         query.plan(models.storage))
+
+    def test_range_in_attribute_order(self):
+        with patch.object(FileStorage, "scan") as scan:
+            result = self.run_query("price_by_night >= 50, "
+                                    "price_by_night < 200")
+            scan.assert_not_called()
+        self.assertEqual([self.places[4], self.places[3], self.places[2]],
+                         result)
+
+    def test_narrowest_bounds(self):
+        self.assertEqual([self.places[3], self.places[4]],
+                         self.run_query("max_guest > 1, max_guest >= 3, "
+                                        "max_guest <= 4, max_guest < 5"))
+        self.assertEqual([], self.run_query("max_guest > 3, max_guest < 3"))
+
+    def test_equality_on_sorted_index(self):
+        query = Query.parse("Place", "max_guest == 2")
+        self.assertEqual([("max_guest", "==", 2)], query.plan(models.storage))
+        self.assertEqual([self.places[2]], query.run(models.storage))
+
+    def test_equality_to_none_on_sorted_index(self):
+        self.places[1].max_guest = None
+        query = Query("Place", [("max_guest", "==", None)])
+        self.assertEqual([], query.plan(models.storage))
+        self.assertEqual([self.places[1]], query.run(models.storage))
+
+    def test_residual_conditions(self):
+        self.assertEqual([self.places[1], self.places[3]],
+                         self.run_query("max_guest <= 4, city_id != c0"))
+
+    def test_same_result_as_scan(self):
+        self.places[0].max_guest = "many"
+        text = "max_guest >= 1, max_guest < 5, price_by_night > 0"
+        indexed = self.run_query(text)
+        FileStorage._FileStorage__indexes = build_indexes()
+        FileStorage._FileStorage__indexed = None
+        self.assertCountEqual(indexed, self.run_query(text))
+
+    def test_follows_updates(self):
+        self.places[0].max_guest = 10
+        models.storage.delete(self.places[5])
+        self.assertEqual([self.places[0]], self.run_query("max_guest > 4"))
+
+
+class TestQuery_columns(unittest.TestCase):
+    """Unittests for testing queries answered from column stores."""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__indexes = build_indexes(columns=True)
+        FileStorage._FileStorage__indexed = None
+        self.places = []
+        for i in range(6):
+            plc = Place()
+            plc.city_id = "c{}".format(i % 2)
+            plc.price_by_night = i * 50
+            plc.latitude = 30.0 + i
+            self.places.append(plc)
+
+    def tearDown(self):
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__indexes = build_indexes()
+        FileStorage._FileStorage__indexed = None
+
+    def run_query(self, text):
+        return Query.parse("Place", text).run(models.storage)
+
+    def test_numeric_filters_use_columns(self):
+        with patch.object(FileStorage, "scan") as scan:
+            result = self.run_query("price_by_night >= 100, latitude < 34.5")
+            scan.assert_not_called()
+        self.assertCountEqual(self.places[2:5], result)
+
+    def test_other_conditions_scan(self):
+        for text in ("price_by_night > 0, name == x",
+                     "price_by_night != 100", "max_guest < 1.5x"):
+            with patch.object(FileStorage, "scan", return_value=[]) as scan:
+                self.run_query(text)
+                scan.assert_called_once()
+
+    def test_stray_values_scan(self):
+        self.places[0].price_by_night = 12.5
+        with patch.object(FileStorage, "scan", return_value=[]) as scan:
+            self.run_query("price_by_night < 20")
+            scan.assert_called_once()
+
+    def test_index_preferred(self):
+        self.assertCountEqual([self.places[3], self.places[5]],
+                              self.run_query("city_id == c1, latitude > 32"))